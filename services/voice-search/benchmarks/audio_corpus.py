@@ -0,0 +1,162 @@
+"""
+Generate a synthetic audio corpus for the audio pipeline benchmark.
+
+Clips are either speech-like (a voiced harmonic source with a wandering pitch,
+syllable-rate amplitude envelopes, moving formant weights and pauses between
+words) or near-silent (low-level noise). Each clip is written in every
+requested format, sample rate, channel count and duration, and a
+manifest.json describing the clips is written next to them.
+
+WAV is written directly. Other formats are encoded with ffmpeg (Opus and WebM
+at a speech bitrate, as sent by mobile clients) and are skipped with a warning
+when ffmpeg is not on the PATH.
+
+Usage:
+    python -m benchmarks.audio_corpus --output benchmarks/corpus
+    python -m benchmarks.audio_corpus --formats wav,flac,opus --rates 16000 --durations 1,60
+"""
+import argparse
+import json
+import os
+import shutil
+import subprocess
+import sys
+import wave
+from typing import Dict, List
+
+import numpy as np
+
+FORMATS = ["wav", "mp3", "ogg", "flac", "opus", "webm"]
+RATES = [8000, 16000, 44100, 48000]
+CHANNELS = [1, 2]
+DURATIONS = [1, 10, 60]
+KINDS = ["speech", "silence"]
+
+# ffmpeg encoder options per format
+ENCODER_OPTIONS = {
+    "mp3": ["-c:a", "libmp3lame", "-b:a", "64k"],
+    "ogg": ["-c:a", "libvorbis", "-q:a", "3"],
+    "flac": ["-c:a", "flac"],
+    "opus": ["-c:a", "libopus", "-b:a", "24k", "-application", "voip"],
+    "webm": ["-c:a", "libopus", "-b:a", "24k", "-application", "voip"],
+}
+
+def speech_like(duration: float, sample_rate: int, rng: np.random.Generator) -> np.ndarray:
+    """Synthesize a mono speech-like signal in [-1, 1]."""
+    samples = int(duration * sample_rate)
+    t = np.arange(samples) / sample_rate
+    
+    # Pitch wanders around a speaker's base frequency
+    base = rng.uniform(100, 220)
+    drift = 0.1 * np.sin(2 * np.pi * rng.uniform(0.2, 0.6) * t + rng.uniform(0, 2 * np.pi))
+    vibrato = 0.02 * np.sin(2 * np.pi * rng.uniform(4, 6) * t)
+    pitch = base * (1 + drift + vibrato)
+    phase = 2 * np.pi * np.cumsum(pitch) / sample_rate
+    
+    # Harmonics weighted by slowly moving formant-like envelopes
+    signal = np.zeros(samples)
+    for harmonic in range(1, 16):
+        if base * harmonic >= sample_rate / 2:
+            break
+        weight = (1 + np.sin(2 * np.pi * rng.uniform(2, 5) * t + rng.uniform(0, np.pi))) / harmonic
+        signal += weight * np.sin(harmonic * phase)
+    
+    # Syllables at ~4 Hz grouped into words separated by short pauses
+    envelope = np.zeros(samples)
+    position = 0.0
+    while position < duration:
+        syllables = rng.integers(1, 4)
+        for _ in range(syllables):
+            length = rng.uniform(0.15, 0.3)
+            start, end = int(position * sample_rate), int(min(duration, position + length) * sample_rate)
+            if end > start:
+                envelope[start:end] = np.hanning(end - start)
+            position += length
+        position += rng.uniform(0.1, 0.4)
+    
+    signal = signal * envelope + 0.005 * rng.standard_normal(samples)
+    return signal / max(1e-9, np.abs(signal).max()) * 0.8
+
+def silence(duration: float, sample_rate: int, rng: np.random.Generator) -> np.ndarray:
+    """Synthesize a near-silent mono signal."""
+    return 0.0005 * rng.standard_normal(int(duration * sample_rate))
+
+def to_pcm16(signal: np.ndarray, channels: int) -> bytes:
+    """Convert a mono float signal to interleaved 16-bit PCM."""
+    pcm = (np.clip(signal, -1, 1) * 32767).astype("<i2")
+    if channels > 1:
+        pcm = np.repeat(pcm[:, None], channels, axis=1)
+    return pcm.tobytes()
+
+def write_clip(path: str, fmt: str, pcm: bytes, sample_rate: int, channels: int):
+    """Write PCM data in the requested container format."""
+    if fmt == "wav":
+        with wave.open(path, "wb") as wav:
+            wav.setnchannels(channels)
+            wav.setsampwidth(2)
+            wav.setframerate(sample_rate)
+            wav.writeframes(pcm)
+        return
+    
+    command = [
+        "ffmpeg", "-nostdin", "-hide_banner", "-loglevel", "error", "-y",
+        "-f", "s16le", "-ar", str(sample_rate), "-ac", str(channels), "-i", "pipe:0",
+        *ENCODER_OPTIONS[fmt], path,
+    ]
+    subprocess.run(command, input=pcm, check=True)
+
+def parse_list(value: str, cast) -> List:
+    """Parse a comma-separated option."""
+    return [cast(item) for item in value.split(",") if item.strip()]
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--output", default=os.path.join("benchmarks", "corpus"))
+    parser.add_argument("--formats", default=",".join(FORMATS))
+    parser.add_argument("--rates", default=",".join(map(str, RATES)))
+    parser.add_argument("--channels", default=",".join(map(str, CHANNELS)))
+    parser.add_argument("--durations", default=",".join(map(str, DURATIONS)), help="Clip durations in seconds")
+    parser.add_argument("--kinds", default=",".join(KINDS))
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+    
+    formats = parse_list(args.formats, str)
+    if shutil.which("ffmpeg") is None and any(fmt != "wav" for fmt in formats):
+        print("ffmpeg not found, only generating WAV clips", file=sys.stderr)
+        formats = [fmt for fmt in formats if fmt == "wav"]
+    
+    generators = {"speech": speech_like, "silence": silence}
+    os.makedirs(args.output, exist_ok=True)
+    clips: List[Dict] = []
+    
+    for kind in parse_list(args.kinds, str):
+        for sample_rate in parse_list(args.rates, int):
+            for duration in parse_list(args.durations, float):
+                # Same seed per kind/rate/duration so formats and channel counts share content
+                rng = np.random.default_rng([args.seed, KINDS.index(kind), sample_rate, int(duration * 1000)])
+                signal = generators[kind](duration, sample_rate, rng)
+                
+                for channels in parse_list(args.channels, int):
+                    pcm = to_pcm16(signal, channels)
+                    
+                    for fmt in formats:
+                        name = f"{kind}_{sample_rate}hz_{channels}ch_{duration:g}s.{fmt}"
+                        path = os.path.join(args.output, name)
+                        write_clip(path, fmt, pcm, sample_rate, channels)
+                        clips.append({
+                            "file": name,
+                            "kind": kind,
+                            "format": fmt,
+                            "sample_rate": sample_rate,
+                            "channels": channels,
+                            "duration": duration,
+                            "bytes": os.path.getsize(path),
+                        })
+    
+    with open(os.path.join(args.output, "manifest.json"), "w") as f:
+        json.dump({"seed": args.seed, "clips": clips}, f, indent=2)
+    
+    print(f"Wrote {len(clips)} clips to {args.output}")
+
+if __name__ == "__main__":
+    main()
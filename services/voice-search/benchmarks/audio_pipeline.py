@@ -0,0 +1,186 @@
+"""
+Per-stage micro-benchmark of SpeechRecognitionService over an audio corpus.
+
+Each clip from a corpus generated by benchmarks.audio_corpus is passed through
+recognize_from_file (default) or recognize_from_bytes with a stub recognizer,
+so the run is offline and measures only the local pipeline. Stage times
+(size_check, read, decode, segment, recognize) are collected from the same
+track_stage instrumentation that feeds Server-Timing. A per-format summary
+reports upload size and decode and total time per second of audio. Peak Python heap usage
+is measured in a separate tracemalloc pass, because tracing slows the timed
+runs. Memory used inside the ffmpeg subprocess is not included.
+
+Usage:
+    python -m benchmarks.audio_corpus --output benchmarks/corpus
+    python -m benchmarks.audio_pipeline --corpus benchmarks/corpus --repeat 5
+    python -m benchmarks.audio_pipeline --filter 60s --asr-ms 300 --asr-rtf 0.1 --segment-seconds 0
+"""
+import argparse
+import io
+import json
+import os
+import statistics
+import time
+import tracemalloc
+from collections import defaultdict
+from datetime import datetime, timezone
+from typing import Any, Dict, List
+
+os.environ.setdefault("LOG_LEVEL", "WARNING")
+
+from benchmarks.common import git_revision
+from src.core.exceptions import AppException
+from src.core.timing import collect_timings
+from src.services.speech_recognition import SpeechRecognitionService
+
+STAGES = ["size_check", "read", "decode", "segment", "recognize"]
+
+class StubRecognizer:
+    """Recognizer backend that returns a fixed transcript after a delay that grows with the audio duration."""
+    
+    def __init__(self, latency_ms: float, real_time_factor: float, transcript: str):
+        self.latency = latency_ms / 1000
+        self.real_time_factor = real_time_factor
+        self.transcript = transcript
+    
+    def __call__(self, audio_data, language: str) -> str:
+        duration = len(audio_data.frame_data) / (audio_data.sample_rate * audio_data.sample_width)
+        delay = self.latency + self.real_time_factor * duration
+        if delay:
+            time.sleep(delay)
+        return self.transcript
+
+def run_clip(service: SpeechRecognitionService, data: bytes, fmt: str, entry: str) -> Dict[str, float]:
+    """Run one clip through the pipeline and return stage timings in seconds."""
+    with collect_timings() as timings:
+        start = time.perf_counter()
+        if entry == "file":
+            service.recognize_from_file(io.BytesIO(data), fmt)
+        else:
+            service.recognize_from_bytes(data, fmt)
+        timings["total"] = time.perf_counter() - start
+    
+    return dict(timings)
+
+def measure_clip(service: SpeechRecognitionService, clip: Dict[str, Any], data: bytes, args: argparse.Namespace) -> Dict[str, Any]:
+    """Time a clip over several repeats and measure its peak Python heap usage."""
+    runs: List[Dict[str, float]] = []
+    error = None
+    
+    for _ in range(args.repeat):
+        try:
+            runs.append(run_clip(service, data, clip["format"], args.entry))
+        except AppException as e:
+            error = e.message
+            break
+    
+    peak_bytes = None
+    if error is None and not args.no_memory:
+        tracemalloc.start()
+        tracemalloc.reset_peak()
+        run_clip(service, data, clip["format"], args.entry)
+        peak_bytes = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+    
+    stages_ms = {}
+    for stage in STAGES + ["total"]:
+        values = [run.get(stage, 0.0) for run in runs]
+        if values:
+            stages_ms[stage] = round(statistics.median(values) * 1000, 3)
+    
+    return {**clip, "error": error, "stages_ms": stages_ms, "peak_bytes": peak_bytes}
+
+def print_table(results: List[Dict[str, Any]]):
+    header = f"{'clip':<36} {'KiB':>7} " + " ".join(f"{stage:>10}" for stage in STAGES + ["total"]) + f" {'peak KiB':>9}"
+    print(header)
+    
+    for result in results:
+        if result["error"]:
+            print(f"{result['file']:<36} {result['bytes'] / 1024:7.0f} {result['error']}")
+            continue
+        
+        stages = " ".join(f"{result['stages_ms'].get(stage, 0.0):10.2f}" for stage in STAGES + ["total"])
+        peak = f"{result['peak_bytes'] / 1024:9.0f}" if result["peak_bytes"] is not None else f"{'-':>9}"
+        print(f"{result['file']:<36} {result['bytes'] / 1024:7.0f} {stages} {peak}")
+
+def summarize_by_format(results: List[Dict[str, Any]]) -> Dict[str, Dict[str, float]]:
+    """Get the median upload size and time per second of audio for each stage, by format."""
+    per_format: Dict[str, Dict[str, List[float]]] = defaultdict(lambda: defaultdict(list))
+    
+    for result in results:
+        if result["error"]:
+            continue
+        per_format[result["format"]]["kib"].append(result["bytes"] / 1024 / result["duration"])
+        for stage, ms in result["stages_ms"].items():
+            per_format[result["format"]][f"{stage}_ms"].append(ms / result["duration"])
+    
+    return {
+        fmt: {f"{name}_per_audio_s": round(statistics.median(values), 3) for name, values in stages.items()}
+        for fmt, stages in per_format.items()
+    }
+
+def print_format_summary(summary: Dict[str, Dict[str, float]]):
+    columns = ["kib"] + [f"{stage}_ms" for stage in ["decode", "total"]]
+    print()
+    print(f"{'format':<8} " + " ".join(f"{column + '/s':>12}" for column in columns))
+    
+    for fmt, values in sorted(summary.items()):
+        print(f"{fmt:<8} " + " ".join(f"{values.get(column + '_per_audio_s', 0.0):12.2f}" for column in columns))
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--corpus", default=os.path.join("benchmarks", "corpus"))
+    parser.add_argument("--entry", choices=["file", "bytes"], default="file", help="Service entry point to benchmark")
+    parser.add_argument("--repeat", type=int, default=3, help="Timed runs per clip (median is reported)")
+    parser.add_argument("--asr-ms", type=float, default=0.0, help="Fixed latency of the stub recognizer per call")
+    parser.add_argument("--asr-rtf", type=float, default=0.0, help="Stub recognizer latency per second of audio")
+    parser.add_argument("--segment-seconds", type=float, help="Override RECOGNITION_SEGMENT_SECONDS (0: no segmenting)")
+    parser.add_argument("--transcript", default="python developer")
+    parser.add_argument("--filter", default="", help="Only run clips whose file name contains this text")
+    parser.add_argument("--no-memory", action="store_true", help="Skip the tracemalloc pass")
+    parser.add_argument("--output", help="Result file (default: benchmarks/results/audio-<time>-<commit>.json)")
+    args = parser.parse_args()
+    
+    with open(os.path.join(args.corpus, "manifest.json")) as f:
+        clips = [clip for clip in json.load(f)["clips"] if args.filter in clip["file"]]
+    
+    service = SpeechRecognitionService(recognize_fn=StubRecognizer(args.asr_ms, args.asr_rtf, args.transcript))
+    if args.segment_seconds is not None:
+        service.segment_seconds = args.segment_seconds
+    results = []
+    
+    for clip in clips:
+        with open(os.path.join(args.corpus, clip["file"]), "rb") as f:
+            data = f.read()
+        results.append(measure_clip(service, clip, data, args))
+    
+    print_table(results)
+    
+    by_format = summarize_by_format(results)
+    print_format_summary(by_format)
+    
+    revision = git_revision()
+    report = {
+        "meta": {
+            "timestamp": datetime.now(timezone.utc).isoformat(),
+            "git_commit": revision["commit"],
+            "git_dirty": revision["dirty"],
+            "config": {key: value for key, value in vars(args).items() if key != "output"},
+        },
+        "by_format": by_format,
+        "clips": results,
+    }
+    
+    output = args.output
+    if not output:
+        stamp = datetime.now().strftime("%Y%m%d-%H%M%S")
+        output = os.path.join("benchmarks", "results", f"audio-{stamp}-{(revision['commit'] or 'unknown')[:8]}.json")
+    
+    os.makedirs(os.path.dirname(output) or ".", exist_ok=True)
+    with open(output, "w") as f:
+        json.dump(report, f, indent=2)
+    
+    print(f"Results written to {output}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,311 @@
+"""
+Replay recorded search history through simulated search cache policies.
+
+Searches are read in time order from the search_history collection (raw
+entries only; days already compacted into daily aggregates have no
+timestamps) or from an NDJSON export, turned into the same cache keys the
+search service uses and fed through every combination of:
+
+- TTL (--ttls): entries expire this many seconds after they were filled,
+  as with REDIS_CACHE_TTL (hits do not extend it)
+- memory limit and eviction (--sizes, --evictions): Redis maxmemory with
+  allkeys-lru or allkeys-lfu; 0 means unbounded
+- key canonicalization (--canonical): raw keys as the service builds them,
+  or keys with the query lowercased and whitespace-collapsed and skills
+  sorted, to see what normalizing keys would gain
+  
+For each policy it reports the hit ratio, upstream calls (misses), and the
+peak and mean memory held by cache entries. History does not record response
+sizes, so an entry is estimated as --base-bytes plus --result-bytes per
+returned result (capped at the page size), plus its key.
+
+Usage:
+    python -m benchmarks.cache_simulator --days 14
+    mongoexport --uri "$MONGO_URI" -c search_history --sort '{createdAt: 1}' -o history.ndjson
+    python -m benchmarks.cache_simulator --ndjson history.ndjson --ttls 300,3600 --sizes 0,32MB --evictions lru,lfu
+"""
+import argparse
+import heapq
+import itertools
+import json
+import os
+import time
+from collections import OrderedDict
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+os.environ.setdefault("LOG_LEVEL", "WARNING")
+
+from benchmarks.common import git_revision
+
+# Per-key overhead of a Redis hash with two small fields and a TTL, in bytes
+REDIS_ENTRY_OVERHEAD = 120
+
+SIZE_UNITS = {"": 1, "KB": 1024, "MB": 1024 ** 2, "GB": 1024 ** 3}
+
+class SimulatedCache:
+    """Cache with a TTL and an optional memory limit enforced by LRU or LFU eviction."""
+    
+    def __init__(self, ttl: float, max_bytes: int, eviction: str):
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.eviction = eviction
+        self.used_bytes = 0
+        self.peak_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self._memory_samples = 0.0
+        self._entries: "OrderedDict[str, List[float]]" = OrderedDict()  # key -> [expires_at, size, frequency]
+        self._expiry_heap: List[Tuple[float, str]] = []
+        self._lfu_heap: List[Tuple[float, int, str]] = []
+        self._tick = itertools.count()
+    
+    def _remove(self, key: str):
+        self.used_bytes -= self._entries.pop(key)[1]
+    
+    def _expire(self, now: float):
+        # Redis expires keys in the background; entries stop using memory when they expire
+        while self._expiry_heap and self._expiry_heap[0][0] <= now:
+            expires_at, key = heapq.heappop(self._expiry_heap)
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] == expires_at:
+                self._remove(key)
+                self.expirations += 1
+    
+    def _evict(self):
+        if self.eviction == "lru":
+            key = next(iter(self._entries))
+        else:
+            # Skip heap entries left behind by later accesses of the same key
+            while True:
+                frequency, _, key = heapq.heappop(self._lfu_heap)
+                entry = self._entries.get(key)
+                if entry is not None and entry[2] == frequency:
+                    break
+        
+        self._remove(key)
+        self.evictions += 1
+    
+    def request(self, key: str, size: int, now: float) -> bool:
+        """
+        Look up a key, filling it on a miss.
+        
+        Args:
+            key: Cache key
+            size: Size of the entry in bytes if it has to be filled
+            now: Time of the request in seconds
+            
+        Returns:
+            True on a hit
+        """
+        self._expire(now)
+        entry = self._entries.get(key)
+        
+        if entry is not None:
+            self.hits += 1
+            entry[2] += 1
+            if self.eviction == "lru":
+                self._entries.move_to_end(key)
+            elif self.eviction == "lfu":
+                heapq.heappush(self._lfu_heap, (entry[2], next(self._tick), key))
+            hit = True
+        else:
+            self.misses += 1
+            expires_at = now + self.ttl
+            self._entries[key] = [expires_at, size, 1]
+            self.used_bytes += size
+            heapq.heappush(self._expiry_heap, (expires_at, key))
+            if self.eviction == "lfu":
+                heapq.heappush(self._lfu_heap, (1, next(self._tick), key))
+            
+            while self.max_bytes and self.used_bytes > self.max_bytes and len(self._entries) > 1:
+                self._evict()
+            hit = False
+        
+        self.peak_bytes = max(self.peak_bytes, self.used_bytes)
+        self._memory_samples += self.used_bytes
+        return hit
+    
+    def report(self) -> Dict[str, Any]:
+        requests = self.hits + self.misses
+        return {
+            "requests": requests,
+            "hits": self.hits,
+            "hit_ratio": round(self.hits / requests, 4) if requests else None,
+            "upstream_calls": self.misses,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+            "peak_bytes": self.peak_bytes,
+            "mean_bytes": round(self._memory_samples / requests) if requests else 0,
+        }
+
+def canonical_query(query: str) -> str:
+    """Lowercase a query and collapse its whitespace."""
+    return " ".join(str(query).lower().split())
+
+def cache_key(entry: Dict[str, Any], canonical: bool) -> Optional[str]:
+    """
+    Build the search cache key of a history entry, as the search service does.
+    
+    Args:
+        entry: Search history entry
+        canonical: Canonicalize the query and skills
+        
+    Returns:
+        Cache key, or None for searches that are not cached
+    """
+    filters = entry.get("filters") or {}
+    query = entry.get("query", "")
+    skills = filters.get("skills")
+    
+    if canonical:
+        query = canonical_query(query)
+        skills = sorted(skill.lower() for skill in skills) if skills else None
+    
+    if entry.get("searchType") == "projects":
+        return f"projects:{query}:{filters.get('category')}:{skills}:{filters.get('budget_min')}:{filters.get('budget_max')}:{filters.get('page', 1)}:{filters.get('limit', 10)}"
+    
+    if entry.get("searchType") == "users":
+        return f"users:{query}:{filters.get('role')}:{skills}:{filters.get('page', 1)}:{filters.get('limit', 10)}"
+    
+    return None
+
+def parse_time(value: Any) -> float:
+    """Get a UNIX timestamp from a datetime, an ISO string or MongoDB extended JSON."""
+    if isinstance(value, dict):
+        value = value.get("$date", value)
+        if isinstance(value, dict):
+            value = int(value["$numberLong"]) / 1000
+    
+    if isinstance(value, (int, float)):
+        return float(value)
+    
+    if isinstance(value, str):
+        value = datetime.fromisoformat(value.replace("Z", "+00:00"))
+    
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    
+    return value.timestamp()
+
+def read_ndjson(path: str) -> Iterator[Dict[str, Any]]:
+    """Stream search history entries from an NDJSON export sorted by createdAt."""
+    with open(path) as f:
+        for line in f:
+            if line.strip():
+                yield json.loads(line)
+
+def read_mongo(days: int) -> Iterator[Dict[str, Any]]:
+    """Stream raw search history entries of the last days from MongoDB in time order."""
+    from src.core.database import get_mongo_db
+    
+    since = datetime.utcnow() - timedelta(days=days)
+    cursor = get_mongo_db().search_history.find(
+        {"createdAt": {"$gte": since}},
+        {"_id": 0, "query": 1, "searchType": 1, "filters": 1, "resultsCount": 1, "createdAt": 1},
+    ).sort("createdAt", 1).batch_size(5000)
+    
+    yield from cursor
+
+def parse_size(value: str) -> int:
+    """Parse a size such as 0, 512KB or 64MB into bytes."""
+    value = value.strip().upper()
+    number = value.rstrip("KMGB")
+    return int(float(number) * SIZE_UNITS[value[len(number):]])
+
+def format_size(size: float) -> str:
+    for unit in ("GB", "MB", "KB"):
+        if size >= SIZE_UNITS[unit]:
+            return f"{size / SIZE_UNITS[unit]:.1f}{unit}"
+    return f"{size:.0f}B"
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--ndjson", help="Search history export to replay instead of reading MongoDB")
+    parser.add_argument("--days", type=int, default=7, help="Days of history to read from MongoDB")
+    parser.add_argument("--ttls", default="300,1800,3600,21600", help="Entry TTLs in seconds")
+    parser.add_argument("--sizes", default="0,16MB,64MB", help="Memory limits (0: unbounded)")
+    parser.add_argument("--evictions", default="lru,lfu", help="Eviction policies for bounded sizes")
+    parser.add_argument("--canonical", default="raw,canonical", help="Key variants to simulate")
+    parser.add_argument("--base-bytes", type=int, default=300, help="Estimated size of an empty response")
+    parser.add_argument("--result-bytes", type=int, default=600, help="Estimated size of each result")
+    parser.add_argument("--output", help="Result file (default: benchmarks/results/cache-<time>-<commit>.json)")
+    args = parser.parse_args()
+    
+    simulations = []
+    for variant in args.canonical.split(","):
+        for ttl in [float(ttl) for ttl in args.ttls.split(",")]:
+            for size in [parse_size(size) for size in args.sizes.split(",")]:
+                for eviction in (args.evictions.split(",") if size else ["none"]):
+                    policy = {"keys": variant, "ttl": ttl, "max_bytes": size, "eviction": eviction}
+                    simulations.append((policy, SimulatedCache(ttl, size, eviction)))
+    
+    entries = read_ndjson(args.ndjson) if args.ndjson else read_mongo(args.days)
+    searches = 0
+    skipped = 0
+    distinct_keys = {variant: set() for variant in args.canonical.split(",")}
+    started = time.perf_counter()
+    
+    for entry in entries:
+        now = parse_time(entry["createdAt"])
+        filters = entry.get("filters") or {}
+        results = min(int(entry.get("resultsCount") or 0), int(filters.get("limit") or 10))
+        keys = {variant: cache_key(entry, variant == "canonical") for variant in distinct_keys}
+        
+        if keys[next(iter(keys))] is None:
+            skipped += 1
+            continue
+        
+        searches += 1
+        for variant, key in keys.items():
+            distinct_keys[variant].add(key)
+        
+        for policy, cache in simulations:
+            key = keys[policy["keys"]]
+            size = REDIS_ENTRY_OVERHEAD + len(key) + args.base_bytes + args.result_bytes * results
+            cache.request(key, size, now)
+    
+    print(f"Replayed {searches} searches ({skipped} not cacheable) in {time.perf_counter() - started:.1f}s")
+    print(", ".join(f"{len(keys)} distinct {variant} keys" for variant, keys in distinct_keys.items()))
+    print()
+    print(f"{'keys':<10} {'ttl':>7} {'max':>8} {'evict':<5} {'hit %':>7} {'upstream':>9} {'evicted':>8} {'peak':>9} {'mean':>9}")
+    
+    results = []
+    for policy, cache in simulations:
+        report = cache.report()
+        results.append({**policy, **report})
+        max_size = format_size(policy["max_bytes"]) if policy["max_bytes"] else "-"
+        hit_ratio = f"{report['hit_ratio'] * 100:7.2f}" if report["hit_ratio"] is not None else f"{'-':>7}"
+        print(
+            f"{policy['keys']:<10} {policy['ttl']:>7g} {max_size:>8} {policy['eviction']:<5} {hit_ratio} "
+            f"{report['upstream_calls']:>9} {report['evictions']:>8} {format_size(report['peak_bytes']):>9} {format_size(report['mean_bytes']):>9}"
+        )
+    
+    revision = git_revision()
+    report = {
+        "meta": {
+            "timestamp": datetime.now(timezone.utc).isoformat(),
+            "git_commit": revision["commit"],
+            "git_dirty": revision["dirty"],
+            "config": {key: value for key, value in vars(args).items() if key != "output"},
+            "searches": searches,
+            "distinct_keys": {variant: len(keys) for variant, keys in distinct_keys.items()},
+        },
+        "policies": results,
+    }
+    
+    output = args.output
+    if not output:
+        stamp = datetime.now().strftime("%Y%m%d-%H%M%S")
+        output = os.path.join("benchmarks", "results", f"cache-{stamp}-{(revision['commit'] or 'unknown')[:8]}.json")
+    
+    os.makedirs(os.path.dirname(output) or ".", exist_ok=True)
+    with open(output, "w") as f:
+        json.dump(report, f, indent=2)
+    
+    print(f"Results written to {output}")
+
+if __name__ == "__main__":
+    main()
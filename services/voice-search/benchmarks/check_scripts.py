@@ -0,0 +1,98 @@
+"""
+Run every Redis Lua script of the app once and check its result.
+
+The benchmark stand-in runs scripts on fakeredis, whose Lua is not the Lua 5.1
+of Redis; a script that only works on one of them fails silently in the app,
+which logs the error and falls back. Run this after changing a script:
+
+    python -m benchmarks.check_scripts
+    python -m benchmarks.check_scripts --real-redis
+    
+Keys are written under a throwaway prefix and deleted afterwards. Exits with
+status 1 if any script fails.
+"""
+import argparse
+import sys
+import time
+import uuid
+from typing import Callable, List, Tuple
+
+def check_fill_recent(redis, prefix: str):
+    from src.services.search_history_service import FILL_RECENT_SCRIPT
+    
+    script = redis.register_script(FILL_RECENT_SCRIPT)
+    keys = [f"{prefix}recent", f"{prefix}latest"]
+    
+    assert script(keys=keys, args=["", 60, "id-2", "entry-2", "entry-1"]) == 1
+    assert redis.lrange(keys[0], 0, -1) == ["entry-2", "entry-1"]
+    assert redis.get(keys[1]) == "id-2"
+    # A search added since the read makes the fill stale
+    assert script(keys=keys, args=["", 60, "id-1", "entry-1"]) == 0
+
+def check_tag_and_invalidate(redis, prefix: str):
+    from src.services.cache_invalidation import INVALIDATE_SCRIPT, TAG_SCRIPT
+    
+    tag = redis.register_script(TAG_SCRIPT)
+    invalidate = redis.register_script(INVALIDATE_SCRIPT)
+    tag_key = f"{prefix}tag"
+    now = int(time.time() * 1000)
+    
+    for name, ttl in (("a", 10), ("b", 30), ("c", 20)):
+        redis.set(f"{prefix}{name}", 1, ex=ttl)
+        tag(keys=[tag_key], args=[f"{prefix}{name}", now + ttl * 1000, now, 2])
+    
+    # Over the cap of 2, the entry expiring soonest is evicted
+    assert redis.zrange(tag_key, 0, -1) == [f"{prefix}c", f"{prefix}b"]
+    assert not redis.exists(f"{prefix}a")
+    assert redis.pttl(tag_key) > 20000
+    
+    assert invalidate(keys=[tag_key]) == 2
+    assert not redis.exists(tag_key, f"{prefix}b", f"{prefix}c")
+
+def check_token_bucket(redis, prefix: str):
+    from src.core.admission import TOKEN_BUCKET_SCRIPT
+    
+    script = redis.register_script(TOKEN_BUCKET_SCRIPT)
+    key = f"{prefix}bucket"
+    
+    assert [script(keys=[key], args=[1, 2]) for _ in range(2)] == [0, 0]
+    assert script(keys=[key], args=[1, 2]) > 0
+
+CHECKS: List[Tuple[str, Callable]] = [
+    ("FILL_RECENT_SCRIPT", check_fill_recent),
+    ("TAG_SCRIPT, INVALIDATE_SCRIPT", check_tag_and_invalidate),
+    ("TOKEN_BUCKET_SCRIPT", check_token_bucket),
+]
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--real-redis", action="store_true", help="Use REDIS_* from the environment instead of fakeredis")
+    args = parser.parse_args()
+    
+    if args.real_redis:
+        from src.core.database import get_redis_client
+        
+        redis = get_redis_client()
+    else:
+        import fakeredis
+        
+        redis = fakeredis.FakeRedis(decode_responses=True)
+    
+    failed = 0
+    for name, check in CHECKS:
+        prefix = f"check_scripts:{uuid.uuid4().hex}:"
+        try:
+            check(redis, prefix)
+            print(f"ok      {name}")
+        except Exception as e:
+            failed += 1
+            print(f"FAILED  {name}: {type(e).__name__} {e}")
+        finally:
+            keys = list(redis.scan_iter(f"{prefix}*"))
+            if keys:
+                redis.delete(*keys)
+    
+    sys.exit(1 if failed else 0)
+
+if __name__ == "__main__":
+    main()
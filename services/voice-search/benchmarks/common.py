@@ -0,0 +1,78 @@
+import io
+import math
+import socket
+import subprocess
+import time
+import wave
+from typing import Dict, List, Optional
+
+import httpx
+
+def percentile(samples: List[float], pct: float) -> Optional[float]:
+    """Get a percentile of a list of samples using the nearest-rank method."""
+    if not samples:
+        return None
+    
+    ordered = sorted(samples)
+    rank = max(1, math.ceil(pct / 100 * len(ordered)))
+    return ordered[rank - 1]
+
+def summarize_latencies(latencies: List[float]) -> Dict[str, Optional[float]]:
+    """Summarize latencies in seconds as milliseconds."""
+    def ms(value: Optional[float]) -> Optional[float]:
+        return round(value * 1000, 3) if value is not None else None
+    
+    return {
+        "mean": ms(sum(latencies) / len(latencies)) if latencies else None,
+        "p50": ms(percentile(latencies, 50)),
+        "p95": ms(percentile(latencies, 95)),
+        "p99": ms(percentile(latencies, 99)),
+        "max": ms(max(latencies)) if latencies else None,
+    }
+
+def free_port() -> int:
+    """Get a free local TCP port."""
+    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+def wait_for_http(url: str, timeout: float = 30.0, status: Optional[int] = None):
+    """Wait until a URL answers an HTTP request, with the given status if one is given."""
+    deadline = time.monotonic() + timeout
+    
+    while time.monotonic() < deadline:
+        try:
+            response = httpx.get(url, timeout=1.0)
+            if status is None or response.status_code == status:
+                return
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.1)
+    
+    raise RuntimeError(f"Timed out waiting for {url}")
+
+def git_revision() -> Dict[str, Optional[str]]:
+    """Get the current git commit and whether the work tree is dirty."""
+    try:
+        commit = subprocess.check_output(["git", "rev-parse", "HEAD"], text=True).strip()
+        dirty = bool(subprocess.check_output(["git", "status", "--porcelain", "--untracked-files=no"], text=True).strip())
+        return {"commit": commit, "dirty": dirty}
+    except (OSError, subprocess.CalledProcessError):
+        return {"commit": None, "dirty": None}
+
+def make_wav(duration: float = 2.0, sample_rate: int = 16000, frequency: float = 220.0) -> bytes:
+    """Build a mono 16-bit PCM WAV tone in memory."""
+    frames = bytearray()
+    
+    for i in range(int(duration * sample_rate)):
+        value = int(8000 * math.sin(2 * math.pi * frequency * i / sample_rate))
+        frames += value.to_bytes(2, "little", signed=True)
+    
+    buffer = io.BytesIO()
+    with wave.open(buffer, "wb") as wav:
+        wav.setnchannels(1)
+        wav.setsampwidth(2)
+        wav.setframerate(sample_rate)
+        wav.writeframes(bytes(frames))
+    
+    return buffer.getvalue()
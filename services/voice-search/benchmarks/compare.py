@@ -0,0 +1,58 @@
+"""
+Compare two load test result files.
+
+Usage:
+    python -m benchmarks.compare benchmarks/results/before.json benchmarks/results/after.json
+"""
+import argparse
+import json
+from typing import Optional
+
+METRICS = [
+    ("throughput_rps", "req/s"),
+    ("p50", "p50 ms"),
+    ("p95", "p95 ms"),
+    ("p99", "p99 ms"),
+]
+
+def change(before: Optional[float], after: Optional[float]) -> str:
+    """Format the relative change between two values."""
+    if not before or after is None:
+        return "n/a"
+    return f"{(after - before) / before * 100:+.1f}%"
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("before")
+    parser.add_argument("after")
+    args = parser.parse_args()
+    
+    with open(args.before) as f:
+        before = json.load(f)
+    with open(args.after) as f:
+        after = json.load(f)
+    
+    print(f"before: {before['meta'].get('git_commit')}  after: {after['meta'].get('git_commit')}")
+    print(f"{'endpoint':<14} {'metric':<7} {'before':>10} {'after':>10} {'change':>8}")
+    
+    for endpoint, result in after["endpoints"].items():
+        previous = before["endpoints"].get(endpoint)
+        if previous is None:
+            continue
+        
+        for key, label in METRICS:
+            if key == "throughput_rps":
+                old, new = previous[key], result[key]
+            else:
+                old, new = previous["latency_ms"][key], result["latency_ms"][key]
+            print(f"{endpoint:<14} {label:<7} {old if old is not None else '-':>10} {new if new is not None else '-':>10} {change(old, new):>8}")
+        
+        errors = f"{previous['errors']} -> {result['errors']}"
+        print(f"{endpoint:<14} {'errors':<7} {errors:>21}")
+        
+        # Older results predate the separate count
+        rate_limited = f"{previous.get('rate_limited', '-')} -> {result.get('rate_limited', '-')}"
+        print(f"{endpoint:<14} {'429s':<7} {rate_limited:>21}")
+
+if __name__ == "__main__":
+    main()
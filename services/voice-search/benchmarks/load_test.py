@@ -0,0 +1,248 @@
+"""
+Load test for the voice search API against local stand-ins.
+
+Starts a stub upstream (benchmarks.stub_upstream) and the app
+(benchmarks.serve_app) as subprocesses, drives /api/text-search,
+/api/voice-search, /api/history and /api/popular at a fixed concurrency, and
+writes throughput and latency percentiles to a JSON file that can be compared
+across commits with benchmarks.compare.
+
+Usage:
+    python -m benchmarks.load_test --concurrency 32 --duration 20
+    python -m benchmarks.load_test --target http://localhost:3006 --endpoints text-search
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import time
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, List, Tuple
+
+import httpx
+import jwt
+
+from benchmarks.common import free_port, git_revision, make_wav, summarize_latencies, wait_for_http
+
+ENDPOINTS = ["text-search", "voice-search", "history", "popular"]
+
+QUERIES = [
+    "python developer", "react native", "logo design", "data pipeline", "wordpress",
+    "machine learning", "devops", "copywriting", "shopify store", "video editing",
+]
+
+def build_request(endpoint: str, args: argparse.Namespace, audio: bytes) -> Callable[[httpx.AsyncClient], Any]:
+    """Build a coroutine function issuing one request to an endpoint."""
+    def pick_query() -> str:
+        return f"{random.choice(QUERIES)} {random.randrange(args.query_pool)}"
+    
+    def pick_type() -> str:
+        return "users" if random.random() < args.users_ratio else "projects"
+    
+    if endpoint == "text-search":
+        async def request(client: httpx.AsyncClient) -> httpx.Response:
+            return await client.post(
+                "/api/text-search",
+                json={"query": pick_query(), "search_type": pick_type(), "page": random.randint(1, args.max_page)},
+            )
+    elif endpoint == "voice-search":
+        async def request(client: httpx.AsyncClient) -> httpx.Response:
+            return await client.post(
+                "/api/voice-search",
+                data={"search_type": pick_type(), "page": str(random.randint(1, args.max_page))},
+                files={"audio_file": ("query.wav", audio, "audio/wav")},
+            )
+    elif endpoint == "history":
+        async def request(client: httpx.AsyncClient) -> httpx.Response:
+            return await client.get("/api/history", params={"limit": 10, "skip": 0})
+    elif endpoint == "popular":
+        async def request(client: httpx.AsyncClient) -> httpx.Response:
+            return await client.get("/api/popular", params={"limit": 10, "days": 7})
+    else:
+        raise ValueError(f"Unknown endpoint: {endpoint}")
+    
+    return request
+
+async def run_phase(
+    base_url: str,
+    endpoint: str,
+    request: Callable[[httpx.AsyncClient], Any],
+    args: argparse.Namespace,
+    headers: Dict[str, str],
+) -> Dict[str, Any]:
+    """Drive one endpoint at the configured concurrency and summarize the results."""
+    latencies: List[float] = []
+    status_codes: Dict[str, int] = {}
+    errors = 0
+    rate_limited = 0
+    
+    limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+    async with httpx.AsyncClient(base_url=base_url, headers=headers, limits=limits, timeout=args.timeout) as client:
+        # Warm up connections and caches without recording
+        warmup_deadline = time.monotonic() + args.warmup
+        
+        async def worker(deadline: float, record: bool):
+            nonlocal errors, rate_limited
+            while time.monotonic() < deadline:
+                start = time.perf_counter()
+                try:
+                    response = await request(client)
+                    code = str(response.status_code)
+                except httpx.HTTPError as e:
+                    code = type(e).__name__
+                
+                if not record:
+                    continue
+                
+                latencies.append(time.perf_counter() - start)
+                status_codes[code] = status_codes.get(code, 0) + 1
+                if code == "429":
+                    rate_limited += 1
+                elif not code.startswith("2"):
+                    errors += 1
+        
+        await asyncio.gather(*(worker(warmup_deadline, False) for _ in range(args.concurrency)))
+        
+        start = time.monotonic()
+        deadline = start + args.duration
+        await asyncio.gather(*(worker(deadline, True) for _ in range(args.concurrency)))
+        elapsed = time.monotonic() - start
+    
+    summary = summarize_latencies(latencies)
+    print(
+        f"{endpoint:>14}: {len(latencies) / elapsed:8.1f} req/s  "
+        f"p50 {summary['p50']} ms  p99 {summary['p99']} ms  errors {errors}  rate limited {rate_limited}"
+    )
+    
+    return {
+        "requests": len(latencies),
+        "errors": errors,
+        "rate_limited": rate_limited,
+        "status_codes": status_codes,
+        "duration_s": round(elapsed, 3),
+        "throughput_rps": round(len(latencies) / elapsed, 2),
+        "latency_ms": summary,
+    }
+
+def start_stand_ins(args: argparse.Namespace) -> Tuple[str, List[subprocess.Popen]]:
+    """Start the stub upstream and the app, returning the app URL and the processes."""
+    upstream_port = free_port()
+    app_port = free_port()
+    upstream_url = f"http://127.0.0.1:{upstream_port}"
+    
+    upstream = subprocess.Popen([
+        sys.executable, "-m", "benchmarks.stub_upstream",
+        "--port", str(upstream_port),
+        "--latency-ms", str(args.upstream_latency_ms),
+        "--jitter-ms", str(args.upstream_jitter_ms),
+        "--slow-ratio", str(args.upstream_slow_ratio),
+        "--slow-ms", str(args.upstream_slow_ms),
+    ])
+    
+    env = dict(os.environ, PROJECTS_SERVICE_URL=upstream_url, AUTH_SERVICE_URL=upstream_url)
+    # All requests come from one benchmark user, who would otherwise mostly get 429s
+    env.setdefault("VOICE_SEARCH_RATE_PER_MINUTE", "0")
+    app_command = [
+        sys.executable, "-m", "benchmarks.serve_app",
+        "--port", str(app_port),
+        "--asr-ms", str(args.asr_ms),
+    ]
+    if args.real_redis:
+        app_command.append("--real-redis")
+    if args.real_mongo:
+        app_command.append("--real-mongo")
+    app = subprocess.Popen(app_command, env=env)
+    
+    processes = [upstream, app]
+    try:
+        wait_for_http(f"{upstream_url}/health")
+        wait_for_http(f"http://127.0.0.1:{app_port}/health")
+    except RuntimeError:
+        stop_processes(processes)
+        raise
+    
+    return f"http://127.0.0.1:{app_port}", processes
+
+def stop_processes(processes: List[subprocess.Popen]):
+    """Terminate stand-in processes."""
+    for process in processes:
+        process.terminate()
+    for process in processes:
+        try:
+            process.wait(timeout=10)
+        except subprocess.TimeoutExpired:
+            process.kill()
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--target", help="Benchmark an already running app instead of starting stand-ins")
+    parser.add_argument("--endpoints", default=",".join(ENDPOINTS), help="Comma-separated endpoints to drive")
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--duration", type=float, default=15.0, help="Measured seconds per endpoint")
+    parser.add_argument("--warmup", type=float, default=3.0, help="Unmeasured seconds per endpoint")
+    parser.add_argument("--timeout", type=float, default=30.0)
+    parser.add_argument("--query-pool", type=int, default=20, help="Distinct query variants; lower means more cache hits")
+    parser.add_argument("--users-ratio", type=float, default=0.3, help="Fraction of searches for users")
+    parser.add_argument("--max-page", type=int, default=3)
+    parser.add_argument("--asr-ms", type=float, default=300.0)
+    parser.add_argument("--upstream-latency-ms", type=float, default=20.0)
+    parser.add_argument("--upstream-jitter-ms", type=float, default=5.0)
+    parser.add_argument("--upstream-slow-ratio", type=float, default=0.01)
+    parser.add_argument("--upstream-slow-ms", type=float, default=800.0)
+    parser.add_argument("--real-redis", action="store_true", help="Use REDIS_* from the environment instead of fakeredis")
+    parser.add_argument("--real-mongo", action="store_true", help="Use MONGO_URI from the environment instead of mongomock")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--output", help="Result file (default: benchmarks/results/<time>-<commit>.json)")
+    args = parser.parse_args()
+    
+    random.seed(args.seed)
+    endpoints = [endpoint.strip() for endpoint in args.endpoints.split(",") if endpoint.strip()]
+    token = jwt.encode({"id": "benchmark-user", "role": "client"}, "benchmark", algorithm="HS256")
+    headers = {"Authorization": f"Bearer {token}"}
+    audio = make_wav()
+    
+    processes: List[subprocess.Popen] = []
+    if args.target:
+        base_url = args.target.rstrip("/")
+    else:
+        base_url, processes = start_stand_ins(args)
+    
+    try:
+        results = {}
+        for endpoint in endpoints:
+            request = build_request(endpoint, args, audio)
+            results[endpoint] = asyncio.run(run_phase(base_url, endpoint, request, args, headers))
+    finally:
+        stop_processes(processes)
+    
+    revision = git_revision()
+    report = {
+        "meta": {
+            "timestamp": datetime.now(timezone.utc).isoformat(),
+            "git_commit": revision["commit"],
+            "git_dirty": revision["dirty"],
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+            "config": {key: value for key, value in vars(args).items() if key != "output"},
+        },
+        "endpoints": results,
+    }
+    
+    output = args.output
+    if not output:
+        stamp = datetime.now().strftime("%Y%m%d-%H%M%S")
+        output = os.path.join("benchmarks", "results", f"{stamp}-{(revision['commit'] or 'unknown')[:8]}.json")
+    
+    os.makedirs(os.path.dirname(output) or ".", exist_ok=True)
+    with open(output, "w") as f:
+        json.dump(report, f, indent=2)
+    
+    print(f"Results written to {output}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,64 @@
+"""
+Run the voice search app against local stand-ins for benchmarking.
+
+Redis and MongoDB are replaced by in-memory fakes (fakeredis, mongomock) unless
+--real-redis / --real-mongo are given, in which case REDIS_* and MONGO_URI
+from the environment are used. Speech recognition is replaced by a stub that
+waits --asr-ms and returns a fixed transcript, so no audio leaves the machine.
+
+Upstream URLs are taken from PROJECTS_SERVICE_URL and AUTH_SERVICE_URL.
+
+Usage:
+    python -m benchmarks.serve_app --port 3906 --asr-ms 300
+"""
+import argparse
+import os
+import time
+
+def install_fakes(real_redis: bool, real_mongo: bool):
+    """Point the app's Redis and MongoDB clients at in-memory fakes."""
+    import src.core.database as database
+    
+    if not real_redis:
+        import fakeredis
+        
+        database._redis_client = fakeredis.FakeRedis(decode_responses=True)
+    
+    if not real_mongo:
+        import mongomock
+        
+        database._mongo_client = mongomock.MongoClient()
+
+def install_stub_recognizer(latency_ms: float, transcript: str):
+    """Replace the Google recognizer call with a fixed-latency stub."""
+    from src.services.speech_recognition import speech_recognition_service
+    
+    def recognize(audio_data, language):
+        time.sleep(latency_ms / 1000)
+        return transcript
+    
+    speech_recognition_service.recognize_fn = recognize
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=3906)
+    parser.add_argument("--asr-ms", type=float, default=300.0, help="Latency of the stub recognizer")
+    parser.add_argument("--transcript", default="python developer")
+    parser.add_argument("--real-redis", action="store_true")
+    parser.add_argument("--real-mongo", action="store_true")
+    args = parser.parse_args()
+    
+    os.environ.setdefault("ENVIRONMENT", "development")
+    os.environ.setdefault("LOG_LEVEL", "WARNING")
+    
+    install_fakes(args.real_redis, args.real_mongo)
+    install_stub_recognizer(args.asr_ms, args.transcript)
+    
+    import uvicorn
+    from src.main import app
+    
+    uvicorn.run(app, host=args.host, port=args.port, log_level="warning")
+
+if __name__ == "__main__":
+    main()
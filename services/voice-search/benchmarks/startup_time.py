@@ -0,0 +1,210 @@
+"""
+Startup-time benchmark for the voice search app.
+
+Imports src.main in fresh interpreters under `python -X importtime` and
+reports the median import time, the packages that contribute most of it and
+whether any module that should be deferred (database drivers, audio
+libraries) was imported eagerly. With --ready it also starts
+benchmarks.serve_app and measures the time until /health answers (live) and
+until /ready reports the warm-up done (ready).
+
+The run fails (exit code 1) when the median import time exceeds --budget-ms,
+when it regresses more than --tolerance percent against a --baseline result,
+or when a deferred module is imported at startup, so it can guard CI.
+
+Usage:
+    python -m benchmarks.startup_time --runs 10
+    python -m benchmarks.startup_time --baseline benchmarks/results/startup-<before>.json --tolerance 15
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from collections import defaultdict
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Tuple
+
+from benchmarks.common import free_port, git_revision, wait_for_http
+
+# Modules that must not be imported by `import src.main`; they load on first use or in the lifespan hook
+DEFERRED_MODULES = ["pymongo", "redis", "speech_recognition"]
+
+SERVICE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+def parse_importtime(output: str) -> Dict[str, Tuple[int, int]]:
+    """Parse `-X importtime` output into {module: (self_us, cumulative_us)}."""
+    modules = {}
+    
+    for line in output.splitlines():
+        if not line.startswith("import time:"):
+            continue
+        fields = line[len("import time:"):].split("|")
+        if len(fields) != 3 or not fields[0].strip().isdigit():
+            continue  # Header line
+        modules[fields[2].strip()] = (int(fields[0]), int(fields[1]))
+    
+    return modules
+
+def import_once(env: Dict[str, str], cwd: str) -> Tuple[float, Dict[str, Tuple[int, int]]]:
+    """Import the app in a fresh interpreter, returning wall time and the import profile."""
+    start = time.perf_counter()
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import src.main"],
+        env=env, cwd=cwd, capture_output=True, text=True,
+    )
+    wall = time.perf_counter() - start
+    
+    if result.returncode != 0:
+        raise RuntimeError(f"Importing src.main failed:\n{result.stderr[-2000:]}")
+    
+    return wall, parse_importtime(result.stderr)
+
+def time_to_ready(env: Dict[str, str], cwd: str) -> Tuple[float, float]:
+    """Start the app with local stand-ins and measure the time until /health answers and until /ready succeeds."""
+    port = free_port()
+    start = time.perf_counter()
+    process = subprocess.Popen(
+        [sys.executable, "-m", "benchmarks.serve_app", "--port", str(port)],
+        env=env, cwd=cwd,
+    )
+    
+    try:
+        wait_for_http(f"http://127.0.0.1:{port}/health", timeout=60.0)
+        live = time.perf_counter() - start
+        wait_for_http(f"http://127.0.0.1:{port}/ready", timeout=60.0, status=200)
+        return live, time.perf_counter() - start
+    finally:
+        process.terminate()
+        process.wait(timeout=10)
+
+def top_packages(profiles: List[Dict[str, Tuple[int, int]]], count: int) -> List[Dict[str, Any]]:
+    """Get the top-level packages with the highest median self time."""
+    per_package: Dict[str, List[int]] = defaultdict(list)
+    
+    for profile in profiles:
+        totals: Dict[str, int] = defaultdict(int)
+        for module, (self_us, _) in profile.items():
+            totals[module.split(".")[0]] += self_us
+        for package, total in totals.items():
+            per_package[package].append(total)
+    
+    ranked = sorted(per_package.items(), key=lambda item: statistics.median(item[1]), reverse=True)
+    return [
+        {"package": package, "self_ms": round(statistics.median(values) / 1000, 2)}
+        for package, values in ranked[:count]
+    ]
+
+def check_regressions(report: Dict[str, Any], args: argparse.Namespace) -> List[str]:
+    """Get the list of failed startup checks."""
+    failures = []
+    import_ms = report["import_ms"]["median"]
+    
+    if args.budget_ms and import_ms > args.budget_ms:
+        failures.append(f"median import time {import_ms} ms exceeds the budget of {args.budget_ms} ms")
+    
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline_ms = json.load(f)["import_ms"]["median"]
+        limit = baseline_ms * (1 + args.tolerance / 100)
+        if import_ms > limit:
+            failures.append(
+                f"median import time {import_ms} ms regressed more than {args.tolerance}% "
+                f"against the baseline of {baseline_ms} ms"
+            )
+    
+    if report["eager_imports"]:
+        failures.append(f"deferred modules imported at startup: {', '.join(report['eager_imports'])}")
+    
+    return failures
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=7, help="Fresh interpreters to import the app in")
+    parser.add_argument("--startup-mode", default="lazy", choices=["lazy", "eager"])
+    parser.add_argument("--top", type=int, default=15, help="Packages to list by import time")
+    parser.add_argument("--ready", action="store_true", help="Also measure the time until /health and /ready answer")
+    parser.add_argument("--budget-ms", type=float, default=0.0, help="Fail if the median import time exceeds this")
+    parser.add_argument("--baseline", help="Earlier startup result to compare against")
+    parser.add_argument("--tolerance", type=float, default=20.0, help="Allowed regression against the baseline, in percent")
+    parser.add_argument("--output", help="Result file (default: benchmarks/results/startup-<time>-<commit>.json)")
+    args = parser.parse_args()
+    
+    env = dict(
+        os.environ,
+        PYTHONPATH=os.pathsep.join(filter(None, [SERVICE_DIR, os.environ.get("PYTHONPATH")])),
+        STARTUP_MODE=args.startup_mode,
+        LOG_LEVEL="WARNING",
+    )
+    
+    walls: List[float] = []
+    imports: List[float] = []
+    profiles: List[Dict[str, Tuple[int, int]]] = []
+    live: List[float] = []
+    ready: List[float] = []
+    
+    # Run from a scratch directory so the app's log files and .env do not affect the measurement
+    with tempfile.TemporaryDirectory() as cwd:
+        for _ in range(args.runs):
+            wall, profile = import_once(env, cwd)
+            walls.append(wall)
+            imports.append(profile["src.main"][1] / 1_000_000)
+            profiles.append(profile)
+        
+        if args.ready:
+            for _ in range(max(1, args.runs // 2)):
+                live_time, ready_time = time_to_ready(env, cwd)
+                live.append(live_time)
+                ready.append(ready_time)
+    
+    def ms(values: List[float]) -> Dict[str, float]:
+        return {"median": round(statistics.median(values) * 1000, 2), "min": round(min(values) * 1000, 2)}
+    
+    imported = set().union(*profiles)
+    revision = git_revision()
+    report = {
+        "meta": {
+            "timestamp": datetime.now(timezone.utc).isoformat(),
+            "git_commit": revision["commit"],
+            "git_dirty": revision["dirty"],
+            "python": sys.version.split()[0],
+            "config": {key: value for key, value in vars(args).items() if key != "output"},
+        },
+        "import_ms": ms(imports),
+        "process_ms": ms(walls),
+        "live_ms": ms(live) if live else None,
+        "ready_ms": ms(ready) if ready else None,
+        "module_count": round(statistics.median(len(profile) for profile in profiles)),
+        "eager_imports": [module for module in DEFERRED_MODULES if module in imported],
+        "top_packages": top_packages(profiles, args.top),
+    }
+    
+    print(f"import src.main: {report['import_ms']['median']} ms (median of {args.runs}), "
+          f"process: {report['process_ms']['median']} ms, modules: {report['module_count']}")
+    if report["ready_ms"]:
+        print(f"time to /health: {report['live_ms']['median']} ms, to /ready: {report['ready_ms']['median']} ms")
+    for package in report["top_packages"]:
+        print(f"  {package['package']:<28} {package['self_ms']:8.2f} ms")
+    
+    output = args.output
+    if not output:
+        stamp = datetime.now().strftime("%Y%m%d-%H%M%S")
+        output = os.path.join("benchmarks", "results", f"startup-{stamp}-{(revision['commit'] or 'unknown')[:8]}.json")
+    
+    os.makedirs(os.path.dirname(output) or ".", exist_ok=True)
+    with open(output, "w") as f:
+        json.dump(report, f, indent=2)
+    
+    print(f"Results written to {output}")
+    
+    failures = check_regressions(report, args)
+    for failure in failures:
+        print(f"FAIL: {failure}", file=sys.stderr)
+    if failures:
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
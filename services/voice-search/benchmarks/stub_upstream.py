@@ -0,0 +1,103 @@
+"""
+Stand-in for the projects and auth services with configurable latency.
+
+Usage:
+    python -m benchmarks.stub_upstream --port 3902 --latency-ms 20 --slow-ratio 0.01 --slow-ms 800
+"""
+import argparse
+import asyncio
+import random
+
+import uvicorn
+from fastapi import FastAPI, Query
+from fastapi.responses import JSONResponse
+
+def create_app(
+    latency_ms: float,
+    jitter_ms: float,
+    slow_ratio: float,
+    slow_ms: float,
+    error_ratio: float,
+    items: int,
+    total: int,
+) -> FastAPI:
+    """Create the stub upstream application."""
+    app = FastAPI()
+    
+    async def delay():
+        if random.random() < slow_ratio:
+            await asyncio.sleep(slow_ms / 1000)
+        else:
+            await asyncio.sleep(max(0.0, random.gauss(latency_ms, jitter_ms)) / 1000)
+    
+    def pagination(page: int, limit: int) -> dict:
+        return {"total": total, "page": page, "limit": limit, "pages": -(-total // limit)}
+    
+    @app.get("/api/projects")
+    async def search_projects(search: str = "", page: int = Query(1), limit: int = Query(10)):
+        await delay()
+        if random.random() < error_ratio:
+            return JSONResponse(status_code=500, content={"success": False, "message": "Stub error"})
+        
+        projects = [
+            {
+                "_id": f"p{page}-{i}",
+                "title": f"{search.title()} project {i}",
+                "description": "Build and maintain a service for a growing marketplace. " * 4,
+                "category": random.choice(["web", "mobile", "data", "design"]),
+                "skills": ["python", "fastapi", "mongodb"],
+                "budget": {"min": 500, "max": 2500},
+                "status": "open",
+            }
+            for i in range(min(limit, items))
+        ]
+        return {"success": True, "data": {"projects": projects, "pagination": pagination(page, limit)}}
+    
+    @app.get("/api/auth/users/search")
+    async def search_users(search: str = "", page: int = Query(1), limit: int = Query(10)):
+        await delay()
+        
+        users = [
+            {
+                "_id": f"u{page}-{i}",
+                "name": f"{search.title()} Freelancer {i}",
+                "role": "freelancer",
+                "skills": ["python", "react", "aws"],
+                "bio": "Experienced engineer available for remote work. " * 3,
+            }
+            for i in range(min(limit, items))
+        ]
+        return {"success": True, "data": {"users": users, "pagination": pagination(page, limit)}}
+    
+    @app.get("/health")
+    async def health():
+        return {"status": "healthy"}
+    
+    return app
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=3902)
+    parser.add_argument("--latency-ms", type=float, default=20.0)
+    parser.add_argument("--jitter-ms", type=float, default=5.0)
+    parser.add_argument("--slow-ratio", type=float, default=0.0, help="Fraction of responses delayed by --slow-ms")
+    parser.add_argument("--slow-ms", type=float, default=1000.0)
+    parser.add_argument("--error-ratio", type=float, default=0.0, help="Fraction of project searches answering 500")
+    parser.add_argument("--items", type=int, default=10, help="Items per result page")
+    parser.add_argument("--total", type=int, default=250, help="Total results reported in pagination")
+    args = parser.parse_args()
+    
+    app = create_app(
+        latency_ms=args.latency_ms,
+        jitter_ms=args.jitter_ms,
+        slow_ratio=args.slow_ratio,
+        slow_ms=args.slow_ms,
+        error_ratio=args.error_ratio,
+        items=args.items,
+        total=args.total,
+    )
+    uvicorn.run(app, host=args.host, port=args.port, log_level="warning")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,43 @@
+"""
+Gunicorn configuration for running the voice search service in production.
+
+Usage:
+    gunicorn -c gunicorn.conf.py src.main:app
+"""
+import os
+import shutil
+
+from src.core.config import settings
+
+# Per-worker metric files, aggregated by /metrics. Must be set before prometheus_client is imported.
+metrics_dir = os.environ.setdefault("PROMETHEUS_MULTIPROC_DIR", settings.METRICS_MULTIPROC_DIR)
+shutil.rmtree(metrics_dir, ignore_errors=True)
+os.makedirs(metrics_dir, exist_ok=True)
+
+from src.core.metrics import mark_worker_dead  # noqa: E402
+from src.core.workers import available_cpus, preload, reset_after_fork  # noqa: E402
+
+bind = f"{settings.HOST}:{settings.PORT}"
+worker_class = "uvicorn.workers.UvicornWorker"
+workers = settings.WORKERS or available_cpus()
+
+# Import the app in the master so workers share its memory copy-on-write
+preload_app = True
+
+# Recycle workers after a number of requests (jittered so they do not restart together)
+max_requests = settings.WORKER_MAX_REQUESTS
+max_requests_jitter = settings.WORKER_MAX_REQUESTS_JITTER
+
+timeout = settings.WORKER_TIMEOUT
+graceful_timeout = settings.WORKER_GRACEFUL_TIMEOUT
+keepalive = settings.WORKER_KEEPALIVE
+
+def when_ready(server):
+    preload()
+    server.log.info("Starting %s workers", server.num_workers)
+
+def post_fork(server, worker):
+    reset_after_fork()
+
+def child_exit(server, worker):
+    mark_worker_dead(worker.pid)
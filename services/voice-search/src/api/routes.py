@@ -1,8 +1,14 @@
-from fastapi import APIRouter, Depends, File, Form, UploadFile, Query
+from fastapi import APIRouter, Depends, File, Form, Header, UploadFile, Query
+from fastapi.responses import JSONResponse, Response
 from typing import List, Optional, Dict, Any
+import asyncio
+import json
 import logging
 
+from src.core.admission import voice_search_limiter
 from src.core.auth import jwt_auth
+from src.core.etag import etag_matches, not_modified
+from src.core.exceptions import BadRequestException
 from src.models.search import (
     VoiceSearchRequest,
     TextSearchRequest,
@@ -10,14 +16,52 @@ from src.models.search import (
     SearchHistoryEntry,
     PopularSearch,
 )
+from src.services.job_service import job_view, voice_search_job_service
 from src.services.speech_recognition import speech_recognition_service
-from src.services.search_service import search_service
+from src.services.search_service import RawSearchResult, search_service
 from src.services.search_history_service import search_history_service
+from src.services.trending_service import trending_service
+from src.services.voice_search_service import INVALID_SEARCH_TYPE, run_voice_search
 
 logger = logging.getLogger(__name__)
 
 router = APIRouter()
 
+def search_response(
+    message: str,
+    query: str,
+    results: RawSearchResult,
+    extra: Optional[Dict[str, Any]] = None,
+    etag: Optional[str] = None,
+) -> Response:
+    """
+    Build a search response by splicing the raw upstream JSON into the envelope.
+    
+    The results are neither decoded nor validated against SearchResponse;
+    they were validated as JSON when they were fetched from the upstream.
+    
+    Args:
+        message: Response message
+        query: Search query
+        results: Raw search result
+        extra: Additional fields of the response data
+        etag: ETag of the response
+        
+    Returns:
+        JSON response
+    """
+    extra_fields = b"".join(
+        json.dumps(key).encode() + b":" + json.dumps(value).encode() + b","
+        for key, value in (extra or {}).items()
+    )
+    body = b"".join([
+        b'{"success":true,"message":', json.dumps(message).encode(),
+        b',"data":{', extra_fields, b'"query":', json.dumps(query).encode(),
+        b',"results":', results.body,
+        b"}}",
+    ])
+    return Response(content=body, media_type="application/json", headers={"ETag": etag} if etag else None)
+
 @router.post("/voice-search", response_model=SearchResponse)
 async def voice_search(
     search_type: str = Form(...),
@@ -29,6 +73,8 @@ async def voice_search(
     role: Optional[str] = Form(None),
     page: int = Form(1),
     limit: int = Form(10),
+    job: bool = Form(False),
+    idempotency_key: Optional[str] = Header(None, alias="Idempotency-Key"),
     user: Dict[str, Any] = Depends(jwt_auth),
 ):
     """
@@ -43,80 +89,81 @@ async def voice_search(
     - **role**: User role (for user search)
     - **page**: Page number
     - **limit**: Items per page
+    - **job**: Run as a background job and return its ID immediately (poll /voice-search/jobs/{id})
+    - **Idempotency-Key** (header): Retries of a job submission with the same key return the same job
     """
-    # Get file extension
+    # Get file extension (only a hint; the format is detected from the contents)
     file_extension = audio_file.filename.split(".")[-1].lower()
     
-    # Recognize speech
-    query = speech_recognition_service.recognize_from_file(
-        audio_file.file, file_extension
-    )
-    
-    logger.info(f"Recognized query: {query}")
+    # Shed excess load before spending resources on recognition
+    voice_search_limiter.check(user["id"])
     
     # Parse skills
     skills_list = None
     if skills:
         skills_list = [s.strip() for s in skills.split(",") if s.strip()]
     
-    # Perform search
-    if search_type == "projects":
-        results = await search_service.search_projects(
-            query=query,
-            category=category,
-            skills=skills_list,
-            budget_min=budget_min,
-            budget_max=budget_max,
-            page=page,
-            limit=limit,
-            token=user.get("token"),
+    request = VoiceSearchRequest(
+        search_type=search_type,
+        category=category,
+        skills=skills_list,
+        budget_min=budget_min,
+        budget_max=budget_max,
+        role=role,
+        page=page,
+        limit=limit,
+    )
+    
+    audio_bytes = await asyncio.to_thread(speech_recognition_service.read_audio, audio_file.file)
+    
+    if job:
+        if not voice_search_job_service.enabled:
+            raise BadRequestException(message="Voice search jobs are disabled")
+        
+        job_state, created = voice_search_job_service.submit(
+            user, request, audio_bytes, file_extension, idempotency_key=idempotency_key
         )
-    elif search_type == "users":
-        results = await search_service.search_users(
-            query=query,
-            role=role,
-            skills=skills_list,
-            page=page,
-            limit=limit,
-            token=user.get("token"),
+        
+        return JSONResponse(
+            status_code=202 if created else 200,
+            content={
+                "success": True,
+                "message": "Voice search job queued" if created else "Voice search job already submitted",
+                "data": job_state,
+            },
+            headers={"Location": f"/api/voice-search/jobs/{job_state['jobId']}"},
         )
-    else:
-        results = {"error": "Invalid search type"}
     
-    # Save search history
-    filters = {
-        "category": category,
-        "skills": skills_list,
-        "budget_min": budget_min,
-        "budget_max": budget_max,
-        "role": role,
-        "page": page,
-        "limit": limit,
-    }
+    query, results = await run_voice_search(user, request, audio_bytes, file_extension)
     
-    results_count = results.get("data", {}).get("pagination", {}).get("total", 0)
+    return search_response("Voice search successful", query, results)
+
+@router.get("/voice-search/jobs/{job_id}", response_model=Dict[str, Any])
+async def get_voice_search_job(
+    job_id: str,
+    user: Dict[str, Any] = Depends(jwt_auth),
+):
+    """
+    Get the status of a voice search job, and its results once it succeeded.
     
-    await search_history_service.add_search(
-        user_id=user["id"],
-        query=query,
-        search_type=search_type,
-        filters=filters,
-        results_count=results_count,
-        source="voice",
-    )
+    - **job_id**: Job ID returned when the job was submitted
+    """
+    job = voice_search_job_service.get(job_id, user["id"])
+    
+    if job["status"] == "succeeded":
+        results = RawSearchResult(job["results"].encode(), int(job["total"]), False)
+        return search_response("Voice search job succeeded", job["query"], results, extra=job_view(job))
     
     return {
         "success": True,
-        "message": "Voice search successful",
-        "data": {
-            "query": query,
-            "results": results,
-        },
+        "message": f"Voice search job {job['status']}",
+        "data": job_view(job),
     }
 
 @router.post("/text-search", response_model=SearchResponse)
 async def text_search(
     request: TextSearchRequest,
+    if_none_match: Optional[str] = Header(None, alias="If-None-Match"),
     user: Dict[str, Any] = Depends(jwt_auth),
 ):
     """
@@ -131,10 +178,11 @@ async def text_search(
     - **role**: User role (for user search)
     - **page**: Page number
     - **limit**: Items per page
+    - **If-None-Match** (header): ETag of a previous response; answered with 304 if the results are unchanged
     """
     # Perform search
     if request.search_type == "projects":
-        results = await search_service.search_projects(
+        results = await search_service.search_projects_raw(
             query=request.query,
             category=request.category,
             skills=request.skills,
@@ -145,7 +193,7 @@ async def text_search(
             token=user.get("token"),
         )
     elif request.search_type == "users":
-        results = await search_service.search_users(
+        results = await search_service.search_users_raw(
             query=request.query,
             role=request.role,
             skills=request.skills,
@@ -154,7 +202,7 @@ async def text_search(
             token=user.get("token"),
         )
     else:
-        results = {"error": "Invalid search type"}
+        results = INVALID_SEARCH_TYPE
     
     # Save search history
     filters = {
@@ -167,31 +215,28 @@ async def text_search(
         "limit": request.limit,
     }
     
-    results_count = results.get("data", {}).get("pagination", {}).get("total", 0)
-    
     await search_history_service.add_search(
         user_id=user["id"],
         query=request.query,
         search_type=request.search_type,
         filters=filters,
-        results_count=results_count,
+        results_count=results.total,
         source="text",
     )
     
-    return {
-        "success": True,
-        "message": "Text search successful",
-        "data": {
-            "query": request.query,
-            "results": results,
-        },
-    }
+    # The search still counts in the history when the client's copy is current
+    if etag_matches(if_none_match, results.etag):
+        return not_modified("text_search", results.etag)
+    
+    return search_response("Text search successful", request.query, results, etag=results.etag)
 
 @router.get("/history", response_model=Dict[str, Any])
 async def get_search_history(
+    response: Response,
     limit: int = Query(10, ge=1, le=100),
     skip: int = Query(0, ge=0),
     search_type: Optional[str] = Query(None),
+    if_none_match: Optional[str] = Header(None, alias="If-None-Match"),
     user: Dict[str, Any] = Depends(jwt_auth),
 ):
     """
@@ -200,7 +245,15 @@ async def get_search_history(
     - **limit**: Maximum number of entries
     - **skip**: Number of entries to skip
     - **search_type**: Type of search (projects, users)
+    - **If-None-Match** (header): ETag of a previous response; answered with 304 if the history is unchanged
     """
+    etag = search_history_service.history_etag(user["id"], limit=limit, skip=skip, search_type=search_type)
+    if etag_matches(if_none_match, etag):
+        return not_modified("history", etag)
+    
+    if etag:
+        response.headers["ETag"] = etag
+    
     history = await search_history_service.get_user_history(
         user_id=user["id"],
         limit=limit,
@@ -226,6 +279,7 @@ async def get_popular_searches(
     limit: int = Query(10, ge=1, le=100),
     search_type: Optional[str] = Query(None),
     days: int = Query(7, ge=1, le=30),
+    if_none_match: Optional[str] = Header(None, alias="If-None-Match"),
     user: Dict[str, Any] = Depends(jwt_auth),
 ):
     """
@@ -234,17 +288,45 @@ async def get_popular_searches(
     - **limit**: Maximum number of entries
     - **search_type**: Type of search (projects, users)
     - **days**: Number of days to look back
+    - **If-None-Match** (header): ETag of a previous response; answered with 304 if the list is unchanged
     """
-    popular = await search_history_service.get_popular_searches(
+    popular = await search_history_service.get_popular_searches_raw(
         limit=limit,
         search_type=search_type,
         days=days,
     )
     
+    if etag_matches(if_none_match, popular.etag):
+        return not_modified("popular", popular.etag)
+    
+    # Splice the cached JSON into the envelope without decoding it
+    body = b"".join([
+        b'{"success":true,"message":"Popular searches retrieved successfully","data":{"popular":',
+        popular.body,
+        b"}}",
+    ])
+    return Response(content=body, media_type="application/json", headers={"ETag": popular.etag})
+
+@router.get("/trending", response_model=Dict[str, Any])
+async def get_trending_searches(
+    limit: int = Query(10, ge=1, le=50),
+    search_type: Optional[str] = Query(None),
+    user: Dict[str, Any] = Depends(jwt_auth),
+):
+    """
+    Get searches trending in the last few minutes.
+    
+    Answered from memory; scores decay with TRENDING_HALF_LIFE.
+    
+    - **limit**: Maximum number of entries
+    - **search_type**: Type of search (projects, users)
+    """
+    trending = trending_service.top(limit=limit, search_type=search_type)
+    
     return {
         "success": True,
-        "message": "Popular searches retrieved successfully",
+        "message": "Trending searches retrieved successfully",
         "data": {
-            "popular": popular,
+            "trending": trending,
         },
     }
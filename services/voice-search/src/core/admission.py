@@ -0,0 +1,181 @@
+import asyncio
+import logging
+import math
+import time
+from contextlib import asynccontextmanager
+from typing import Any, Dict
+
+from src.core.config import settings
+from src.core.database import get_redis_client
+from src.core.exceptions import ServiceUnavailableException, TooManyRequestsException
+from src.core.metrics import RECOGNITIONS_QUEUED, REJECTED_UPLOADS, track_stage
+from src.core.resilience import LatencyTracker
+
+logger = logging.getLogger(__name__)
+
+# Refills and takes from a token bucket stored as a hash; returns 0 if a token
+# was taken, otherwise the milliseconds until one is available. Uses the Redis
+# clock so every worker and host shares the same time.
+TOKEN_BUCKET_SCRIPT = """
+local rate = tonumber(ARGV[1])
+local capacity = tonumber(ARGV[2])
+local now_parts = redis.call('TIME')
+local now = tonumber(now_parts[1]) + tonumber(now_parts[2]) / 1000000
+local state = redis.call('HMGET', KEYS[1], 'tokens', 'ts')
+local tokens = tonumber(state[1]) or capacity
+local ts = tonumber(state[2]) or now
+tokens = math.min(capacity, tokens + math.max(0, now - ts) * rate)
+local retry_ms = 0
+if tokens >= 1 then
+    tokens = tokens - 1
+else
+    retry_ms = math.ceil((1 - tokens) / rate * 1000)
+end
+redis.call('HSET', KEYS[1], 'tokens', tostring(tokens), 'ts', tostring(now))
+redis.call('PEXPIRE', KEYS[1], math.ceil(capacity / rate * 1000))
+return retry_ms
+"""
+
+def retry_after_header(seconds: float) -> Dict[str, str]:
+    """Get a Retry-After header rounded up to whole seconds."""
+    return {"Retry-After": str(max(1, math.ceil(seconds)))}
+
+class TokenBucketLimiter:
+    """Per-user token bucket rate limit shared by all workers through Redis."""
+    
+    def __init__(self, name: str, rate_per_minute: float, burst: int):
+        self.name = name
+        self.rate = rate_per_minute / 60
+        self.burst = burst
+        self._script = None
+    
+    @property
+    def redis(self):
+        """Redis client, connected on first use."""
+        return get_redis_client()
+    
+    def _key(self, user_id: str) -> str:
+        return f"{settings.REDIS_PREFIX}ratelimit:{self.name}:{user_id}"
+    
+    def check(self, user_id: str):
+        """
+        Take a token from a user's bucket.
+        
+        Redis errors let the request through; the recognition queue still
+        bounds the load.
+        
+        Args:
+            user_id: User ID
+            
+        Raises:
+            TooManyRequestsException: If the bucket is empty
+        """
+        if self.rate <= 0:
+            return
+        
+        try:
+            if self._script is None:
+                self._script = self.redis.register_script(TOKEN_BUCKET_SCRIPT)
+            retry_ms = int(self._script(keys=[self._key(user_id)], args=[self.rate, self.burst]))
+        except Exception as e:
+            logger.warning(f"Rate limit check failed, allowing request: {e}")
+            return
+        
+        if retry_ms > 0:
+            REJECTED_UPLOADS.labels("rate_limited").inc()
+            raise TooManyRequestsException(
+                message="Too many voice searches, please retry later",
+                details={"reason": "rate_limited"},
+                headers=retry_after_header(retry_ms / 1000),
+            )
+    
+    def reset(self):
+        """Drop the script handle bound to a client inherited from a parent process."""
+        self._script = None
+
+class RecognitionQueue:
+    """
+    Bounded admission queue in front of speech recognition.
+    
+    At most `max_concurrency` recognitions run at once and at most
+    `max_queue` requests wait for a slot, each for up to `max_wait` seconds.
+    Requests beyond that are rejected immediately instead of piling up.
+    """
+    
+    def __init__(self, max_concurrency: int, max_queue: int, max_wait: float):
+        self.max_concurrency = max_concurrency
+        self.max_queue = max_queue
+        self.max_wait = max_wait
+        self.active = 0
+        self.waiting = 0
+        self.rejected = 0
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        self._durations = LatencyTracker(100)
+    
+    def retry_after(self) -> float:
+        """Estimate in seconds how long until the current backlog drains."""
+        duration = self._durations.percentile(50) or self.max_wait
+        return duration * (self.waiting + 1) / self.max_concurrency
+    
+    def _reject(self, reason: str, message: str):
+        self.rejected += 1
+        REJECTED_UPLOADS.labels(reason).inc()
+        raise ServiceUnavailableException(
+            message=message,
+            details={"reason": reason},
+            headers=retry_after_header(self.retry_after()),
+        )
+    
+    @asynccontextmanager
+    async def slot(self, background: bool = False):
+        """
+        Hold a recognition slot for the duration of the block, waiting in the queue if needed.
+        
+        Args:
+            background: Wait for a slot without a deadline and regardless of the queue length,
+                for work that has no client waiting on it (its own concurrency is bounded)
+        """
+        if not background and self.active + self.waiting >= self.max_concurrency + self.max_queue:
+            self._reject("queue_full", "Speech recognition is overloaded, please retry later")
+        
+        self.waiting += 1
+        RECOGNITIONS_QUEUED.inc()
+        try:
+            with track_stage("queue_wait"):
+                await asyncio.wait_for(self._semaphore.acquire(), timeout=None if background else self.max_wait)
+        except asyncio.TimeoutError:
+            self._reject("queue_timeout", "Speech recognition is overloaded, please retry later")
+        finally:
+            self.waiting -= 1
+            RECOGNITIONS_QUEUED.dec()
+        
+        self.active += 1
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self._durations.record(time.perf_counter() - start)
+            self.active -= 1
+            self._semaphore.release()
+    
+    def status(self) -> Dict[str, Any]:
+        """Get a snapshot of the queue for health reporting."""
+        return {
+            "active": self.active,
+            "waiting": self.waiting,
+            "max_concurrency": self.max_concurrency,
+            "max_queue": self.max_queue,
+            "rejected": self.rejected,
+        }
+
+# Create admission control instances
+voice_search_limiter = TokenBucketLimiter(
+    "voice_search",
+    rate_per_minute=settings.VOICE_SEARCH_RATE_PER_MINUTE,
+    burst=settings.VOICE_SEARCH_BURST,
+)
+recognition_queue = RecognitionQueue(
+    max_concurrency=settings.RECOGNITION_MAX_CONCURRENCY,
+    max_queue=settings.RECOGNITION_MAX_QUEUE,
+    max_wait=settings.RECOGNITION_QUEUE_TIMEOUT,
+)
@@ -0,0 +1,201 @@
+import io
+import os
+import subprocess
+import tempfile
+import wave
+from typing import List, NamedTuple, Optional
+
+# RMS level below which a window always counts as silence (about -50 dBFS)
+SILENCE_FLOOR = 100.0
+
+# Formats whose container must be seekable to decode (the index may follow the audio)
+SEEKABLE_FORMATS = {"mp4"}
+
+# ffmpeg demuxer for each sniffed format; formats not listed are probed by ffmpeg
+FFMPEG_DEMUXERS = {
+    "wav": "wav",
+    "flac": "flac",
+    "opus": "ogg",
+    "ogg": "ogg",
+    "webm": "matroska",
+    "mp3": "mp3",
+    "aiff": "aiff",
+    "amr": "amr",
+}
+
+class AudioDecodeError(Exception):
+    """Raised when audio cannot be decoded."""
+
+class DecoderNotFoundError(AudioDecodeError):
+    """Raised when ffmpeg is not installed."""
+
+def sniff_audio_format(data: bytes) -> Optional[str]:
+    """
+    Detect an audio format from the magic bytes at the start of a file.
+    
+    Args:
+        data: Audio file contents (the first 64 bytes are enough)
+        
+    Returns:
+        Format name (wav, flac, opus, ogg, webm, mp3, mp4, aiff, amr), or None if unknown
+    """
+    if data[:4] == b"RIFF" and data[8:12] == b"WAVE":
+        return "wav"
+    
+    if data[:4] == b"fLaC":
+        return "flac"
+    
+    if data[:4] == b"OggS":
+        # The first page of an Ogg stream holds the codec identification header
+        return "opus" if data[28:36] == b"OpusHead" else "ogg"
+    
+    if data[:4] == b"\x1a\x45\xdf\xa3":
+        return "webm"
+    
+    if data[4:8] == b"ftyp":
+        return "mp4"
+    
+    if data[:4] == b"FORM" and data[8:12] in (b"AIFF", b"AIFC"):
+        return "aiff"
+    
+    if data[:5] == b"#!AMR":
+        return "amr"
+    
+    if data[:3] == b"ID3" or (len(data) > 1 and data[0] == 0xFF and data[1] & 0xE0 == 0xE0):
+        return "mp3"
+    
+    return None
+
+def read_pcm_wav(data: bytes, sample_rate: int) -> Optional[bytes]:
+    """
+    Get the samples of a WAV file that is already 16-bit mono PCM at the target rate.
+    
+    Args:
+        data: WAV file contents
+        sample_rate: Target sample rate in Hz
+        
+    Returns:
+        Raw 16-bit little-endian samples, or None if the file needs converting
+    """
+    try:
+        with wave.open(io.BytesIO(data), "rb") as wav:
+            if (wav.getnchannels(), wav.getsampwidth(), wav.getframerate()) != (1, 2, sample_rate):
+                return None
+            
+            return wav.readframes(wav.getnframes())
+    except (wave.Error, EOFError):
+        return None
+
+def decode_to_pcm(data: bytes, audio_format: Optional[str], sample_rate: int, timeout: float) -> bytes:
+    """
+    Decode audio to 16-bit mono PCM at a sample rate with ffmpeg, in memory.
+    
+    Args:
+        data: Audio file contents
+        audio_format: Sniffed format, or None to let ffmpeg probe the input
+        sample_rate: Target sample rate in Hz
+        timeout: Maximum decoding time in seconds
+        
+    Returns:
+        Raw 16-bit little-endian samples
+        
+    Raises:
+        AudioDecodeError: If ffmpeg is missing, fails or times out
+    """
+    command = ["ffmpeg", "-nostdin", "-hide_banner", "-loglevel", "error"]
+    if audio_format in FFMPEG_DEMUXERS:
+        command += ["-f", FFMPEG_DEMUXERS[audio_format]]
+    
+    temp_path = None
+    try:
+        if audio_format in SEEKABLE_FORMATS:
+            with tempfile.NamedTemporaryFile(suffix=f".{audio_format}", delete=False) as temp_file:
+                temp_file.write(data)
+                temp_path = temp_file.name
+            command += ["-i", temp_path]
+            stdin = None
+        else:
+            command += ["-i", "pipe:0"]
+            stdin = data
+        
+        command += ["-vn", "-f", "s16le", "-acodec", "pcm_s16le", "-ac", "1", "-ar", str(sample_rate), "pipe:1"]
+        result = subprocess.run(command, input=stdin, capture_output=True, timeout=timeout)
+    except FileNotFoundError:
+        raise DecoderNotFoundError("ffmpeg is not installed")
+    except subprocess.TimeoutExpired:
+        raise AudioDecodeError(f"Decoding took longer than {timeout:g}s")
+    finally:
+        if temp_path and os.path.exists(temp_path):
+            os.unlink(temp_path)
+    
+    if result.returncode != 0:
+        message = result.stderr.decode("utf-8", "replace").strip().splitlines()
+        raise AudioDecodeError(message[-1] if message else f"ffmpeg exited with status {result.returncode}")
+    
+    return result.stdout
+
+class PcmSegment(NamedTuple):
+    """Slice of 16-bit mono PCM audio."""
+    
+    frames: bytes
+    overlaps_previous: bool  # Starts before the end of the previous segment
+
+def split_at_silence(
+    frames: bytes,
+    sample_rate: int,
+    max_seconds: float,
+    overlap_seconds: float,
+    window_ms: int = 20,
+) -> List[PcmSegment]:
+    """
+    Split 16-bit mono PCM audio into segments of at most `max_seconds` at quiet points.
+    
+    Each cut is placed at the quietest window in the second half of the
+    segment. When even that window is not silent (the cut may fall inside a
+    word), both neighbouring segments extend `overlap_seconds` past the cut
+    so the word is heard whole by at least one of them.
+    
+    Args:
+        frames: Raw 16-bit little-endian samples
+        sample_rate: Sample rate in Hz
+        max_seconds: Maximum segment duration in seconds
+        overlap_seconds: Overlap added around cuts outside silence
+        window_ms: Energy window length in milliseconds
+        
+    Returns:
+        Segments in order; a single segment if the audio is short enough
+    """
+    max_samples = int(max_seconds * sample_rate)
+    
+    if max_samples <= 0 or len(frames) // 2 <= max_samples:
+        return [PcmSegment(frames, False)]
+    
+    import numpy as np
+    
+    samples = np.frombuffer(frames, dtype="<i2")
+    
+    # RMS energy per window; silence is relative to the quietest tenth of the clip
+    window = max(1, sample_rate * window_ms // 1000)
+    windows = len(samples) // window
+    energy = np.sqrt(np.mean(samples[:windows * window].reshape(windows, window).astype(np.float64) ** 2, axis=1))
+    silence_level = max(2 * float(np.percentile(energy, 10)), SILENCE_FLOOR)
+    
+    overlap = int(overlap_seconds * sample_rate)
+    max_windows = max(2, max_samples // window)
+    segments = []
+    start = 0
+    start_overlap = 0
+    
+    while len(samples) - start > max_samples:
+        first = start // window + max_windows // 2
+        last = start // window + max_windows
+        cut_window = first + int(np.argmin(energy[first:last]))
+        cut = cut_window * window + window // 2
+        cut_overlap = 0 if energy[cut_window] <= silence_level else overlap
+        
+        segments.append(PcmSegment(samples[max(0, start - start_overlap):cut + cut_overlap].tobytes(), start_overlap > 0))
+        start, start_overlap = cut, cut_overlap
+    
+    segments.append(PcmSegment(samples[max(0, start - start_overlap):].tobytes(), start_overlap > 0))
+    
+    return segments
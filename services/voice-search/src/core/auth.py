@@ -1,4 +1,9 @@
+import hashlib
 import logging
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+
 import jwt
 from fastapi import Depends, Request
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
@@ -11,9 +16,71 @@ logger = logging.getLogger(__name__)
 # JWT security scheme
 security = HTTPBearer()
 
+# Algorithms accepted for incoming tokens
+ALLOWED_ALGORITHMS = ["RS256", "HS256"]  # Support both algorithms for development
+
+class VerifiedTokenCache:
+    """Bounded LRU of verified token claims keyed by token digest."""
+    
+    def __init__(self, max_size: int, ttl: int):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._entries: "OrderedDict[bytes, Tuple[float, Dict[str, Any]]]" = OrderedDict()
+    
+    @staticmethod
+    def _key(token: str) -> bytes:
+        return hashlib.sha256(token.encode()).digest()
+    
+    def get(self, token: str) -> Optional[Dict[str, Any]]:
+        """Get cached claims for a token, or None if missing or expired."""
+        key = self._key(token)
+        entry = self._entries.get(key)
+        
+        if entry is None:
+            return None
+        
+        expires_at, claims = entry
+        if time.time() >= expires_at:
+            del self._entries[key]
+            return None
+        
+        self._entries.move_to_end(key)
+        return claims
+    
+    def set(self, token: str, claims: Dict[str, Any]):
+        """Cache verified claims until the cache TTL or the token's exp, whichever is sooner."""
+        if self.max_size <= 0:
+            return
+        
+        expires_at = time.time() + self.ttl
+        exp = claims.get("exp")
+        if isinstance(exp, (int, float)):
+            expires_at = min(expires_at, exp)
+        
+        if expires_at <= time.time():
+            return
+        
+        key = self._key(token)
+        self._entries[key] = (expires_at, claims)
+        self._entries.move_to_end(key)
+        
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+    
+    def clear(self):
+        """Remove all cached claims."""
+        self._entries.clear()
+
 class JWTBearer:
     """JWT bearer authentication."""
     
+    def __init__(self):
+        self.cache = VerifiedTokenCache(
+            max_size=settings.JWT_CACHE_SIZE,
+            ttl=settings.JWT_CACHE_TTL,
+        )
+        self._keys: Dict[str, Any] = {}
+    
     async def __call__(
         self, 
         request: Request, 
@@ -28,14 +95,43 @@ class JWTBearer:
         
         return self.verify_jwt(credentials.credentials)
     
+    def get_key(self, algorithm: str) -> Any:
+        """
+        Get the verification key for an algorithm, parsing it only once.
+        
+        Args:
+            algorithm: JWT algorithm name
+            
+        Returns:
+            Prepared key object, or the raw key if it cannot be prepared
+        """
+        if algorithm not in self._keys:
+            try:
+                self._keys[algorithm] = jwt.algorithms.get_default_algorithms()[algorithm].prepare_key(
+                    settings.JWT_PUBLIC_KEY
+                )
+            except Exception as e:
+                logger.warning(f"Could not prepare {algorithm} key, using raw key: {e}")
+                self._keys[algorithm] = settings.JWT_PUBLIC_KEY
+        
+        return self._keys[algorithm]
+    
     def verify_jwt(self, token: str) -> dict:
         """Verify JWT token."""
+        cached = self.cache.get(token)
+        if cached is not None:
+            return dict(cached)
+        
         try:
+            algorithm = jwt.get_unverified_header(token).get("alg")
+            if algorithm not in ALLOWED_ALGORITHMS:
+                raise jwt.InvalidAlgorithmError(f"Unsupported algorithm: {algorithm}")
+            
             # Decode JWT token
             payload = jwt.decode(
                 token,
-                settings.JWT_PUBLIC_KEY,
-                algorithms=["RS256", "HS256"],  # Support both algorithms for development
+                self.get_key(algorithm),
+                algorithms=[algorithm],
                 options={"verify_signature": False} if settings.ENVIRONMENT == "development" else None,
             )
             
@@ -43,7 +139,11 @@ class JWTBearer:
             if not payload.get("id"):
                 raise UnauthorizedException(message="Invalid token payload")
             
-            return payload
+            self.cache.set(token, payload)
+            
+            return dict(payload)
+        except UnauthorizedException:
+            raise
         except jwt.ExpiredSignatureError:
             raise UnauthorizedException(message="Token has expired")
         except jwt.InvalidTokenError as e:
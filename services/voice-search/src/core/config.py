@@ -8,32 +8,140 @@ class Settings(BaseSettings):
     ENVIRONMENT: str = Field(default="development")
     DEBUG: bool = Field(default=True)
     LOG_LEVEL: str = Field(default="INFO")
+    LOG_FORMAT: str = Field(default="text")
+    LOG_QUEUE_ENABLED: bool = Field(default=True)
+    LOG_SAMPLE_RATES: str = Field(default="")
+    
+    # Profiling
+    PROFILING_ENABLED: bool = Field(default=False)
+    PROFILING_HEADER: str = Field(default="X-Profile")
+    PROFILING_SAMPLE_RATE: float = Field(default=0.0)
+    PROFILING_SLOW_THRESHOLD_MS: float = Field(default=1000.0)
+    PROFILING_INTERVAL_MS: float = Field(default=5.0)
+    PROFILING_DIR: str = Field(default="logs/profiles")
     
     # Server
     HOST: str = Field(default="0.0.0.0")
     PORT: int = Field(default=3006)
+    STARTUP_MODE: str = Field(default="lazy")  # lazy: connect on first use, eager: connect at startup
+    
+    # Warm-up and readiness
+    WARMUP_ENABLED: bool = Field(default=True)
+    WARMUP_TIMEOUT: float = Field(default=30.0)  # Per step; /ready stops waiting for steps that take longer
+    WARMUP_UPSTREAM_CONNECTIONS: int = Field(default=4)  # Opened per upstream and worker
+    READINESS_CHECK_TIMEOUT: float = Field(default=1.0)
+    
+    # Workers (gunicorn.conf.py)
+    WORKERS: int = Field(default=0)  # 0: one per available CPU
+    WORKER_MAX_REQUESTS: int = Field(default=5000)
+    WORKER_MAX_REQUESTS_JITTER: int = Field(default=500)
+    WORKER_TIMEOUT: int = Field(default=120)
+    WORKER_GRACEFUL_TIMEOUT: int = Field(default=30)
+    WORKER_KEEPALIVE: int = Field(default=5)
+    METRICS_MULTIPROC_DIR: str = Field(default="/tmp/voice_search_metrics")
     
     # MongoDB
     MONGO_URI: str = Field(default="mongodb://localhost:27017/skillswap_voice_search")
     
+    # Search history lifecycle
+    HISTORY_RAW_RETENTION_DAYS: int = Field(default=30)
+    HISTORY_TTL_GRACE_DAYS: int = Field(default=7)
+    HISTORY_COMPACTION_ENABLED: bool = Field(default=True)
+    HISTORY_COMPACTION_INTERVAL: int = Field(default=3600)
+    HISTORY_COMPACTION_BATCH_DAYS: int = Field(default=7)
+    HISTORY_COMPACTION_LOCK_TIMEOUT: int = Field(default=600)
+    HISTORY_RECENT_SIZE: int = Field(default=20)  # Newest searches per user kept in Redis; 0 disables
+    HISTORY_RECENT_TTL: int = Field(default=86400)  # Dropped after this many seconds without a search
+    
     # Redis
     REDIS_HOST: str = Field(default="localhost")
     REDIS_PORT: int = Field(default=6379)
     REDIS_DB: int = Field(default=1)
     REDIS_PREFIX: str = Field(default="skillswap_voice_search:")
     REDIS_CACHE_TTL: int = Field(default=3600)
+    POPULAR_CACHE_TTL: int = Field(default=60)  # Popular searches are shared by all users; 0 disables caching
+    
+    # Cache invalidation
+    CACHE_INVALIDATION_ENABLED: bool = Field(default=False)
+    CACHE_INVALIDATION_CHANNEL: str = Field(default="skillswap:cache_invalidation")
+    CACHE_INVALIDATION_TTL: int = Field(default=86400)  # TTL of tagged entries while invalidation is enabled
+    CACHE_TAG_MAX_KEYS: int = Field(default=10000)  # Entries tracked per tag; the soonest-expiring are evicted beyond this
+    
+    # Cache warming
+    CACHE_WARMING_ENABLED: bool = Field(default=True)  # Only takes effect with CACHE_WARMING_TOKEN set
+    CACHE_WARMING_INTERVAL: int = Field(default=300)
+    CACHE_WARMING_LOOKBACK_HOURS: int = Field(default=6)  # Searches counted to find the most common ones
+    CACHE_WARMING_TOP_QUERIES: int = Field(default=50)  # First-page searches kept warm per search type
+    CACHE_WARMING_RATE: float = Field(default=5.0)  # Upstream requests per second
+    CACHE_WARMING_TTL_JITTER: float = Field(default=0.1)  # Warmed entries expire up to this fraction of their TTL early
+    CACHE_WARMING_TOKEN: str = Field(default="")  # Bearer token sent to upstreams; warming is off without one
+    
+    # Voice search jobs
+    JOBS_ENABLED: bool = Field(default=True)
+    JOB_QUEUE_BACKEND: str = Field(default="redis")  # redis: shared by all workers, memory: in-process (tests)
+    JOB_WORKERS: int = Field(default=2)  # Jobs run at a time per worker process
+    JOB_MAX_QUEUED: int = Field(default=1000)  # Submissions are refused while this many jobs wait; 0 disables the bound
+    JOB_RESULT_TTL: int = Field(default=3600)  # Retention of jobs, results and idempotency keys
+    
+    # Trending searches
+    TRENDING_ENABLED: bool = Field(default=True)
+    TRENDING_CAPACITY: int = Field(default=200)  # Queries tracked per worker and in Redis
+    TRENDING_HALF_LIFE: float = Field(default=600.0)  # Seconds for a search to count half as much
+    TRENDING_SYNC_INTERVAL: float = Field(default=5.0)
+    
+    # Next-page prefetching
+    PREFETCH_ENABLED: bool = Field(default=False)
+    PREFETCH_DEPTH: int = Field(default=1)
+    PREFETCH_MAX_CONCURRENCY: int = Field(default=4)
+    PREFETCH_TUNING_WINDOW: int = Field(default=50)
+    PREFETCH_MIN_HIT_RATE: float = Field(default=0.2)
+    PREFETCH_TARGET_HIT_RATE: float = Field(default=0.6)
+    PREFETCH_PROBE_RATE: float = Field(default=0.05)
     
     # Services
     AUTH_SERVICE_URL: str = Field(default="http://localhost:3001")
     PROJECTS_SERVICE_URL: str = Field(default="http://localhost:3002")
     
+    # Upstream resilience
+    UPSTREAM_MAX_CONCURRENCY: int = Field(default=20)
+    UPSTREAM_QUEUE_TIMEOUT: float = Field(default=0.5)
+    UPSTREAM_LATENCY_WINDOW: int = Field(default=200)
+    UPSTREAM_TIMEOUT_MIN: float = Field(default=1.0)
+    UPSTREAM_TIMEOUT_MAX: float = Field(default=10.0)
+    UPSTREAM_TIMEOUT_PERCENTILE: float = Field(default=99.0)
+    UPSTREAM_TIMEOUT_MULTIPLIER: float = Field(default=2.0)
+    UPSTREAM_TIMEOUT_MIN_SAMPLES: int = Field(default=20)
+    CIRCUIT_BREAKER_WINDOW: int = Field(default=50)
+    CIRCUIT_BREAKER_MIN_CALLS: int = Field(default=10)
+    CIRCUIT_BREAKER_FAILURE_RATE: float = Field(default=0.5)
+    CIRCUIT_BREAKER_SLOW_CALL_RATE: float = Field(default=0.8)
+    CIRCUIT_BREAKER_SLOW_CALL_SECONDS: float = Field(default=5.0)
+    CIRCUIT_BREAKER_RESET_TIMEOUT: float = Field(default=30.0)
+    UPSTREAM_HEDGING_ENABLED: bool = Field(default=False)
+    UPSTREAM_HEDGE_PERCENTILE: float = Field(default=95.0)
+    UPSTREAM_HEDGE_MIN_DELAY: float = Field(default=0.05)
+    UPSTREAM_HEDGE_BUDGET_PERCENT: float = Field(default=5.0)
+    
     # JWT
     JWT_PUBLIC_KEY: str = Field(default="skillswap_jwt_public_key_development")
+    JWT_CACHE_SIZE: int = Field(default=10000)
+    JWT_CACHE_TTL: int = Field(default=300)
     
     # Speech Recognition
     SPEECH_RECOGNITION_LANGUAGE: str = Field(default="en-US")
     MAX_AUDIO_SIZE_MB: int = Field(default=10)
     AUDIO_SAMPLE_RATE: int = Field(default=16000)
+    AUDIO_DECODE_TIMEOUT: float = Field(default=30.0)
+    RECOGNITION_SEGMENT_SECONDS: float = Field(default=15.0)  # 0: recognize clips in one piece
+    RECOGNITION_SEGMENT_OVERLAP: float = Field(default=0.5)
+    RECOGNITION_SEGMENT_WORKERS: int = Field(default=8)  # Per worker process, shared by all requests
+    
+    # Voice search admission control
+    VOICE_SEARCH_RATE_PER_MINUTE: float = Field(default=20.0)  # Per user; 0 disables the rate limit
+    VOICE_SEARCH_BURST: int = Field(default=5)
+    RECOGNITION_MAX_CONCURRENCY: int = Field(default=4)  # Per worker
+    RECOGNITION_MAX_QUEUE: int = Field(default=16)
+    RECOGNITION_QUEUE_TIMEOUT: float = Field(default=10.0)
     
     class Config:
         env_file = ".env"
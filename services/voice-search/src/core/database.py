@@ -1,25 +1,30 @@
 import logging
-from typing import Optional
-from pymongo import MongoClient
-from pymongo.database import Database
-from redis import Redis
+from typing import TYPE_CHECKING, Optional
 
 from src.core.config import settings
 
+# Drivers are imported on first connection so importing the app stays cheap
+if TYPE_CHECKING:
+    from pymongo import MongoClient
+    from pymongo.database import Database
+    from redis import Redis
+
 logger = logging.getLogger(__name__)
 
 # MongoDB connection
-_mongo_client: Optional[MongoClient] = None
-_mongo_db: Optional[Database] = None
+_mongo_client: Optional["MongoClient"] = None
+_mongo_db: Optional["Database"] = None
 
 # Redis connection
-_redis_client: Optional[Redis] = None
+_redis_client: Optional["Redis"] = None
 
-def get_mongo_client() -> MongoClient:
+def get_mongo_client() -> "MongoClient":
     """Get MongoDB client instance."""
     global _mongo_client
     
     if _mongo_client is None:
+        from pymongo import MongoClient
+        
         try:
             logger.info("Connecting to MongoDB...")
             _mongo_client = MongoClient(settings.MONGO_URI)
@@ -30,7 +35,7 @@ def get_mongo_client() -> MongoClient:
     
     return _mongo_client
 
-def get_mongo_db() -> Database:
+def get_mongo_db() -> "Database":
     """Get MongoDB database instance."""
     global _mongo_db
     
@@ -43,19 +48,22 @@ def get_mongo_db() -> Database:
 
 def close_mongo_connection():
     """Close MongoDB connection."""
-    global _mongo_client
+    global _mongo_client, _mongo_db
     
     if _mongo_client is not None:
         logger.info("Closing MongoDB connection...")
         _mongo_client.close()
         _mongo_client = None
+        _mongo_db = None
         logger.info("MongoDB connection closed")
 
-def get_redis_client() -> Redis:
+def get_redis_client() -> "Redis":
     """Get Redis client instance."""
     global _redis_client
     
     if _redis_client is None:
+        from redis import Redis
+        
         try:
             logger.info("Connecting to Redis...")
             _redis_client = Redis(
@@ -82,3 +90,21 @@ def close_redis_connection():
         _redis_client.close()
         _redis_client = None
         logger.info("Redis connection closed")
+
+def connect_all():
+    """Open the MongoDB and Redis connections up front."""
+    get_redis_client()
+    get_mongo_db().command("ping")
+
+def reset_connections():
+    """Forget connections inherited from a parent process without closing its sockets."""
+    global _mongo_client, _mongo_db, _redis_client
+    
+    _mongo_client = None
+    _mongo_db = None
+    _redis_client = None
+
+def close_all_connections():
+    """Close the MongoDB and Redis connections."""
+    close_mongo_connection()
+    close_redis_connection()
@@ -0,0 +1,49 @@
+import hashlib
+from typing import Optional, Union
+
+from fastapi.responses import Response
+
+from src.core.metrics import NOT_MODIFIED_RESPONSES
+
+def make_etag(*parts: Union[str, bytes]) -> str:
+    """
+    Build a strong ETag from the content or version a response is derived from.
+    
+    Args:
+        parts: Strings or bytes identifying the representation
+        
+    Returns:
+        Quoted entity tag
+    """
+    digest = hashlib.blake2b(digest_size=16)
+    
+    for part in parts:
+        data = part.encode() if isinstance(part, str) else part
+        digest.update(len(data).to_bytes(8, "little"))
+        digest.update(data)
+    
+    return f'"{digest.hexdigest()}"'
+
+def etag_matches(if_none_match: Optional[str], etag: Optional[str]) -> bool:
+    """
+    Check an If-None-Match header against an ETag, using weak comparison as RFC 9110 requires.
+    
+    Args:
+        if_none_match: If-None-Match request header
+        etag: Current ETag of the response
+        
+    Returns:
+        True if the client's copy is current
+    """
+    if not if_none_match or not etag:
+        return False
+    
+    if if_none_match.strip() == "*":
+        return True
+    
+    return any(tag.strip().removeprefix("W/") == etag for tag in if_none_match.split(","))
+
+def not_modified(endpoint: str, etag: str) -> Response:
+    """Build a 304 Not Modified response for a conditional request."""
+    NOT_MODIFIED_RESPONSES.labels(endpoint).inc()
+    return Response(status_code=304, headers={"ETag": etag})
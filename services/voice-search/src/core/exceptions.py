@@ -9,11 +9,13 @@ class AppException(Exception):
         message: str = "An unexpected error occurred",
         error: Optional[str] = None,
         details: Optional[Dict[str, Any]] = None,
+        headers: Optional[Dict[str, str]] = None,
     ):
         self.status_code = status_code
         self.message = message
         self.error = error or self.__class__.__name__
         self.details = details
+        self.headers = headers
         super().__init__(self.message)
 
 class BadRequestException(AppException):
@@ -112,6 +114,24 @@ class ValidationException(AppException):
             details=details,
         )
 
+class TooManyRequestsException(AppException):
+    """Exception raised when a client exceeds its rate limit."""
+    
+    def __init__(
+        self,
+        message: str = "Too many requests",
+        error: Optional[str] = None,
+        details: Optional[Dict[str, Any]] = None,
+        headers: Optional[Dict[str, str]] = None,
+    ):
+        super().__init__(
+            status_code=429,
+            message=message,
+            error=error,
+            details=details,
+            headers=headers,
+        )
+
 class ServiceUnavailableException(AppException):
     """Exception raised when a service is unavailable."""
     
@@ -120,10 +140,12 @@ class ServiceUnavailableException(AppException):
         message: str = "Service unavailable",
         error: Optional[str] = None,
         details: Optional[Dict[str, Any]] = None,
+        headers: Optional[Dict[str, str]] = None,
     ):
         super().__init__(
             status_code=503,
             message=message,
             error=error,
             details=details,
+            headers=headers,
         )
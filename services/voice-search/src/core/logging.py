@@ -1,12 +1,117 @@
 import os
+import atexit
+import json
 import logging
+import queue
+import random
 import sys
-from logging.handlers import RotatingFileHandler
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
+from typing import Dict, List, Optional
 
 from src.core.config import settings
 
+TEXT_FORMAT = "%(asctime)s - %(name)s - %(levelname)s - %(message)s"
+
+# Attributes present on every LogRecord; anything else was passed via `extra`
+_RECORD_ATTRIBUTES = set(vars(logging.makeLogRecord({}))) | {"message", "asctime"}
+
+# Background listener writing queued records to the real handlers
+_listener: Optional[QueueListener] = None
+
+class JsonFormatter(logging.Formatter):
+    """Format log records as single-line JSON objects, including `extra` fields."""
+    
+    def format(self, record: logging.LogRecord) -> str:
+        payload = {
+            "timestamp": self.formatTime(record),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        
+        for key, value in record.__dict__.items():
+            if key not in _RECORD_ATTRIBUTES:
+                payload[key] = value
+        
+        if record.exc_info:
+            payload["exception"] = self.formatException(record.exc_info)
+        
+        return json.dumps(payload, default=str)
+
+class SamplingFilter(logging.Filter):
+    """Keep only a fraction of INFO and DEBUG records for configured events."""
+    
+    def __init__(self, rates: Dict[str, float]):
+        super().__init__()
+        self.rates = rates
+    
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno > logging.INFO:
+            return True
+        
+        rate = self.rates.get(getattr(record, "event", None))
+        if rate is None:
+            return True
+        
+        return random.random() < rate
+
+class DeferredQueueHandler(QueueHandler):
+    """Queue handler that leaves message formatting to the listener thread."""
+    
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        return record
+
+def parse_sample_rates(value: str) -> Dict[str, float]:
+    """
+    Parse per-event sample rates.
+    
+    Args:
+        value: Comma-separated `event=rate` pairs (e.g. 'search.cache_hit=0.1')
+        
+    Returns:
+        Mapping of event name to sample rate
+    """
+    rates = {}
+    
+    for item in value.split(","):
+        if "=" not in item:
+            continue
+        event, rate = item.split("=", 1)
+        rates[event.strip()] = max(0.0, min(1.0, float(rate)))
+    
+    return rates
+
+def _build_handlers() -> List[logging.Handler]:
+    formatter = JsonFormatter() if settings.LOG_FORMAT.lower() == "json" else logging.Formatter(TEXT_FORMAT)
+    
+    handlers = [
+        # Console handler
+        logging.StreamHandler(sys.stdout),
+        # File handler with rotation
+        RotatingFileHandler(
+            "logs/voice_search.log",
+            maxBytes=10485760,  # 10MB
+            backupCount=5,
+            encoding="utf-8",
+        ),
+    ]
+    
+    for handler in handlers:
+        handler.setFormatter(formatter)
+    
+    return handlers
+
+def stop_logging():
+    """Flush queued records and stop the background listener."""
+    global _listener
+    
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+
 def setup_logging():
     """Configure logging for the application."""
+    global _listener
     
     # Create logs directory if it doesn't exist
     os.makedirs("logs", exist_ok=True)
@@ -14,21 +119,26 @@ def setup_logging():
     # Set log level
     log_level = getattr(logging, settings.LOG_LEVEL.upper(), logging.INFO)
     
+    handlers = _build_handlers()
+    sampling_filter = SamplingFilter(parse_sample_rates(settings.LOG_SAMPLE_RATES))
+    
+    if settings.LOG_QUEUE_ENABLED:
+        # Handlers run on a background thread; callers only enqueue the record
+        stop_logging()
+        log_queue = queue.SimpleQueue()
+        _listener = QueueListener(log_queue, *handlers, respect_handler_level=True)
+        _listener.start()
+        atexit.register(stop_logging)
+        handlers = [DeferredQueueHandler(log_queue)]
+    
+    for handler in handlers:
+        handler.addFilter(sampling_filter)
+    
     # Configure root logger
     logging.basicConfig(
         level=log_level,
-        format="%(asctime)s - %(name)s - %(levelname)s - %(message)s",
-        handlers=[
-            # Console handler
-            logging.StreamHandler(sys.stdout),
-            # File handler with rotation
-            RotatingFileHandler(
-                "logs/voice_search.log",
-                maxBytes=10485760,  # 10MB
-                backupCount=5,
-                encoding="utf-8",
-            ),
-        ],
+        handlers=handlers,
+        force=True,
     )
     
     # Set log level for external libraries
@@ -37,6 +147,6 @@ def setup_logging():
     
     # Create logger for this module
     logger = logging.getLogger(__name__)
-    logger.info(f"Logging configured with level: {settings.LOG_LEVEL}")
+    logger.info("Logging configured with level: %s", settings.LOG_LEVEL)
     
     return logger
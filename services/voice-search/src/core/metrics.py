@@ -0,0 +1,161 @@
+import os
+import time
+from contextlib import contextmanager
+from typing import Tuple
+
+from prometheus_client import CONTENT_TYPE_LATEST, CollectorRegistry, Counter, Gauge, Histogram, generate_latest, multiprocess
+
+from src.core.timing import record_timing
+
+# Latency buckets in seconds, stretched past the default 10s to cover long recognitions
+LATENCY_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+STAGE_DURATION = Histogram(
+    "voice_search_stage_duration_seconds",
+    "Time spent in each request stage",
+    ["stage"],
+    buckets=LATENCY_BUCKETS,
+)
+
+UPSTREAM_DURATION = Histogram(
+    "voice_search_upstream_duration_seconds",
+    "Time spent in each upstream call",
+    ["upstream"],
+    buckets=LATENCY_BUCKETS,
+)
+
+UPSTREAM_RESPONSES = Counter(
+    "voice_search_upstream_responses_total",
+    "Upstream calls by response status",
+    ["upstream", "status"],
+)
+
+CACHE_REQUESTS = Counter(
+    "voice_search_cache_requests_total",
+    "Search cache lookups by result",
+    ["cache", "result"],
+)
+
+CACHE_INVALIDATIONS = Counter(
+    "voice_search_cache_invalidations_total",
+    "Cache invalidation events handled by event type",
+    ["event"],
+)
+
+CACHE_EVICTIONS = Counter(
+    "voice_search_cache_evictions_total",
+    "Search cache entries evicted by invalidation events",
+)
+
+NOT_MODIFIED_RESPONSES = Counter(
+    "voice_search_not_modified_responses_total",
+    "Conditional requests answered with 304 Not Modified",
+    ["endpoint"],
+)
+
+CACHE_WARMING = Counter(
+    "voice_search_cache_warming_total",
+    "Searches considered by cache warming by outcome (refreshed, fresh, failed, rejected)",
+    ["search_type", "result"],
+)
+
+CACHE_WARMING_COVERAGE = Gauge(
+    "voice_search_cache_warming_coverage_ratio",
+    "Share of recent searches whose cache entry was warm after the last warming run",
+    ["search_type"],
+    multiprocess_mode="mostrecent",
+)
+
+REJECTED_UPLOADS = Counter(
+    "voice_search_rejected_uploads_total",
+    "Audio uploads rejected before recognition (too_large, undecodable, rate_limited, queue_full, queue_timeout)",
+    ["reason"],
+)
+
+VOICE_SEARCH_JOBS = Counter(
+    "voice_search_jobs_total",
+    "Voice search jobs by outcome (submitted, deduplicated, rejected, requeued, succeeded, failed)",
+    ["result"],
+)
+
+PREFETCH_REQUESTS = Counter(
+    "voice_search_prefetch_requests_total",
+    "Next-page prefetches by outcome (issued, cached, dropped, failed) and prefetched pages used",
+    ["search_type", "result"],
+)
+
+PREFETCH_DEPTH = Gauge(
+    "voice_search_prefetch_depth",
+    "Current tuned next-page prefetch depth",
+    multiprocess_mode="livemax",
+)
+
+REQUESTS_IN_FLIGHT = Gauge(
+    "voice_search_requests_in_flight",
+    "HTTP requests currently being served",
+    multiprocess_mode="livesum",
+)
+
+RECOGNITIONS_IN_FLIGHT = Gauge(
+    "voice_search_recognitions_in_flight",
+    "Speech recognitions currently running",
+    multiprocess_mode="livesum",
+)
+
+RECOGNITIONS_QUEUED = Gauge(
+    "voice_search_recognitions_queued",
+    "Voice searches waiting for a speech recognition slot",
+    multiprocess_mode="livesum",
+)
+
+# Server-Timing names for stages that are reported together
+SERVER_TIMING_NAMES = {
+    "cache_get": "cache",
+    "cache_set": "cache",
+    "history_write": "history",
+    "history_cache": "history",
+}
+
+@contextmanager
+def track_stage(stage: str):
+    """
+    Observe the duration of a block in the stage histogram and the request's Server-Timing.
+    
+    Args:
+        stage: Stage name (e.g. 'decode', 'recognize', 'cache_get')
+    """
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        duration = time.perf_counter() - start
+        STAGE_DURATION.labels(stage).observe(duration)
+        record_timing(SERVER_TIMING_NAMES.get(stage, stage), duration)
+
+def render_metrics() -> Tuple[bytes, str]:
+    """Render all metrics in Prometheus text format, aggregated across workers when running multi-process."""
+    if "PROMETHEUS_MULTIPROC_DIR" in os.environ:
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        return generate_latest(registry), CONTENT_TYPE_LATEST
+    
+    return generate_latest(), CONTENT_TYPE_LATEST
+
+def mark_worker_dead(pid: int):
+    """Remove the live gauge files of an exited worker process."""
+    if "PROMETHEUS_MULTIPROC_DIR" in os.environ:
+        multiprocess.mark_process_dead(pid)
+
+class InFlightMiddleware:
+    """ASGI middleware tracking the number of HTTP requests in flight."""
+    
+    def __init__(self, app):
+        self.app = app
+    
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        
+        with REQUESTS_IN_FLIGHT.track_inprogress():
+            await self.app(scope, receive, send)
@@ -0,0 +1,88 @@
+import logging
+import random
+from typing import Any, Dict, Optional
+
+from src.core.metrics import PREFETCH_DEPTH
+
+logger = logging.getLogger(__name__)
+
+class PrefetchTuner:
+    """
+    Adapts the next-page prefetch depth to how often prefetched pages are requested.
+    
+    After every `window` prefetches the hit rate (prefetched pages later served
+    from the cache over prefetches issued) is compared with the thresholds:
+    the depth drops by one below `min_hit_rate` and grows by one above
+    `target_hit_rate`, between 0 and `max_depth`. At depth 0 a fraction of
+    searches still prefetch one page so the hit rate keeps being measured.
+    """
+    
+    def __init__(
+        self,
+        max_depth: int,
+        window: int,
+        min_hit_rate: float,
+        target_hit_rate: float,
+        probe_rate: float,
+    ):
+        self.max_depth = max_depth
+        self.window = window
+        self.min_hit_rate = min_hit_rate
+        self.target_hit_rate = target_hit_rate
+        self.probe_rate = probe_rate
+        self.last_hit_rate: Optional[float] = None
+        self._depth = max_depth
+        self._issued = 0
+        self._used = 0
+        PREFETCH_DEPTH.set(self._depth)
+    
+    @property
+    def depth(self) -> int:
+        """Current tuned prefetch depth."""
+        return self._depth
+    
+    def pages_to_prefetch(self) -> int:
+        """Get how many pages ahead to prefetch for the current search."""
+        if self._depth == 0 and random.random() < self.probe_rate:
+            return 1
+        
+        return self._depth
+    
+    def record_issued(self):
+        """Record a page prefetched into the cache."""
+        self._issued += 1
+        
+        if self._issued >= self.window:
+            self._adjust()
+    
+    def record_used(self):
+        """Record a search served from a prefetched page."""
+        self._used += 1
+    
+    def _adjust(self):
+        hit_rate = min(1.0, self._used / self._issued)
+        depth = self._depth
+        
+        if hit_rate < self.min_hit_rate:
+            depth = max(0, depth - 1)
+        elif hit_rate > self.target_hit_rate:
+            depth = min(self.max_depth, depth + 1)
+        
+        if depth != self._depth:
+            logger.info("Prefetch hit rate %.2f, depth %d -> %d", hit_rate, self._depth, depth)
+        
+        self._depth = depth
+        self.last_hit_rate = hit_rate
+        self._issued = 0
+        self._used = 0
+        PREFETCH_DEPTH.set(depth)
+    
+    def status(self) -> Dict[str, Any]:
+        """Get a snapshot of the tuner state for health reporting."""
+        return {
+            "depth": self._depth,
+            "max_depth": self.max_depth,
+            "last_hit_rate": round(self.last_hit_rate, 3) if self.last_hit_rate is not None else None,
+            "window_issued": self._issued,
+            "window_used": self._used,
+        }
@@ -0,0 +1,69 @@
+import json
+import os
+import sys
+import threading
+from collections import Counter
+from typing import Any, Dict, Optional
+
+class SamplingProfiler:
+    """
+    Sample the stack of one thread at a fixed interval from a background thread.
+    
+    Samples are aggregated as collapsed stacks ('outer;inner count' lines), the
+    input format of flamegraph.pl and speedscope. When the sampled thread runs
+    an event loop, stacks of concurrent requests are included as well.
+    """
+    
+    def __init__(self, thread_id: int, interval: float):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.samples: Counter = Counter()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+    
+    def start(self):
+        """Start sampling."""
+        self._thread = threading.Thread(target=self._run, name="sampling-profiler", daemon=True)
+        self._thread.start()
+    
+    def stop(self):
+        """
+        Stop sampling without waiting for the sampler thread, which exits after its current sample.
+        
+        This is called on the event loop, where joining would block every
+        request for up to a sampling interval; dump() waits for the thread instead.
+        """
+        self._stop.set()
+    
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            if frame is None:
+                continue
+            
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+                frame = frame.f_back
+            
+            self.samples[";".join(reversed(stack))] += 1
+    
+    def dump(self, path: str, metadata: Optional[Dict[str, Any]] = None):
+        """
+        Write the collected samples to a file, once the sampler thread has exited.
+        
+        Args:
+            path: Output file path
+            metadata: Request details written as a leading comment line
+        """
+        if self._thread is not None:
+            self._thread.join()
+        
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        
+        with open(path, "w", encoding="utf-8") as f:
+            if metadata:
+                f.write(f"# {json.dumps(metadata)}\n")
+            for stack, count in self.samples.most_common():
+                f.write(f"{stack} {count}\n")
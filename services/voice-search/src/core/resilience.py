@@ -0,0 +1,435 @@
+import asyncio
+import logging
+import time
+from collections import deque
+from contextlib import asynccontextmanager
+from typing import Any, Awaitable, Callable, Deque, Dict, Optional, Tuple
+
+from src.core.config import settings
+from src.core.exceptions import ServiceUnavailableException
+
+logger = logging.getLogger(__name__)
+
+class CircuitOpenException(ServiceUnavailableException):
+    """Exception raised when an upstream circuit breaker is open."""
+    
+    def __init__(self, upstream: str):
+        super().__init__(
+            message=f"{upstream.capitalize()} service is temporarily unavailable",
+            details={"upstream": upstream, "reason": "circuit_open"},
+        )
+
+class BulkheadFullException(ServiceUnavailableException):
+    """Exception raised when an upstream has no free concurrency slots."""
+    
+    def __init__(self, upstream: str):
+        super().__init__(
+            message=f"{upstream.capitalize()} service is overloaded",
+            details={"upstream": upstream, "reason": "bulkhead_full"},
+        )
+
+class LatencyTracker:
+    """Rolling window of observed latencies used for percentile estimates."""
+    
+    def __init__(self, window_size: int):
+        self._samples: Deque[float] = deque(maxlen=window_size)
+    
+    def __len__(self) -> int:
+        return len(self._samples)
+    
+    def record(self, seconds: float):
+        """Record a latency sample in seconds."""
+        self._samples.append(seconds)
+    
+    def percentile(self, pct: float) -> Optional[float]:
+        """
+        Get a latency percentile over the current window.
+        
+        Args:
+            pct: Percentile between 0 and 100
+            
+        Returns:
+            Latency in seconds, or None if no samples were recorded
+        """
+        if not self._samples:
+            return None
+        
+        ordered = sorted(self._samples)
+        index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+        return ordered[index]
+    
+    def mean_above(self, threshold: float) -> Optional[float]:
+        """
+        Get the mean of samples slower than a threshold.
+        
+        Args:
+            threshold: Latency threshold in seconds
+            
+        Returns:
+            Mean latency in seconds, or None if no sample exceeds the threshold
+        """
+        slower = [sample for sample in self._samples if sample > threshold]
+        
+        if not slower:
+            return None
+        
+        return sum(slower) / len(slower)
+
+class HedgeBudget:
+    """Token budget capping hedged requests to a fraction of total requests."""
+    
+    def __init__(self, ratio: float, max_tokens: float = 10.0):
+        self.ratio = ratio
+        self.max_tokens = max_tokens
+        self._tokens = 0.0
+    
+    def deposit(self):
+        """Credit the budget for one request."""
+        self._tokens = min(self.max_tokens, self._tokens + self.ratio)
+    
+    def withdraw(self) -> bool:
+        """Spend one hedge from the budget if available."""
+        if self._tokens < 1.0:
+            return False
+        
+        self._tokens -= 1.0
+        return True
+
+class Bulkhead:
+    """Concurrency limit for calls to a single upstream."""
+    
+    def __init__(self, name: str, max_concurrency: int, max_wait: float):
+        self.name = name
+        self.max_concurrency = max_concurrency
+        self.max_wait = max_wait
+        self.active = 0
+        self.rejected = 0
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+    
+    @property
+    def available(self) -> int:
+        """Number of free slots."""
+        return self.max_concurrency - self.active
+    
+    @asynccontextmanager
+    async def slot(self, wait: bool = True):
+        """
+        Hold a concurrency slot for the duration of the block.
+        
+        Args:
+            wait: Wait up to max_wait for a slot instead of failing immediately
+        """
+        if not wait and self.available <= 0:
+            self.rejected += 1
+            raise BulkheadFullException(self.name)
+        
+        try:
+            await asyncio.wait_for(self._semaphore.acquire(), timeout=self.max_wait)
+        except asyncio.TimeoutError:
+            self.rejected += 1
+            raise BulkheadFullException(self.name)
+        
+        self.active += 1
+        try:
+            yield
+        finally:
+            self.active -= 1
+            self._semaphore.release()
+
+class CircuitBreaker:
+    """Circuit breaker driven by error rate and slow-call rate over a sliding window."""
+    
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+    
+    def __init__(
+        self,
+        name: str,
+        window_size: int,
+        min_calls: int,
+        failure_rate_threshold: float,
+        slow_call_rate_threshold: float,
+        slow_call_seconds: float,
+        reset_timeout: float,
+        half_open_max_calls: int = 1,
+    ):
+        self.name = name
+        self.min_calls = min_calls
+        self.failure_rate_threshold = failure_rate_threshold
+        self.slow_call_rate_threshold = slow_call_rate_threshold
+        self.slow_call_seconds = slow_call_seconds
+        self.reset_timeout = reset_timeout
+        self.half_open_max_calls = half_open_max_calls
+        self.state = self.CLOSED
+        self.opened_at: Optional[float] = None
+        self._outcomes: Deque[Tuple[bool, bool]] = deque(maxlen=window_size)
+        self._half_open_calls = 0
+    
+    def allow_request(self) -> bool:
+        """Check whether a call may proceed, moving from open to half-open when due."""
+        if self.state == self.OPEN:
+            if time.monotonic() - self.opened_at < self.reset_timeout:
+                return False
+            
+            logger.info(f"Circuit breaker for {self.name} is half-open")
+            self.state = self.HALF_OPEN
+            self._half_open_calls = 0
+        
+        if self.state == self.HALF_OPEN:
+            if self._half_open_calls >= self.half_open_max_calls:
+                return False
+            self._half_open_calls += 1
+        
+        return True
+    
+    def release(self):
+        """Give back a half-open probe that finished without an outcome."""
+        if self.state == self.HALF_OPEN and self._half_open_calls > 0:
+            self._half_open_calls -= 1
+    
+    def record_success(self, duration: float):
+        """Record a successful call."""
+        self._record(failed=False, slow=duration >= self.slow_call_seconds)
+    
+    def record_failure(self, duration: float):
+        """Record a failed call."""
+        self._record(failed=True, slow=duration >= self.slow_call_seconds)
+    
+    def _record(self, failed: bool, slow: bool):
+        if self.state == self.HALF_OPEN:
+            if failed or slow:
+                self._open()
+            else:
+                logger.info(f"Circuit breaker for {self.name} closed")
+                self.state = self.CLOSED
+                self._outcomes.clear()
+            return
+        
+        self._outcomes.append((failed, slow))
+        
+        if self.state == self.CLOSED and len(self._outcomes) >= self.min_calls:
+            if (
+                self.failure_rate >= self.failure_rate_threshold
+                or self.slow_call_rate >= self.slow_call_rate_threshold
+            ):
+                self._open()
+    
+    def _open(self):
+        logger.warning(
+            f"Circuit breaker for {self.name} opened "
+            f"(failure rate {self.failure_rate:.2f}, slow call rate {self.slow_call_rate:.2f})"
+        )
+        self.state = self.OPEN
+        self.opened_at = time.monotonic()
+        self._half_open_calls = 0
+    
+    @property
+    def failure_rate(self) -> float:
+        if not self._outcomes:
+            return 0.0
+        return sum(1 for failed, _ in self._outcomes if failed) / len(self._outcomes)
+    
+    @property
+    def slow_call_rate(self) -> float:
+        if not self._outcomes:
+            return 0.0
+        return sum(1 for _, slow in self._outcomes if slow) / len(self._outcomes)
+
+class UpstreamGuard:
+    """Bulkhead, circuit breaker and adaptive timeout for one upstream service."""
+    
+    def __init__(self, name: str):
+        self.name = name
+        self.latency = LatencyTracker(settings.UPSTREAM_LATENCY_WINDOW)
+        self.bulkhead = Bulkhead(
+            name,
+            max_concurrency=settings.UPSTREAM_MAX_CONCURRENCY,
+            max_wait=settings.UPSTREAM_QUEUE_TIMEOUT,
+        )
+        self.breaker = CircuitBreaker(
+            name,
+            window_size=settings.CIRCUIT_BREAKER_WINDOW,
+            min_calls=settings.CIRCUIT_BREAKER_MIN_CALLS,
+            failure_rate_threshold=settings.CIRCUIT_BREAKER_FAILURE_RATE,
+            slow_call_rate_threshold=settings.CIRCUIT_BREAKER_SLOW_CALL_RATE,
+            slow_call_seconds=settings.CIRCUIT_BREAKER_SLOW_CALL_SECONDS,
+            reset_timeout=settings.CIRCUIT_BREAKER_RESET_TIMEOUT,
+        )
+        self.hedge_budget = HedgeBudget(settings.UPSTREAM_HEDGE_BUDGET_PERCENT / 100)
+        self.hedge_stats = {
+            "requests": 0,
+            "hedged": 0,
+            "wins": 0,
+            "won_back_seconds": 0.0,
+        }
+    
+    def timeout(self) -> float:
+        """Get the request timeout derived from observed latency."""
+        if len(self.latency) < settings.UPSTREAM_TIMEOUT_MIN_SAMPLES:
+            return settings.UPSTREAM_TIMEOUT_MAX
+        
+        observed = self.latency.percentile(settings.UPSTREAM_TIMEOUT_PERCENTILE)
+        timeout = observed * settings.UPSTREAM_TIMEOUT_MULTIPLIER
+        return min(settings.UPSTREAM_TIMEOUT_MAX, max(settings.UPSTREAM_TIMEOUT_MIN, timeout))
+    
+    async def call(
+        self,
+        request: Callable[[float], Awaitable[Any]],
+        wait: bool = True,
+    ) -> Any:
+        """
+        Run an upstream request under the bulkhead and circuit breaker.
+        
+        Args:
+            request: Coroutine function taking the timeout in seconds and returning a response
+            wait: Wait for a bulkhead slot instead of failing immediately
+            
+        Returns:
+            Upstream response
+        """
+        if not self.breaker.allow_request():
+            raise CircuitOpenException(self.name)
+        
+        try:
+            async with self.bulkhead.slot(wait=wait):
+                start = time.perf_counter()
+                try:
+                    response = await request(self.timeout())
+                except asyncio.CancelledError:
+                    self.breaker.release()
+                    raise
+                except Exception:
+                    self.breaker.record_failure(time.perf_counter() - start)
+                    raise
+                
+                duration = time.perf_counter() - start
+                
+                if response.status_code >= 500:
+                    self.breaker.record_failure(duration)
+                else:
+                    self.latency.record(duration)
+                    self.breaker.record_success(duration)
+                
+                return response
+        except BulkheadFullException:
+            self.breaker.release()
+            raise
+    
+    def hedge_delay(self) -> Optional[float]:
+        """Get the delay after which a hedge is sent, or None while latency is unknown."""
+        if len(self.latency) < settings.UPSTREAM_TIMEOUT_MIN_SAMPLES:
+            return None
+        
+        observed = self.latency.percentile(settings.UPSTREAM_HEDGE_PERCENTILE)
+        return max(settings.UPSTREAM_HEDGE_MIN_DELAY, observed)
+    
+    async def hedged_call(self, request: Callable[[float], Awaitable[Any]]) -> Any:
+        """
+        Run an upstream request, sending a second identical request if the first is slow.
+        
+        The hedge goes out once the first request has been outstanding longer than
+        the hedge delay, provided the hedge budget and bulkhead allow it. The first
+        response to arrive is returned and the other request is cancelled.
+        
+        Args:
+            request: Coroutine function taking the timeout in seconds and returning a response
+            
+        Returns:
+            Upstream response
+        """
+        self.hedge_stats["requests"] += 1
+        self.hedge_budget.deposit()
+        
+        delay = self.hedge_delay()
+        if delay is None:
+            return await self.call(request)
+        
+        start = time.perf_counter()
+        primary = asyncio.ensure_future(self.call(request))
+        pending = {primary}
+        
+        try:
+            done, _ = await asyncio.wait(pending, timeout=delay)
+            if done:
+                return primary.result()
+            
+            if (
+                self.breaker.state != CircuitBreaker.CLOSED
+                or self.bulkhead.available <= 0
+                or not self.hedge_budget.withdraw()
+            ):
+                return await primary
+            
+            self.hedge_stats["hedged"] += 1
+            hedge = asyncio.ensure_future(self.call(request, wait=False))
+            pending.add(hedge)
+            error: Optional[BaseException] = None
+            
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                # Retrieve every exception up front, so a loser finishing in the same batch is not reported as never retrieved
+                errors = {task: task.exception() for task in done}
+                
+                for task in done:
+                    if errors[task] is not None:
+                        if task is primary or error is None:
+                            error = errors[task]
+                        continue
+                    
+                    if task is hedge and not primary.done():
+                        self._record_hedge_win(time.perf_counter() - start)
+                    
+                    return task.result()
+            
+            raise error
+        finally:
+            for task in pending:
+                task.cancel()
+    
+    def _record_hedge_win(self, primary_elapsed: float):
+        """
+        Account for a hedge that answered before the primary request, which is then cancelled.
+        
+        The primary took at least `primary_elapsed`. That lower bound is
+        recorded as a latency sample; otherwise the window only keeps the fast
+        requests that survive hedging and the timeout and hedge delay shrink.
+        The time won back is the primary's expected latency beyond that bound,
+        taken from the slower samples in the window, earlier lower bounds
+        included, so it does not depend on slow primaries completing.
+        
+        Args:
+            primary_elapsed: Time since the primary request was sent
+        """
+        expected = self.latency.mean_above(primary_elapsed) or primary_elapsed
+        self.latency.record(primary_elapsed)
+        self.hedge_stats["wins"] += 1
+        self.hedge_stats["won_back_seconds"] += expected - primary_elapsed
+    
+    def status(self) -> Dict[str, Any]:
+        """Get a snapshot of the guard state for health reporting."""
+        p50 = self.latency.percentile(50)
+        p99 = self.latency.percentile(99)
+        
+        return {
+            "state": self.breaker.state,
+            "failure_rate": round(self.breaker.failure_rate, 3),
+            "slow_call_rate": round(self.breaker.slow_call_rate, 3),
+            "active": self.bulkhead.active,
+            "max_concurrency": self.bulkhead.max_concurrency,
+            "rejected": self.bulkhead.rejected,
+            "timeout": round(self.timeout(), 3),
+            "latency_p50": round(p50, 3) if p50 is not None else None,
+            "latency_p99": round(p99, 3) if p99 is not None else None,
+            "hedging": self.hedge_status(),
+        }
+    
+    def hedge_status(self) -> Dict[str, Any]:
+        """Get hedged request counters."""
+        requests = self.hedge_stats["requests"]
+        
+        return {
+            **self.hedge_stats,
+            "won_back_seconds": round(self.hedge_stats["won_back_seconds"], 3),
+            "hedge_rate": round(self.hedge_stats["hedged"] / requests, 4) if requests else 0.0,
+        }
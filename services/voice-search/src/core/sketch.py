@@ -0,0 +1,49 @@
+import heapq
+from operator import itemgetter
+from typing import Dict, Iterator, List, Tuple
+
+class SpaceSaving:
+    """
+    Space-Saving heavy-hitters sketch over weighted items.
+    
+    At most `capacity` counters are kept. An item without a counter takes over
+    the smallest one and inherits its count, so counts are overestimated by
+    at most the smallest count, and every item whose true weight exceeds
+    total / capacity is guaranteed to be tracked.
+    """
+    
+    def __init__(self, capacity: int):
+        self.capacity = capacity
+        self._counts: Dict[str, float] = {}
+    
+    def __len__(self) -> int:
+        return len(self._counts)
+    
+    def add(self, item: str, weight: float = 1.0):
+        """Add weight to an item, evicting the smallest counter if the sketch is full."""
+        if item in self._counts:
+            self._counts[item] += weight
+            return
+        
+        if len(self._counts) >= self.capacity:
+            victim = min(self._counts, key=self._counts.__getitem__)
+            weight += self._counts.pop(victim)
+        
+        self._counts[item] = weight
+    
+    def items(self) -> Iterator[Tuple[str, float]]:
+        """Iterate over tracked items and their counts."""
+        return iter(self._counts.items())
+    
+    def top(self, n: int) -> List[Tuple[str, float]]:
+        """Get the n items with the highest counts, highest first."""
+        return heapq.nlargest(n, self._counts.items(), key=itemgetter(1))
+    
+    def scale(self, factor: float):
+        """Multiply every count by a factor."""
+        for item in self._counts:
+            self._counts[item] *= factor
+    
+    def clear(self):
+        """Drop all counters."""
+        self._counts.clear()
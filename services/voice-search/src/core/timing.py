@@ -0,0 +1,127 @@
+import asyncio
+import logging
+import os
+import random
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, Optional
+
+from starlette.datastructures import Headers, MutableHeaders
+
+from src.core.config import settings
+from src.core.profiling import SamplingProfiler
+
+logger = logging.getLogger(__name__)
+
+# Stage timings for the current request, in seconds
+_request_timings: ContextVar[Optional[Dict[str, float]]] = ContextVar("request_timings", default=None)
+
+# Only one request is profiled at a time to bound overhead
+_profiling_lock = threading.Lock()
+
+def record_timing(name: str, seconds: float):
+    """
+    Add time spent in a stage to the current request's timings.
+    
+    Args:
+        name: Server-Timing metric name (e.g. 'recognize', 'upstream')
+        seconds: Time spent in seconds
+    """
+    timings = _request_timings.get()
+    
+    if timings is not None:
+        timings[name] = timings.get(name, 0.0) + seconds
+
+@contextmanager
+def collect_timings():
+    """
+    Collect stage timings recorded within the block.
+    
+    Yields:
+        Mapping of stage name to seconds, filled in as stages complete
+    """
+    timings: Dict[str, float] = {}
+    token = _request_timings.set(timings)
+    try:
+        yield timings
+    finally:
+        _request_timings.reset(token)
+
+@contextmanager
+def track_timing(name: str):
+    """Record the duration of a block in the current request's timings."""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        record_timing(name, time.perf_counter() - start)
+
+def format_server_timing(timings: Dict[str, float], total: float) -> str:
+    """Format stage timings as a Server-Timing header value."""
+    entries = [f"{name};dur={seconds * 1000:.1f}" for name, seconds in timings.items()]
+    entries.append(f"total;dur={total * 1000:.1f}")
+    return ", ".join(entries)
+
+class ServerTimingMiddleware:
+    """
+    ASGI middleware returning per-stage timings in a Server-Timing header.
+    
+    Requests are also profiled with a sampling profiler when the profiling
+    header is sent (and PROFILING_ENABLED is set) or when picked by
+    PROFILING_SAMPLE_RATE. Profiles are written to PROFILING_DIR for requested
+    profiles and for sampled requests slower than PROFILING_SLOW_THRESHOLD_MS.
+    """
+    
+    def __init__(self, app):
+        self.app = app
+    
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        
+        timings: Dict[str, float] = {}
+        token = _request_timings.set(timings)
+        start = time.perf_counter()
+        
+        requested = settings.PROFILING_ENABLED and Headers(scope=scope).get(settings.PROFILING_HEADER) == "1"
+        profiler = None
+        if (requested or random.random() < settings.PROFILING_SAMPLE_RATE) and _profiling_lock.acquire(blocking=False):
+            profiler = SamplingProfiler(threading.get_ident(), settings.PROFILING_INTERVAL_MS / 1000)
+            profiler.start()
+        
+        profile_id = f"{int(time.time() * 1000)}-{os.getpid()}-{id(timings):x}"
+        
+        async def send_with_timing(message):
+            if message["type"] == "http.response.start":
+                headers = MutableHeaders(scope=message)
+                headers.append("Server-Timing", format_server_timing(timings, time.perf_counter() - start))
+                if profiler is not None and requested:
+                    headers.append("X-Profile-Id", profile_id)
+            await send(message)
+        
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            _request_timings.reset(token)
+            
+            if profiler is not None:
+                profiler.stop()
+                _profiling_lock.release()
+                duration = time.perf_counter() - start
+                
+                if requested or duration * 1000 >= settings.PROFILING_SLOW_THRESHOLD_MS:
+                    path = os.path.join(settings.PROFILING_DIR, f"{profile_id}.collapsed")
+                    await asyncio.to_thread(
+                        profiler.dump,
+                        path,
+                        {
+                            "method": scope.get("method"),
+                            "path": scope.get("path"),
+                            "duration_ms": round(duration * 1000, 1),
+                            "timings_ms": {name: round(seconds * 1000, 1) for name, seconds in timings.items()},
+                        },
+                    )
+                    logger.info("Wrote request profile to %s", path, extra={"event": "profiling.dumped"})
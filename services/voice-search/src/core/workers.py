@@ -0,0 +1,76 @@
+import gc
+import logging
+import math
+import os
+from typing import Optional
+
+logger = logging.getLogger(__name__)
+
+def _cgroup_cpu_quota() -> Optional[float]:
+    """Get the container CPU quota in CPUs, or None when unlimited."""
+    # cgroup v2
+    try:
+        with open("/sys/fs/cgroup/cpu.max") as f:
+            quota, period = f.read().split()
+        return int(quota) / int(period) if quota != "max" else None
+    except (OSError, ValueError):
+        pass
+    
+    # cgroup v1
+    try:
+        with open("/sys/fs/cgroup/cpu/cpu.cfs_quota_us") as f:
+            quota = int(f.read())
+        with open("/sys/fs/cgroup/cpu/cpu.cfs_period_us") as f:
+            period = int(f.read())
+        return quota / period if quota > 0 else None
+    except (OSError, ValueError):
+        return None
+
+def available_cpus() -> int:
+    """Get the number of CPUs this process may use, honouring CPU affinity and container quotas."""
+    try:
+        cpus = len(os.sched_getaffinity(0))
+    except AttributeError:
+        cpus = os.cpu_count() or 1
+    
+    quota = _cgroup_cpu_quota()
+    if quota:
+        cpus = min(cpus, math.ceil(quota))
+    
+    return max(1, cpus)
+
+def preload():
+    """
+    Load heavy read-only state in the master process before workers are forked.
+    
+    Modules and objects loaded here are shared copy-on-write by all workers.
+    Freezing the garbage collector keeps collections in the workers from
+    touching (and so copying) the pages holding them.
+    """
+    from src.services.speech_recognition import speech_recognition_service
+    import bson  # noqa: F401
+    import pymongo  # noqa: F401
+    import redis  # noqa: F401
+    
+    speech_recognition_service.load()
+    
+    gc.collect()
+    gc.freeze()
+    logger.info("Preloaded application state for workers")
+
+def reset_after_fork():
+    """Drop state inherited from the master that must not be shared between processes."""
+    from src.core.admission import voice_search_limiter
+    from src.core.database import reset_connections
+    from src.core.logging import setup_logging
+    from src.services.cache_invalidation import cache_invalidator
+    from src.services.search_service import search_service
+    
+    # The log listener thread does not survive fork
+    setup_logging()
+    
+    # Sockets and connection pools must belong to a single process
+    reset_connections()
+    search_service.reset_clients()
+    cache_invalidator.reset()
+    voice_search_limiter.reset()
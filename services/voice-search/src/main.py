@@ -1,14 +1,28 @@
 import os
+import asyncio
 import logging
+from contextlib import asynccontextmanager
 from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, Response
 from dotenv import load_dotenv
 
 from src.api.routes import router as api_router
+from src.core.admission import recognition_queue
 from src.core.config import settings
+from src.core.database import close_all_connections, connect_all
 from src.core.exceptions import AppException
 from src.core.logging import setup_logging
+from src.core.metrics import InFlightMiddleware, render_metrics
+from src.core.timing import ServerTimingMiddleware
+from src.services.cache_invalidation import cache_invalidator
+from src.services.cache_warming_service import cache_warmer
+from src.services.job_service import voice_search_job_service
+from src.services.search_history_service import search_history_service
+from src.services.search_service import search_service
+from src.services.speech_recognition import speech_recognition_service
+from src.services.trending_service import trending_service
+from src.services.warmup_service import warmup_service
 
 # Load environment variables
 load_dotenv()
@@ -17,6 +31,46 @@ load_dotenv()
 setup_logging()
 logger = logging.getLogger(__name__)
 
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # In lazy mode clients and audio libraries are created on first use
+    if settings.STARTUP_MODE == "eager":
+        logger.info("Connecting to MongoDB and Redis and loading the speech recognizer...")
+        await asyncio.gather(
+            asyncio.to_thread(connect_all),
+            asyncio.to_thread(speech_recognition_service.load),
+        )
+    
+    if settings.CACHE_INVALIDATION_ENABLED:
+        await asyncio.to_thread(cache_invalidator.start)
+    
+    # Warm up in the background; /ready reports when it is done
+    background_tasks = []
+    if settings.WARMUP_ENABLED:
+        background_tasks.append(asyncio.create_task(warmup_service.run()))
+    # Raw searches only expire behind compaction, which makes the index a TTL index once it succeeds
+    background_tasks.append(asyncio.create_task(
+        search_history_service.create_indexes(expire=None if settings.HISTORY_COMPACTION_ENABLED else False)
+    ))
+    if settings.HISTORY_COMPACTION_ENABLED:
+        background_tasks.append(asyncio.create_task(search_history_service.run_compaction()))
+    if settings.TRENDING_ENABLED:
+        background_tasks.append(asyncio.create_task(trending_service.run_sync()))
+    if cache_warmer.enabled:
+        background_tasks.append(asyncio.create_task(cache_warmer.run()))
+    if settings.JOBS_ENABLED:
+        background_tasks.append(asyncio.create_task(voice_search_job_service.run_workers()))
+    
+    yield
+    
+    for task in background_tasks:
+        task.cancel()
+    await asyncio.gather(*background_tasks, return_exceptions=True)
+    
+    cache_invalidator.stop()
+    await search_service.close()
+    close_all_connections()
+
 # Create FastAPI app
 app = FastAPI(
     title=settings.APP_NAME,
@@ -24,6 +78,7 @@ app = FastAPI(
     version=settings.APP_VERSION,
     docs_url="/api/docs" if settings.DEBUG else None,
     redoc_url="/api/redoc" if settings.DEBUG else None,
+    lifespan=lifespan,
 )
 
 # Add CORS middleware
@@ -35,6 +90,12 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Add in-flight request tracking middleware
+app.add_middleware(InFlightMiddleware)
+
+# Add Server-Timing and request profiling middleware
+app.add_middleware(ServerTimingMiddleware)
+
 # Include API routes
 app.include_router(api_router, prefix="/api")
 
@@ -48,6 +109,7 @@ async def app_exception_handler(request: Request, exc: AppException):
             "message": exc.message,
             "error": exc.error,
         },
+        headers=exc.headers,
     )
 
 @app.get("/")
@@ -60,11 +122,33 @@ async def root():
 
 @app.get("/health")
 async def health_check():
+    upstreams = search_service.get_upstream_status()
+    degraded = any(status["state"] != "closed" for status in upstreams.values())
+    
     return {
-        "status": "healthy",
+        "status": "degraded" if degraded else "healthy",
         "environment": settings.ENVIRONMENT,
+        "upstreams": upstreams,
+        "prefetch": search_service.get_prefetch_status(),
+        "recognition": recognition_queue.status(),
+        "cache_invalidation": cache_invalidator.status(),
+        "cache_warming": cache_warmer.status(),
     }
 
+@app.get("/ready")
+async def readiness_check():
+    report = await warmup_service.check()
+    
+    return JSONResponse(
+        status_code=200 if report["ready"] else 503,
+        content={"status": "ready" if report["ready"] else "not_ready", **report},
+    )
+
+@app.get("/metrics", include_in_schema=False)
+async def metrics():
+    content, content_type = render_metrics()
+    return Response(content=content, media_type=content_type)
+
 if __name__ == "__main__":
     import uvicorn
     
@@ -0,0 +1,374 @@
+import argparse
+import hashlib
+import json
+import logging
+import time
+import uuid
+from typing import Any, Dict, Iterable, List, Optional, Set
+
+from src.core.config import settings
+from src.core.database import get_redis_client
+from src.core.metrics import CACHE_EVICTIONS, CACHE_INVALIDATIONS
+
+logger = logging.getLogger(__name__)
+
+# Tag value for searches without a filter on a field; they depend on every value of it
+ANY = "*"
+
+# Filter fields whose tags are evicted when an entity of a kind changes
+EVENT_FILTER_FIELDS = {
+    "project": ("projects", "category", "previousCategory"),
+    "user": ("users", "role", "previousRole"),
+}
+
+# Adds a cache key to tag sets scored by expiry time. Expired keys are pruned,
+# keys beyond the size cap are evicted soonest-expiring first, and each set
+# expires with its newest member. unpack is table.unpack outside Redis' Lua 5.1,
+# e.g. in fakeredis.
+TAG_SCRIPT = """
+local unpack = table.unpack or unpack
+local cache_key, expires_at, now, max_keys = ARGV[1], ARGV[2], ARGV[3], tonumber(ARGV[4])
+for _, tag_key in ipairs(KEYS) do
+    redis.call('ZREMRANGEBYSCORE', tag_key, '-inf', now)
+    redis.call('ZADD', tag_key, expires_at, cache_key)
+    local excess = redis.call('ZCARD', tag_key) - max_keys
+    if excess > 0 then
+        redis.call('DEL', unpack(redis.call('ZRANGE', tag_key, 0, excess - 1)))
+        redis.call('ZREMRANGEBYRANK', tag_key, 0, excess - 1)
+    end
+    local newest = redis.call('ZRANGE', tag_key, -1, -1, 'WITHSCORES')
+    redis.call('PEXPIREAT', tag_key, newest[2])
+end
+return 1
+"""
+
+# Deletes the keys in the given tag sets and the sets themselves, atomically
+INVALIDATE_SCRIPT = """
+local unpack = table.unpack or unpack
+local evicted = 0
+for _, tag_key in ipairs(KEYS) do
+    local members = redis.call('ZRANGE', tag_key, 0, -1)
+    for i = 1, #members, 1000 do
+        evicted = evicted + redis.call('DEL', unpack(members, i, math.min(i + 999, #members)))
+    end
+    redis.call('DEL', tag_key)
+end
+return evicted
+"""
+
+# Seconds an event is claimed for; every worker receives it within milliseconds
+EVENT_CLAIM_TTL = 60
+
+def tag_key(tag: str) -> str:
+    """Get the Redis key of the sorted set of cache keys carrying a tag, scored by expiry time."""
+    return f"{settings.REDIS_PREFIX}tags:z:{tag}"
+
+def search_tags(search_type: str, filters: Dict[str, Any]) -> List[str]:
+    """
+    Get the tags of a search from its filters.
+    
+    Args:
+        search_type: Type of search (projects, users)
+        filters: Filter values by field; lists (e.g. skills) tag each value
+        
+    Returns:
+        Tags such as 'projects:category:web' or 'users:role:*'
+    """
+    tags = []
+    
+    for field, value in filters.items():
+        values = value if isinstance(value, (list, tuple)) else [value]
+        values = [str(item) for item in values if item not in (None, "")]
+        for item in values or [ANY]:
+            tags.append(f"{search_type}:{field}:{item}")
+    
+    return tags
+
+def entity_tags(search_type: str, result: Any) -> List[str]:
+    """
+    Get a tag for each entity (project or user) listed in an upstream search response.
+    
+    Args:
+        search_type: Type of search (projects, users)
+        result: Decoded upstream response
+        
+    Returns:
+        Tags such as 'projects:entity:<id>'
+    """
+    data = result.get("data") if isinstance(result, dict) else None
+    items = data.get(search_type) if isinstance(data, dict) else None
+    
+    if not isinstance(items, list):
+        return []
+    
+    tags = []
+    for item in items:
+        if not isinstance(item, dict):
+            continue
+        entity_id = item.get("_id") or item.get("id")
+        if entity_id is not None:
+            tags.append(f"{search_type}:entity:{entity_id}")
+    
+    return tags
+
+def tags_for_event(event: Dict[str, Any]) -> Set[str]:
+    """
+    Map a change event to the tags of the cache entries it may have made stale.
+    
+    Events have a type of the form '<kind>.<action>' (e.g. 'project.updated',
+    'user.deleted'). A changed project or user evicts the entries listing it
+    and every search whose filters it matches, before or after the change.
+    Any event may also name tags to evict explicitly in 'tags'.
+    
+    Args:
+        event: Change event, e.g. {"type": "project.updated", "id": "42", "category": "web"}
+        
+    Returns:
+        Tags to evict
+    """
+    tags = set(event.get("tags") or [])
+    kind = str(event.get("type", "")).split(".")[0]
+    
+    if kind in EVENT_FILTER_FIELDS:
+        search_type, field, previous_field = EVENT_FILTER_FIELDS[kind]
+        
+        if event.get("id") is not None:
+            tags.add(f"{search_type}:entity:{event['id']}")
+        
+        values = {event.get(field), event.get(previous_field)} - {None}
+        for value in values | {ANY}:
+            tags.add(f"{search_type}:{field}:{value}")
+    
+    if kind == "skill" and event.get("name"):
+        tags.update(f"{search_type}:skills:{event['name']}" for search_type in ("projects", "users"))
+    
+    return tags
+
+class CacheInvalidator:
+    """
+    Evicts tagged search cache entries on change events published to a Redis channel.
+    
+    Every worker process listens, so events are handled while any worker is
+    up, but only the first worker to claim an event handles it; the others
+    skip it. Events are claimed by their eventId, or by their content if
+    they were published without one.
+    """
+    
+    def __init__(self):
+        self.channel = settings.CACHE_INVALIDATION_CHANNEL
+        self.events_received = 0
+        self.events_handled = 0
+        self.max_keys = settings.CACHE_TAG_MAX_KEYS
+        self._worker = None
+        self._script = None
+        self._tag_script = None
+    
+    @property
+    def redis(self):
+        """Redis client, connected on first use."""
+        return get_redis_client()
+    
+    @property
+    def enabled(self) -> bool:
+        return settings.CACHE_INVALIDATION_ENABLED
+    
+    @property
+    def generation_key(self) -> str:
+        return f"{settings.REDIS_PREFIX}tags:generation"
+    
+    def generation(self) -> Optional[str]:
+        """Get the invalidation counter, incremented by every invalidation."""
+        return self.redis.get(self.generation_key) if self.enabled else None
+    
+    def ttl_for(self, generation: Optional[str]) -> int:
+        """
+        Get the TTL of an entry filled from an upstream response.
+        
+        Entries get the long tagged TTL only when no invalidation happened
+        while they were being fetched; otherwise the response may predate the
+        change and the entry falls back to the regular TTL.
+        
+        Args:
+            generation: Invalidation counter read before the upstream request
+            
+        Returns:
+            TTL in seconds
+        """
+        if self.enabled and self.generation() == generation:
+            return settings.CACHE_INVALIDATION_TTL
+        
+        return settings.REDIS_CACHE_TTL
+    
+    def tag(self, pipe, cache_key: str, tags: Iterable[str], ttl: int):
+        """
+        Add a cache key to its tag sets as part of a pipeline.
+        
+        Keys of expired entries are pruned from the sets as they are added
+        to, so sets of hot tags stay the size of the entries still cached.
+        A set holding more than CACHE_TAG_MAX_KEYS keys evicts the entries
+        expiring soonest, as they could no longer be invalidated.
+        
+        Args:
+            pipe: Redis pipeline filling the entry
+            cache_key: Cache key
+            tags: Tags of the entry
+            ttl: TTL of the entry; tag sets live as long as their newest entry
+        """
+        keys = [tag_key(tag) for tag in sorted(set(tags))]
+        
+        if not keys:
+            return
+        
+        if self._tag_script is None:
+            self._tag_script = self.redis.register_script(TAG_SCRIPT)
+        
+        now = int(time.time() * 1000)
+        self._tag_script(keys=keys, args=[cache_key, now + ttl * 1000, now, self.max_keys], client=pipe)
+    
+    def invalidate(self, tags: Iterable[str]) -> int:
+        """
+        Evict all cache entries carrying any of the tags.
+        
+        Args:
+            tags: Tags to evict
+            
+        Returns:
+            Number of cache entries evicted
+        """
+        keys = [tag_key(tag) for tag in sorted(set(tags))]
+        
+        if not keys:
+            return 0
+        
+        if self._script is None:
+            self._script = self.redis.register_script(INVALIDATE_SCRIPT)
+        
+        self.redis.incr(self.generation_key)
+        evicted = self._script(keys=keys)
+        CACHE_EVICTIONS.inc(evicted)
+        
+        return evicted
+    
+    def handle_event(self, event: Dict[str, Any]) -> int:
+        """
+        Evict the cache entries made stale by a change event.
+        
+        Args:
+            event: Change event
+            
+        Returns:
+            Number of cache entries evicted
+        """
+        tags = tags_for_event(event)
+        evicted = self.invalidate(tags)
+        
+        CACHE_INVALIDATIONS.labels(str(event.get("type", "tags"))).inc()
+        logger.info(
+            "Invalidated %d cache entries for %s",
+            evicted,
+            event.get("type", "tags"),
+            extra={"event": "cache.invalidated", "tags": sorted(tags), "evicted": evicted},
+        )
+        
+        return evicted
+    
+    def _claim(self, data: str, event: Dict[str, Any]) -> bool:
+        """Claim an event for this worker, so that it is handled once rather than once per worker."""
+        event_id = event.get("eventId") or hashlib.sha1(data.encode()).hexdigest()
+        return bool(self.redis.set(f"{settings.REDIS_PREFIX}tags:claimed:{event_id}", 1, nx=True, ex=EVENT_CLAIM_TTL))
+    
+    def _on_message(self, message: Dict[str, Any]):
+        self.events_received += 1
+        
+        try:
+            event = json.loads(message["data"])
+            if self._claim(message["data"], event):
+                self.events_handled += 1
+                self.handle_event(event)
+        except Exception as e:
+            logger.error(f"Failed to handle cache invalidation event {message.get('data')!r}: {e}")
+    
+    def _on_error(self, error: Exception, pubsub, worker):
+        # Keep listening; the subscription is restored when the connection comes back
+        logger.error(f"Cache invalidation listener error: {error}")
+        time.sleep(1.0)
+    
+    def start(self):
+        """Start listening for change events on a background thread."""
+        if not self.enabled or self._worker is not None:
+            return
+        
+        pubsub = self.redis.pubsub(ignore_subscribe_messages=True)
+        pubsub.subscribe(**{self.channel: self._on_message})
+        self._worker = pubsub.run_in_thread(sleep_time=1.0, daemon=True, exception_handler=self._on_error)
+        logger.info(f"Listening for cache invalidation events on {self.channel}")
+    
+    def stop(self):
+        """Stop listening for change events."""
+        if self._worker is not None:
+            self._worker.stop()
+            self._worker = None
+    
+    def reset(self):
+        """Forget a listener inherited from a parent process; its thread does not survive fork."""
+        self._worker = None
+        self._script = None
+        self._tag_script = None
+    
+    def status(self) -> Dict[str, Any]:
+        """Get listener state for health reporting."""
+        return {
+            "enabled": self.enabled,
+            "listening": self._worker is not None and self._worker.is_alive(),
+            "channel": self.channel,
+            "events_received": self.events_received,
+            "events_handled": self.events_handled,
+        }
+    
+    def publish(self, event: Dict[str, Any]) -> int:
+        """
+        Publish a change event, with an eventId identifying it to the listeners.
+        
+        Args:
+            event: Change event
+            
+        Returns:
+            Number of listeners that received it
+        """
+        return self.redis.publish(self.channel, json.dumps({"eventId": uuid.uuid4().hex, **event}))
+
+# Create cache invalidator instance
+cache_invalidator = CacheInvalidator()
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Publish a cache invalidation event, e.g. "
+        "python -m src.services.cache_invalidation project.updated --id 42 --category web",
+    )
+    parser.add_argument("type", help="Event type, e.g. project.updated, user.deleted, skill.updated")
+    parser.add_argument("--id", help="Project or user ID")
+    parser.add_argument("--category", help="Project category")
+    parser.add_argument("--previous-category", help="Project category before the change")
+    parser.add_argument("--role", help="User role")
+    parser.add_argument("--previous-role", help="User role before the change")
+    parser.add_argument("--name", help="Skill name")
+    parser.add_argument("--tag", action="append", dest="tags", help="Extra tag to evict (repeatable)")
+    args = parser.parse_args()
+    
+    event = {
+        "type": args.type,
+        "id": args.id,
+        "category": args.category,
+        "previousCategory": args.previous_category,
+        "role": args.role,
+        "previousRole": args.previous_role,
+        "name": args.name,
+        "tags": args.tags,
+    }
+    event = {key: value for key, value in event.items() if value is not None}
+    
+    receivers = cache_invalidator.publish(event)
+    print(f"Published {json.dumps(event)} to {cache_invalidator.channel} ({receivers} listeners)")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,194 @@
+import asyncio
+import logging
+import random
+import time
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional, Tuple
+
+from src.core.config import settings
+from src.core.database import get_mongo_db, get_redis_client
+from src.core.exceptions import UnauthorizedException
+from src.core.metrics import CACHE_WARMING, CACHE_WARMING_COVERAGE
+from src.services.search_service import SearchRequest, search_service
+
+logger = logging.getLogger(__name__)
+
+# Search types whose most common searches are kept warm
+WARMED_SEARCH_TYPES = ("projects", "users")
+
+class CacheWarmer:
+    """
+    Keeps the first pages of the most common searches in the search cache.
+    
+    Every CACHE_WARMING_INTERVAL seconds one worker takes the
+    CACHE_WARMING_TOP_QUERIES most frequent first-page searches of each type
+    from the raw search history of the last CACHE_WARMING_LOOKBACK_HOURS,
+    with the filters they were made with, so they map to the exact cache
+    entries user searches read. Entries that are missing or would expire
+    before the next run are fetched again, at most CACHE_WARMING_RATE per
+    second and without queueing ahead of user searches. After a deploy, a
+    Redis flush or a wave of expiries, the common searches are then refilled
+    at a steady pace instead of all missing at once.
+    
+    Coverage is the share of all searches in the lookback window whose cache
+    entry is warm after the run.
+    
+    Upstream searches are authenticated, so warming stays off until
+    CACHE_WARMING_TOKEN is configured. If an upstream rejects the token, the
+    stale entries of that type are skipped for the rest of the run; the
+    rejections do not count against the upstream's circuit breaker.
+    """
+    
+    def __init__(self):
+        self.token = settings.CACHE_WARMING_TOKEN or None
+        self.enabled = settings.CACHE_WARMING_ENABLED and self.token is not None
+        self.interval = settings.CACHE_WARMING_INTERVAL
+        self.lookback = timedelta(hours=settings.CACHE_WARMING_LOOKBACK_HOURS)
+        self.top_queries = settings.CACHE_WARMING_TOP_QUERIES
+        self.rate = settings.CACHE_WARMING_RATE
+        self.last_run: Optional[Dict[str, Any]] = None
+    
+    @property
+    def redis(self):
+        """Redis client, connected on first use."""
+        return get_redis_client()
+    
+    @property
+    def collection(self):
+        """Raw search history, one document per search."""
+        return get_mongo_db()["search_history"]
+    
+    def _acquire_run(self) -> bool:
+        """Claim this interval's run; the claim expires rather than being released, so workers run in turn."""
+        return bool(self.redis.set(f"{settings.REDIS_PREFIX}locks:cache_warming", 1, nx=True, ex=self.interval))
+    
+    def _top_searches(self, search_type: str, since: datetime) -> Tuple[int, List[Tuple[SearchRequest, int]]]:
+        """
+        Get the most common first-page searches of a type.
+        
+        Args:
+            search_type: Type of search (projects, users)
+            since: Start of the lookback window
+            
+        Returns:
+            Number of searches of the type in the window, and the most common
+            first-page searches with their counts, most common first
+        """
+        match = {"searchType": search_type, "createdAt": {"$gte": since}}
+        total = self.collection.count_documents(match)
+        
+        pipeline = [
+            {"$match": {**match, "filters.page": {"$in": [1, None]}}},
+            {"$group": {"_id": {"query": "$query", "filters": "$filters"}, "count": {"$sum": 1}}},
+            {"$sort": {"count": -1}},
+            {"$limit": self.top_queries},
+        ]
+        
+        # Filters recorded differently (e.g. a missing or null field) can map to the same cache entry
+        searches: Dict[str, Tuple[SearchRequest, int]] = {}
+        for doc in self.collection.aggregate(pipeline):
+            request = search_service.request_for(search_type, doc["_id"]["query"], doc["_id"].get("filters") or {})
+            previous = searches.get(request.cache_key)
+            searches[request.cache_key] = (request, doc["count"] + (previous[1] if previous else 0))
+        
+        return total, list(searches.values())
+    
+    def _stale_keys(self, keys: List[str]) -> List[bool]:
+        """Check which cache entries are missing or would expire before the next run."""
+        pipe = self.redis.pipeline()
+        for key in keys:
+            pipe.ttl(key)
+        
+        # Refresh a run early, in case the next one is late or taken by a slower worker
+        return [ttl == -2 or 0 <= ttl < 2 * self.interval for ttl in pipe.execute()]
+    
+    async def warm(self) -> Optional[Dict[str, Any]]:
+        """
+        Refresh the cache entries of the most common searches, unless another worker did this interval.
+        
+        Returns:
+            Run summary, or None if another worker has the run
+        """
+        if not await asyncio.to_thread(self._acquire_run):
+            return None
+        
+        start = time.perf_counter()
+        since = datetime.utcnow() - self.lookback
+        next_request = time.monotonic()
+        summary: Dict[str, Any] = {"refreshed": 0, "fresh": 0, "failed": 0, "rejected": 0, "coverage": {}}
+        
+        for search_type in WARMED_SEARCH_TYPES:
+            total, searches = await asyncio.to_thread(self._top_searches, search_type, since)
+            stale = await asyncio.to_thread(self._stale_keys, [request.cache_key for request, _ in searches])
+            covered = 0
+            rejected = False
+            
+            for (request, count), is_stale in zip(searches, stale):
+                if not is_stale:
+                    result = "fresh"
+                elif rejected:
+                    result = "rejected"
+                else:
+                    await asyncio.sleep(max(0.0, next_request - time.monotonic()))
+                    next_request = max(next_request, time.monotonic()) + 1 / self.rate
+                    
+                    try:
+                        await search_service.warm(search_type, request, self.token)
+                        result = "refreshed"
+                    except UnauthorizedException as e:
+                        logger.warning(f"Cache warming of {search_type} searches skipped: {e.message}")
+                        rejected = True
+                        result = "rejected"
+                    except Exception as e:
+                        logger.debug(f"Cache warming of {request.cache_key} failed: {e}")
+                        result = "failed"
+                
+                CACHE_WARMING.labels(search_type, result).inc()
+                summary[result] += 1
+                if result in ("refreshed", "fresh"):
+                    covered += count
+            
+            coverage = round(covered / total, 4) if total else None
+            summary["coverage"][search_type] = coverage
+            if coverage is not None:
+                CACHE_WARMING_COVERAGE.labels(search_type).set(coverage)
+        
+        summary["duration_ms"] = round((time.perf_counter() - start) * 1000, 1)
+        summary["finished_at"] = datetime.utcnow().isoformat()
+        self.last_run = summary
+        
+        logger.info(
+            "Cache warming refreshed %d entries (%d fresh, %d failed, %d rejected), coverage %s",
+            summary["refreshed"],
+            summary["fresh"],
+            summary["failed"],
+            summary["rejected"],
+            summary["coverage"],
+            extra={"event": "cache_warming.finished", **summary},
+        )
+        
+        return summary
+    
+    async def run(self):
+        """Warm the cache periodically until cancelled."""
+        # Spread the first run so workers started together do not all query the history
+        await asyncio.sleep(random.uniform(0, min(10, self.interval)))
+        
+        while True:
+            try:
+                await self.warm()
+            except Exception as e:
+                logger.error(f"Cache warming failed: {e}")
+            
+            await asyncio.sleep(self.interval * random.uniform(0.9, 1.1))
+    
+    def status(self) -> Dict[str, Any]:
+        """Get the last run of this worker for health reporting."""
+        return {
+            "enabled": self.enabled,
+            "interval": self.interval,
+            "last_run": self.last_run,
+        }
+
+# Create cache warmer instance
+cache_warmer = CacheWarmer()
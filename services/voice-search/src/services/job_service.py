@@ -0,0 +1,444 @@
+import asyncio
+import base64
+import json
+import logging
+import queue
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Any, Dict, Optional, Tuple
+
+from src.core.admission import retry_after_header
+from src.core.config import settings
+from src.core.database import get_redis_client
+from src.core.exceptions import AppException, ConflictException, NotFoundException, ServiceUnavailableException
+from src.core.metrics import VOICE_SEARCH_JOBS
+from src.models.search import VoiceSearchRequest
+from src.services.voice_search_service import run_voice_search
+
+logger = logging.getLogger(__name__)
+
+class RedisJobStore:
+    """Jobs kept in Redis hashes and queued on a Redis list shared by all workers."""
+    
+    def __init__(self, ttl: int):
+        self.ttl = ttl
+        self.queue_key = f"{settings.REDIS_PREFIX}jobs:queue"
+    
+    @property
+    def redis(self):
+        """Redis client, connected on first use."""
+        return get_redis_client()
+    
+    def _key(self, job_id: str) -> str:
+        return f"{settings.REDIS_PREFIX}jobs:{job_id}"
+    
+    def _payload_key(self, job_id: str) -> str:
+        return f"{settings.REDIS_PREFIX}jobs:{job_id}:payload"
+    
+    def claim_idempotency_key(self, user_id: str, key: str, job_id: str) -> Optional[str]:
+        """Bind an idempotency key to a job ID, or get the job ID it is already bound to."""
+        idempotency_key = f"{settings.REDIS_PREFIX}jobs:idempotency:{user_id}:{key}"
+        
+        if self.redis.set(idempotency_key, job_id, nx=True, ex=self.ttl):
+            return None
+        
+        return self.redis.get(idempotency_key)
+    
+    def release_idempotency_key(self, user_id: str, key: str):
+        """Unbind an idempotency key, so a submission whose job could not be stored can be retried with it."""
+        self.redis.delete(f"{settings.REDIS_PREFIX}jobs:idempotency:{user_id}:{key}")
+    
+    def create(self, job: Dict[str, str], payload: Dict[str, Any]):
+        """Store a job with the input needed to run it and queue it."""
+        # The Redis client decodes responses as text
+        payload = {**payload, "audio": base64.b64encode(payload["audio"]).decode()}
+        
+        pipe = self.redis.pipeline()
+        pipe.hset(self._key(job["id"]), mapping=job)
+        pipe.expire(self._key(job["id"]), self.ttl)
+        pipe.set(self._payload_key(job["id"]), json.dumps(payload), ex=self.ttl)
+        pipe.lpush(self.queue_key, job["id"])
+        pipe.execute()
+    
+    def requeue(self, job_id: str, payload: Dict[str, Any]):
+        """Put back the input of a job that was interrupted and queue it to run next."""
+        payload = {**payload, "audio": base64.b64encode(payload["audio"]).decode()}
+        
+        pipe = self.redis.pipeline()
+        pipe.set(self._payload_key(job_id), json.dumps(payload), ex=self.ttl)
+        pipe.rpush(self.queue_key, job_id)
+        pipe.execute()
+    
+    def queued(self) -> int:
+        """Get the number of jobs waiting to run."""
+        return self.redis.llen(self.queue_key)
+    
+    def get(self, job_id: str) -> Optional[Dict[str, str]]:
+        return self.redis.hgetall(self._key(job_id)) or None
+    
+    def update(self, job_id: str, fields: Dict[str, str]):
+        """Update a job, restarting its retention period."""
+        pipe = self.redis.pipeline()
+        pipe.hset(self._key(job_id), mapping=fields)
+        pipe.expire(self._key(job_id), self.ttl)
+        pipe.execute()
+    
+    def dequeue(self, timeout: float) -> Optional[str]:
+        """Wait up to timeout seconds for a queued job ID."""
+        item = self.redis.brpop(self.queue_key, timeout=max(1, int(timeout)))
+        return item[1] if item else None
+    
+    def push_back(self, job_id: str):
+        """Queue a job ID that was taken off the queue but not started to run next."""
+        self.redis.rpush(self.queue_key, job_id)
+    
+    def take_payload(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """Get and delete the input of a job."""
+        pipe = self.redis.pipeline()
+        pipe.get(self._payload_key(job_id))
+        pipe.delete(self._payload_key(job_id))
+        payload = pipe.execute()[0]
+        
+        if payload is None:
+            return None
+        
+        payload = json.loads(payload)
+        payload["audio"] = base64.b64decode(payload["audio"])
+        return payload
+
+class MemoryJobStore:
+    """
+    Jobs kept in process memory.
+    
+    Only jobs submitted to the same process can be polled and run, so this is
+    meant for tests and single-process development servers.
+    """
+    
+    def __init__(self, ttl: int):
+        self.ttl = ttl
+        self._jobs: Dict[str, Tuple[float, Dict[str, str]]] = {}
+        self._payloads: Dict[str, Dict[str, Any]] = {}
+        self._idempotency_keys: Dict[Tuple[str, str], Tuple[float, str]] = {}
+        self._queue: "queue.Queue[str]" = queue.Queue()
+        self._lock = threading.Lock()
+    
+    def claim_idempotency_key(self, user_id: str, key: str, job_id: str) -> Optional[str]:
+        with self._lock:
+            existing = self._idempotency_keys.get((user_id, key))
+            if existing and existing[0] > time.monotonic():
+                return existing[1]
+            
+            self._idempotency_keys[(user_id, key)] = (time.monotonic() + self.ttl, job_id)
+            return None
+    
+    def release_idempotency_key(self, user_id: str, key: str):
+        with self._lock:
+            self._idempotency_keys.pop((user_id, key), None)
+    
+    def create(self, job: Dict[str, str], payload: Dict[str, Any]):
+        with self._lock:
+            self._jobs[job["id"]] = (time.monotonic() + self.ttl, dict(job))
+            self._payloads[job["id"]] = payload
+        self._queue.put(job["id"])
+    
+    def requeue(self, job_id: str, payload: Dict[str, Any]):
+        with self._lock:
+            self._payloads[job_id] = payload
+        self._queue.put(job_id)
+    
+    def queued(self) -> int:
+        return self._queue.qsize()
+    
+    def get(self, job_id: str) -> Optional[Dict[str, str]]:
+        with self._lock:
+            entry = self._jobs.get(job_id)
+            if entry is None or entry[0] <= time.monotonic():
+                self._jobs.pop(job_id, None)
+                return None
+            
+            return dict(entry[1])
+    
+    def update(self, job_id: str, fields: Dict[str, str]):
+        with self._lock:
+            if job_id in self._jobs:
+                self._jobs[job_id] = (time.monotonic() + self.ttl, {**self._jobs[job_id][1], **fields})
+    
+    def dequeue(self, timeout: float) -> Optional[str]:
+        try:
+            return self._queue.get(timeout=timeout)
+        except queue.Empty:
+            return None
+    
+    def push_back(self, job_id: str):
+        self._queue.put(job_id)
+    
+    def take_payload(self, job_id: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            return self._payloads.pop(job_id, None)
+
+def job_view(job: Dict[str, str]) -> Dict[str, Any]:
+    """Get the client-facing state of a job."""
+    view: Dict[str, Any] = {
+        "jobId": job["id"],
+        "status": job["status"],
+        "createdAt": job["createdAt"],
+        "updatedAt": job["updatedAt"],
+    }
+    
+    if job.get("error"):
+        view["error"] = json.loads(job["error"])
+    
+    return view
+
+class VoiceSearchJobService:
+    """
+    Voice searches run as background jobs that clients poll for results.
+    
+    Submitting returns immediately with a job ID. Jobs are queued in Redis
+    (JOB_QUEUE_BACKEND=redis) and run by any worker process, up to
+    JOB_WORKERS at a time per process; the in-memory backend keeps them in
+    the submitting process. At most JOB_MAX_QUEUED jobs wait to run; further
+    submissions are refused. Jobs interrupted by a worker shutting down are
+    queued again. Results are kept for JOB_RESULT_TTL seconds. A
+    client-supplied idempotency key maps retried submissions to the same job.
+    """
+    
+    def __init__(self):
+        self.enabled = settings.JOBS_ENABLED
+        self.concurrency = settings.JOB_WORKERS
+        self.result_ttl = settings.JOB_RESULT_TTL
+        self.max_queued = settings.JOB_MAX_QUEUED
+        self._store = None
+    
+    @property
+    def store(self):
+        """Job store for the configured backend, created on first use."""
+        if self._store is None:
+            if settings.JOB_QUEUE_BACKEND == "memory":
+                self._store = MemoryJobStore(self.result_ttl)
+            else:
+                self._store = RedisJobStore(self.result_ttl)
+        
+        return self._store
+    
+    def submit(
+        self,
+        user: Dict[str, Any],
+        request: VoiceSearchRequest,
+        audio_bytes: bytes,
+        file_extension: str,
+        idempotency_key: Optional[str] = None,
+    ) -> Tuple[Dict[str, Any], bool]:
+        """
+        Queue a voice search.
+        
+        Args:
+            user: Authenticated user (id and token)
+            request: Search type and filters
+            audio_bytes: Uploaded audio
+            file_extension: File extension of the upload
+            idempotency_key: Client-supplied key identifying retries of the same submission
+            
+        Returns:
+            Job state, and whether the job was created (False for a retried submission)
+            
+        Raises:
+            ServiceUnavailableException: If JOB_MAX_QUEUED jobs are already waiting
+        """
+        # Checked before the idempotency key is claimed, so a refused submission can be retried with it
+        if self.max_queued and self.store.queued() >= self.max_queued:
+            VOICE_SEARCH_JOBS.labels("rejected").inc()
+            raise ServiceUnavailableException(
+                message="Too many voice search jobs are queued, please retry later",
+                details={"reason": "job_queue_full"},
+                headers=retry_after_header(5),
+            )
+        
+        job_id = uuid.uuid4().hex
+        
+        if idempotency_key:
+            existing_id = self.store.claim_idempotency_key(user["id"], idempotency_key, job_id)
+            if existing_id:
+                job = self.store.get(existing_id)
+                if job is None:
+                    # Claimed by a concurrent submission that has not stored its job yet
+                    raise ConflictException(message="A job with this Idempotency-Key is being created")
+                
+                VOICE_SEARCH_JOBS.labels("deduplicated").inc()
+                return job_view(job), False
+        
+        now = datetime.utcnow().isoformat()
+        job = {"id": job_id, "userId": user["id"], "status": "queued", "createdAt": now, "updatedAt": now}
+        payload = {
+            "user": {"id": user["id"], "token": user.get("token")},
+            "request": request.dict(),
+            "audio": audio_bytes,
+            "fileExtension": file_extension,
+        }
+        
+        try:
+            self.store.create(job, payload)
+        except Exception:
+            if idempotency_key:
+                # Otherwise retries would be refused as in progress until the key expires
+                try:
+                    self.store.release_idempotency_key(user["id"], idempotency_key)
+                except Exception as e:
+                    logger.warning(f"Could not release Idempotency-Key of a voice search job that was not created: {e}")
+            raise
+        
+        VOICE_SEARCH_JOBS.labels("submitted").inc()
+        
+        return job_view(job), True
+    
+    def get(self, job_id: str, user_id: str) -> Dict[str, str]:
+        """
+        Get a job of a user.
+        
+        Args:
+            job_id: Job ID
+            user_id: User ID
+            
+        Returns:
+            Stored job, including the results once it succeeded
+            
+        Raises:
+            NotFoundException: If the job does not exist, expired or belongs to another user
+        """
+        job = self.store.get(job_id)
+        
+        if job is None or job["userId"] != user_id:
+            raise NotFoundException(message="Job not found")
+        
+        return job
+    
+    def _update(self, job_id: str, status: str, **fields: str):
+        self.store.update(job_id, {"status": status, "updatedAt": datetime.utcnow().isoformat(), **fields})
+    
+    def _requeue(self, job_id: str, payload: Dict[str, Any]):
+        """Queue a job interrupted by cancellation again, or fail it if that is not possible."""
+        try:
+            self.store.requeue(job_id, payload)
+            self._update(job_id, "queued")
+            VOICE_SEARCH_JOBS.labels("requeued").inc()
+        except Exception as e:
+            logger.error(f"Could not requeue interrupted voice search job {job_id}: {e}")
+            try:
+                self._update(job_id, "failed", error=json.dumps({"status": 503, "message": "Job was interrupted"}))
+                VOICE_SEARCH_JOBS.labels("failed").inc()
+            except Exception:
+                pass
+    
+    async def _process(self, job_id: str):
+        payload = self.store.take_payload(job_id)
+        if payload is None:
+            logger.warning(f"Input of voice search job {job_id} expired before it ran")
+            self._update(job_id, "failed", error=json.dumps({"status": 410, "message": "Job input expired"}))
+            VOICE_SEARCH_JOBS.labels("failed").inc()
+            return
+        
+        self._update(job_id, "running")
+        
+        try:
+            query, results = await run_voice_search(
+                payload["user"],
+                VoiceSearchRequest(**payload["request"]),
+                payload["audio"],
+                payload["fileExtension"],
+                background=True,
+            )
+        except asyncio.CancelledError:
+            # The worker is shutting down or being recycled; the input was already taken off the store
+            self._requeue(job_id, payload)
+            raise
+        except AppException as e:
+            error = {"status": e.status_code, "message": e.message, "error": e.error}
+            self._update(job_id, "failed", error=json.dumps(error))
+            VOICE_SEARCH_JOBS.labels("failed").inc()
+            return
+        except Exception as e:
+            logger.error(f"Voice search job {job_id} failed: {e}")
+            error = {"status": 500, "message": "An unexpected error occurred"}
+            self._update(job_id, "failed", error=json.dumps(error))
+            VOICE_SEARCH_JOBS.labels("failed").inc()
+            return
+        
+        self._update(
+            job_id,
+            "succeeded",
+            query=query,
+            results=results.body.decode("utf-8"),
+            total=str(results.total),
+        )
+        VOICE_SEARCH_JOBS.labels("succeeded").inc()
+    
+    async def _push_back(self, pending: "asyncio.Future[Optional[str]]"):
+        """Wait for a dequeue interrupted by cancellation and queue the job it took again."""
+        try:
+            job_id = await pending
+        except Exception:
+            return
+        
+        if job_id is None:
+            return
+        
+        try:
+            self.store.push_back(job_id)
+        except Exception as e:
+            logger.error(f"Could not queue voice search job {job_id} again: {e}")
+            try:
+                self._update(job_id, "failed", error=json.dumps({"status": 503, "message": "Job was interrupted"}))
+                VOICE_SEARCH_JOBS.labels("failed").inc()
+            except Exception:
+                pass
+    
+    async def run_workers(self):
+        """Take jobs off the queue and run them, JOB_WORKERS at a time, until cancelled."""
+        slots = asyncio.Semaphore(self.concurrency)
+        running = set()
+        # Waiting on the queue blocks a thread; keep it out of the default executor used by requests
+        dequeuer = ThreadPoolExecutor(max_workers=1, thread_name_prefix="job-dequeue")
+        loop = asyncio.get_running_loop()
+        
+        async def run(job_id: str):
+            try:
+                await self._process(job_id)
+            finally:
+                slots.release()
+        
+        pending = None
+        
+        try:
+            while True:
+                await slots.acquire()
+                pending = loop.run_in_executor(dequeuer, self.store.dequeue, 1.0)
+                try:
+                    # Shielded, so a job taken off the queue as the workers are cancelled can be put back
+                    job_id = await asyncio.shield(pending)
+                except Exception as e:
+                    logger.warning(f"Could not take a voice search job off the queue: {e}")
+                    job_id = None
+                    await asyncio.sleep(1.0)
+                pending = None
+                
+                if job_id is None:
+                    slots.release()
+                    continue
+                
+                task = asyncio.create_task(run(job_id))
+                running.add(task)
+                task.add_done_callback(running.discard)
+        finally:
+            if pending is not None:
+                await self._push_back(pending)
+            for task in running:
+                task.cancel()
+            # Let interrupted jobs requeue themselves before the process exits
+            await asyncio.gather(*running, return_exceptions=True)
+            dequeuer.shutdown(wait=False)
+
+# Create voice search job service instance
+voice_search_job_service = VoiceSearchJobService()
@@ -1,17 +1,92 @@
+import asyncio
+import json
 import logging
-from datetime import datetime
-from typing import Dict, List, Any, Optional
+import random
+import time
+from datetime import datetime, timedelta
+from typing import Dict, List, Any, NamedTuple, Optional, Tuple
 
-from src.core.database import get_mongo_db
+from src.core.config import settings
+from src.core.database import get_mongo_db, get_redis_client
+from src.core.etag import make_etag
+from src.core.metrics import CACHE_REQUESTS, track_stage
+from src.services.trending_service import trending_service
 
 logger = logging.getLogger(__name__)
 
+# Replaces a user's recent searches, unless a search was added since they were read from MongoDB.
+# unpack is table.unpack outside Redis' Lua 5.1, e.g. in fakeredis.
+FILL_RECENT_SCRIPT = """
+local unpack = table.unpack or unpack
+local latest = redis.call('GET', KEYS[2]) or ''
+if latest ~= ARGV[1] then
+    return 0
+end
+if latest == '' then
+    redis.call('SET', KEYS[2], ARGV[3], 'EX', ARGV[2])
+end
+redis.call('DEL', KEYS[1])
+redis.call('RPUSH', KEYS[1], unpack(ARGV, 4))
+redis.call('EXPIRE', KEYS[1], ARGV[2])
+return 1
+"""
+
+# Seconds the compaction watermark read by readers is reused for
+WATERMARK_CACHE_SECONDS = 60
+
+# Errors MongoDB before 5.0 raises for the $dateTrunc expression and $merge stage compaction uses
+UNSUPPORTED_PIPELINE_CODES = {168, 40324}
+
+class RawPopularSearches(NamedTuple):
+    """Popular searches as encoded JSON, with the ETag computed when they were encoded."""
+    
+    body: bytes
+    etag: str
+
 class SearchHistoryService:
-    """Service for managing search history."""
+    """
+    Service for managing search history.
+    
+    The newest HISTORY_RECENT_SIZE searches of each user are also kept in a
+    Redis list, so that first pages of /history are answered without MongoDB.
+    A list is filled from MongoDB on a miss, written through on every search
+    while it exists, and dropped after HISTORY_RECENT_TTL seconds without one.
+    The ID of each user's newest search is kept alongside as a version of
+    their history, from which /history ETags are derived.
+    """
     
     def __init__(self):
-        self.db = get_mongo_db()
-        self.collection = self.db["search_history"]
+        self.recent_size = settings.HISTORY_RECENT_SIZE
+        self.recent_ttl = settings.HISTORY_RECENT_TTL
+        self.popular_cache_ttl = settings.POPULAR_CACHE_TTL
+        self._fill_script = None
+        self._watermark: Optional[datetime] = None
+        self._watermark_read_at: Optional[float] = None
+    
+    @property
+    def redis(self):
+        """Redis client, connected on first use."""
+        return get_redis_client()
+    
+    @property
+    def db(self):
+        """MongoDB database, connected on first use."""
+        return get_mongo_db()
+    
+    @property
+    def collection(self):
+        """Raw search history, one document per search."""
+        return self.db["search_history"]
+    
+    @property
+    def daily_collection(self):
+        """Compacted search history, one document per user, query and day."""
+        return self.db["search_history_daily"]
+    
+    @property
+    def meta_collection(self):
+        """Compaction state."""
+        return self.db["search_history_meta"]
     
     async def add_search(
         self,
@@ -46,10 +121,21 @@ class SearchHistoryService:
             "createdAt": datetime.utcnow(),
         }
         
-        result = self.collection.insert_one(search_entry)
+        with track_stage("history_write"):
+            result = self.collection.insert_one(search_entry)
         search_entry["_id"] = str(result.inserted_id)
         
-        logger.info(f"Added search history for user {user_id}: {query}")
+        with track_stage("history_cache"):
+            self._push_recent(search_entry)
+        
+        trending_service.record(search_type, query)
+        
+        logger.info(
+            "Added search history for user %s: %s",
+            user_id,
+            query,
+            extra={"event": "search_history.added", "user_id": user_id, "query": query},
+        )
         
         return search_entry
     
@@ -63,6 +149,14 @@ class SearchHistoryService:
         """
         Get search history for a user.
         
+        Searches since the raw cutoff are returned one entry per search. Older,
+        compacted searches continue from the daily aggregates, one entry per
+        day and query, marked with `compacted` and the number of searches in `count`.
+        Pages within the newest HISTORY_RECENT_SIZE searches are read from the
+        user's recent searches in Redis. A list shorter than that holds all of
+        the user's searches since the cutoff, so it answers such pages alone,
+        continued from the daily aggregates if it runs out.
+        
         Args:
             user_id: User ID
             limit: Maximum number of entries
@@ -72,17 +166,82 @@ class SearchHistoryService:
         Returns:
             List of search history entries
         """
-        query = {"userId": user_id}
+        cutoff = self._raw_cutoff()
+        history: Optional[List[Dict[str, Any]]] = None
+        
+        if skip + limit <= self.recent_size:
+            cached = self._get_recent(user_id, cutoff)
+            if cached is not None:
+                recent, complete = cached
+                if search_type:
+                    recent = [entry for entry in recent if entry["searchType"] == search_type]
+                if len(recent) >= skip + limit:
+                    return recent[skip:skip + limit]
+                if complete:
+                    # The list holds every search since the cutoff; only older days can follow
+                    history = recent[skip:]
+                    raw_total = len(recent)
+        
+        if history is None:
+            query = _raw_query(user_id, cutoff)
+            
+            if search_type:
+                query["searchType"] = search_type
+            
+            cursor = self.collection.find(query).sort("createdAt", -1).skip(skip).limit(limit)
+            
+            history = []
+            for doc in cursor:
+                doc["_id"] = str(doc["_id"])
+                history.append(doc)
+            
+            if len(history) == limit:
+                return history
+            
+            # The raw tier is exhausted; continue with days older than the cutoff
+            if cutoff is not None:
+                raw_total = skip + len(history) if history else self.collection.count_documents(query)
+        
+        if cutoff is not None:
+            history += self._get_daily(user_id, cutoff, search_type, max(0, skip - raw_total), limit - len(history))
+        
+        return history
+    
+    def _get_daily(
+        self,
+        user_id: str,
+        cutoff: datetime,
+        search_type: Optional[str],
+        skip: int,
+        limit: int,
+    ) -> List[Dict[str, Any]]:
+        """Get a user's daily aggregates for days older than the cutoff, as history entries."""
+        daily_query = {"userId": user_id, "day": {"$lt": cutoff}}
         
         if search_type:
-            query["searchType"] = search_type
+            daily_query["searchType"] = search_type
         
-        cursor = self.collection.find(query).sort("createdAt", -1).skip(skip).limit(limit)
+        cursor = (
+            self.daily_collection.find(daily_query)
+            .sort([("day", -1), ("lastUsed", -1)])
+            .skip(skip)
+            .limit(limit)
+        )
         
         history = []
-        async for doc in cursor:
-            doc["_id"] = str(doc["_id"])
-            history.append(doc)
+        for doc in cursor:
+            history.append({
+                "_id": f"{doc['day']:%Y-%m-%d}:{doc['searchType']}:{doc['query']}",
+                "userId": doc["userId"],
+                "query": doc["query"],
+                "searchType": doc["searchType"],
+                "filters": {},
+                "resultsCount": doc["resultsCount"],
+                "source": max(doc["sources"], key=doc["sources"].get),
+                "createdAt": doc["lastUsed"],
+                "count": doc["count"],
+                "compacted": True,
+            })
         
         return history
     
@@ -95,6 +254,11 @@ class SearchHistoryService:
         """
         Get popular searches.
         
+        Days already compacted are read from the daily aggregates and the rest
+        from the raw searches, so the cost depends on the number of distinct
+        queries per day rather than on the number of searches. While no day in
+        the range is compacted, only the raw searches are aggregated.
+        
         Args:
             limit: Maximum number of entries
             search_type: Type of search (projects, users)
@@ -103,23 +267,37 @@ class SearchHistoryService:
         Returns:
             List of popular search queries
         """
-        match_stage = {
-            "createdAt": {
-                "$gte": datetime.utcnow().replace(
-                    hour=0, minute=0, second=0, microsecond=0
-                ) - datetime.timedelta(days=days)
-            }
-        }
+        since = _day_start(datetime.utcnow()) - timedelta(days=days)
+        raw_since = max(since, self._cached_watermark() or since)
+        
+        daily_match = {"day": {"$gte": since, "$lt": raw_since}}
+        raw_match = {"createdAt": {"$gte": raw_since}}
         
         if search_type:
-            match_stage["searchType"] = search_type
+            daily_match["searchType"] = search_type
+            raw_match["searchType"] = search_type
         
-        pipeline = [
-            {"$match": match_stage},
+        raw_pipeline = [
+            {"$match": raw_match},
+            {"$project": {"query": 1, "count": {"$literal": 1}, "lastUsed": "$createdAt"}},
+        ]
+        
+        if raw_since > since:
+            collection = self.daily_collection
+            pipeline = [
+                {"$match": daily_match},
+                {"$project": {"query": 1, "count": 1, "lastUsed": 1}},
+                {"$unionWith": {"coll": self.collection.name, "pipeline": raw_pipeline}},
+            ]
+        else:
+            collection = self.collection
+            pipeline = raw_pipeline
+        
+        pipeline += [
             {"$group": {
                 "_id": "$query",
-                "count": {"$sum": 1},
-                "lastUsed": {"$max": "$createdAt"}
+                "count": {"$sum": "$count"},
+                "lastUsed": {"$max": "$lastUsed"}
             }},
             {"$sort": {"count": -1, "lastUsed": -1}},
             {"$limit": limit},
@@ -131,13 +309,438 @@ class SearchHistoryService:
             }}
         ]
         
-        cursor = self.collection.aggregate(pipeline)
+        cursor = collection.aggregate(pipeline)
         
         popular_searches = []
-        async for doc in cursor:
+        for doc in cursor:
             popular_searches.append(doc)
         
         return popular_searches
+    
+    async def get_popular_searches_raw(
+        self,
+        limit: int = 10,
+        search_type: Optional[str] = None,
+        days: int = 7,
+    ) -> RawPopularSearches:
+        """
+        Get popular searches as encoded JSON, cached for POPULAR_CACHE_TTL seconds.
+        
+        Popular searches are the same for every user, so all polling clients
+        share one cached copy per set of parameters, encoded and hashed once
+        when it is filled.
+        
+        Args:
+            limit: Maximum number of entries
+            search_type: Type of search (projects, users)
+            days: Number of days to look back
+            
+        Returns:
+            Encoded popular searches and their ETag
+        """
+        key = f"{settings.REDIS_PREFIX}popular:{search_type}:{limit}:{days}"
+        
+        if self.popular_cache_ttl:
+            try:
+                with track_stage("cache_get"):
+                    cached = self.redis.hgetall(key)
+                
+                CACHE_REQUESTS.labels("popular", "hit" if cached else "miss").inc()
+                
+                if cached:
+                    return RawPopularSearches(cached["body"].encode(), cached["etag"])
+            except Exception as e:
+                logger.warning(f"Could not read cached popular searches: {e}")
+        
+        popular = await self.get_popular_searches(limit=limit, search_type=search_type, days=days)
+        body = json.dumps(popular, default=_encode_datetime, ensure_ascii=False, separators=(",", ":"))
+        etag = make_etag(body)
+        
+        if self.popular_cache_ttl:
+            try:
+                with track_stage("cache_set"):
+                    pipe = self.redis.pipeline()
+                    pipe.hset(key, mapping={"body": body, "etag": etag})
+                    pipe.expire(key, self.popular_cache_ttl)
+                    pipe.execute()
+            except Exception as e:
+                logger.warning(f"Could not cache popular searches: {e}")
+        
+        return RawPopularSearches(body.encode(), etag)
+    
+    def _recent_key(self, user_id: str) -> str:
+        return f"{settings.REDIS_PREFIX}history:recent:{user_id}"
+    
+    def _latest_key(self, user_id: str) -> str:
+        return f"{settings.REDIS_PREFIX}history:latest:{user_id}"
+    
+    def _push_recent(self, entry: Dict[str, Any]):
+        """Make a search the user's newest, adding it to their recent searches if they are cached."""
+        key = self._recent_key(entry["userId"])
+        latest_key = self._latest_key(entry["userId"])
+        
+        try:
+            pipe = self.redis.pipeline()
+            if self.recent_size:
+                pipe.lpushx(key, _encode_entry(entry))
+                pipe.ltrim(key, 0, self.recent_size - 1)
+                pipe.expire(key, self.recent_ttl)
+            pipe.set(latest_key, entry["_id"], ex=self.recent_ttl)
+            pipe.execute()
+        except Exception as e:
+            logger.warning(f"Could not add search to recent history of user {entry['userId']}: {e}")
+            # The list and version would be stale; drop them if Redis is still reachable
+            try:
+                self.redis.delete(key, latest_key)
+            except Exception:
+                pass
+    
+    def history_etag(
+        self,
+        user_id: str,
+        limit: int = 10,
+        skip: int = 0,
+        search_type: Optional[str] = None,
+    ) -> Optional[str]:
+        """
+        Get the ETag of a page of a user's search history without reading it.
+        
+        Must be called before the history is read, so that a search added in
+        between makes the ETag stale rather than the response.
+        
+        Args:
+            user_id: User ID
+            limit: Maximum number of entries
+            skip: Number of entries to skip
+            search_type: Type of search (projects, users)
+            
+        Returns:
+            ETag, or None if the version of the user's history is not known
+        """
+        try:
+            latest = self.redis.get(self._latest_key(user_id))
+        except Exception as e:
+            logger.warning(f"Could not read history version of user {user_id}: {e}")
+            return None
+        
+        if latest is None:
+            return None
+        
+        # The raw cutoff moves daily, shifting searches into the daily aggregates
+        cutoff = self._raw_cutoff()
+        return make_etag(user_id, latest, cutoff.isoformat() if cutoff else "", str(limit), str(skip), search_type or "")
+    
+    def _get_recent(self, user_id: str, cutoff: Optional[datetime]) -> Optional[Tuple[List[Dict[str, Any]], bool]]:
+        """
+        Get the newest searches of a user, filling them from MongoDB if they are not cached.
+        
+        Args:
+            user_id: User ID
+            cutoff: Start of the oldest day read from the raw searches, or None for all of them
+            
+        Returns:
+            Up to HISTORY_RECENT_SIZE searches newer than the cutoff, newest
+            first, and whether they are all of the user's searches since the
+            cutoff; or None if Redis is unavailable
+        """
+        try:
+            with track_stage("history_cache"):
+                cached = self.redis.lrange(self._recent_key(user_id), 0, -1)
+        except Exception as e:
+            logger.warning(f"Could not read recent history of user {user_id}: {e}")
+            return None
+        
+        CACHE_REQUESTS.labels("history", "hit" if cached else "miss").inc()
+        
+        if cached:
+            recent = [_decode_entry(item) for item in cached]
+            # Concurrent searches may have been pushed out of order
+            recent.sort(key=lambda entry: entry["createdAt"], reverse=True)
+            # Lists are only trimmed at the size limit, so a shorter one was never missing searches
+            if cutoff is not None:
+                recent = [entry for entry in recent if entry["createdAt"] >= cutoff]
+            return recent, len(cached) < self.recent_size
+        
+        try:
+            latest = self.redis.get(self._latest_key(user_id)) or ""
+        except Exception as e:
+            logger.warning(f"Could not read recent history of user {user_id}: {e}")
+            return None
+        
+        cursor = (
+            self.collection.find(_raw_query(user_id, cutoff))
+            .sort("createdAt", -1)
+            .limit(self.recent_size)
+        )
+        
+        recent = []
+        for doc in cursor:
+            doc["_id"] = str(doc["_id"])
+            recent.append(doc)
+        
+        # Lists cannot be empty; users without searches are read from MongoDB until their first
+        if recent:
+            if self._fill_script is None:
+                self._fill_script = self.redis.register_script(FILL_RECENT_SCRIPT)
+            
+            try:
+                with track_stage("history_cache"):
+                    self._fill_script(
+                        keys=[self._recent_key(user_id), self._latest_key(user_id)],
+                        args=[latest, self.recent_ttl, recent[0]["_id"], *(_encode_entry(entry) for entry in recent)],
+                    )
+            except Exception as e:
+                logger.warning(f"Could not cache recent history of user {user_id}: {e}")
+        
+        return recent, len(recent) < self.recent_size
+    
+    def _raw_cutoff(self) -> Optional[datetime]:
+        """
+        Get the start of the oldest day still read from the raw searches.
+        
+        Raw searches are read for HISTORY_RAW_RETENTION_DAYS, and for longer
+        if compaction lags behind; days never compacted are always read raw.
+        
+        Returns:
+            Start of the day, or None while no day is compacted
+        """
+        watermark = self._cached_watermark()
+        if watermark is None:
+            return None
+        
+        return min(watermark, _day_start(datetime.utcnow()) - timedelta(days=settings.HISTORY_RAW_RETENTION_DAYS))
+    
+    def _get_watermark(self) -> Optional[datetime]:
+        """Get the start of the first day not yet compacted into daily aggregates."""
+        meta = self.meta_collection.find_one({"_id": "compaction"})
+        return meta["compactedUntil"] if meta else None
+    
+    def _cached_watermark(self) -> Optional[datetime]:
+        """Get the compaction watermark, read from MongoDB at most every WATERMARK_CACHE_SECONDS."""
+        # A stale watermark is earlier, which only makes readers use raw searches the TTL has not reached yet
+        now = time.monotonic()
+        if self._watermark_read_at is None or now - self._watermark_read_at > WATERMARK_CACHE_SECONDS:
+            self._watermark = self._get_watermark()
+            self._watermark_read_at = now
+        
+        return self._watermark
+    
+    def ensure_indexes(self, expire: Optional[bool] = None):
+        """
+        Create the search history indexes.
+        
+        Raw searches may only expire once compaction has aggregated them, so
+        the index on createdAt is a TTL index only while compaction runs.
+        
+        Args:
+            expire: Make the createdAt index a TTL index (True) or a plain
+                one (False); None keeps an existing index as it is
+        """
+        self._ensure_created_at_index(expire)
+        self.collection.create_index([("userId", 1), ("createdAt", -1)])
+        self.daily_collection.create_index([("userId", 1), ("day", -1)])
+        self.daily_collection.create_index([("day", 1), ("searchType", 1)])
+    
+    def _ensure_created_at_index(self, expire: Optional[bool]):
+        expire_after = (settings.HISTORY_RAW_RETENTION_DAYS + settings.HISTORY_TTL_GRACE_DAYS) * 86400
+        
+        # MongoDB allows one index per key pattern, so an existing index on createdAt is reused
+        existing = next(
+            (
+                (name, info)
+                for name, info in self.collection.index_information().items()
+                if [tuple(field) for field in info["key"]] == [("createdAt", 1)]
+            ),
+            None,
+        )
+        
+        if existing is None:
+            if expire:
+                self.collection.create_index("createdAt", name="createdAt_ttl", expireAfterSeconds=expire_after)
+            else:
+                self.collection.create_index("createdAt")
+            return
+        
+        name, info = existing
+        
+        if expire is None:
+            return
+        
+        if expire and "expireAfterSeconds" not in info:
+            logger.info("Replacing index %s on search_history.createdAt with a TTL index", name)
+            self.collection.drop_index(name)
+            self.collection.create_index("createdAt", name="createdAt_ttl", expireAfterSeconds=expire_after)
+        elif expire and info["expireAfterSeconds"] != expire_after:
+            # The retention changed; update the existing TTL index in place
+            self.db.command("collMod", self.collection.name, index={"name": name, "expireAfterSeconds": expire_after})
+        elif not expire and "expireAfterSeconds" in info:
+            # Compaction is off or unsupported; stop raw searches expiring without daily aggregates
+            logger.warning("Replacing TTL index %s on search_history.createdAt with a plain index", name)
+            self.collection.drop_index(name)
+            self.collection.create_index("createdAt")
+    
+    def compact(self) -> int:
+        """
+        Compact complete days of raw searches into per-day aggregates per user and query.
+        
+        Days are compacted in order from the watermark up to yesterday, in
+        batches of HISTORY_COMPACTION_BATCH_DAYS. Each day is aggregated in
+        full and replaces any existing aggregate, so a run interrupted before
+        the watermark moves can safely be repeated. Raw searches are left for
+        the TTL index, created once a compaction succeeds, which expires them
+        HISTORY_TTL_GRACE_DAYS after the readers stop using them. Only one
+        process compacts at a time.
+        
+        Returns:
+            Number of days compacted
+        """
+        lock = get_redis_client().lock(
+            f"{settings.REDIS_PREFIX}locks:history_compaction",
+            timeout=settings.HISTORY_COMPACTION_LOCK_TIMEOUT,
+        )
+        
+        if not lock.acquire(blocking=False):
+            logger.debug("History compaction is running elsewhere")
+            return 0
+        
+        try:
+            today = _day_start(datetime.utcnow())
+            start = self._get_watermark()
+            
+            if start is None:
+                oldest = self.collection.find_one({}, sort=[("createdAt", 1)])
+                start = _day_start(oldest["createdAt"]) if oldest else today
+            
+            compacted = 0
+            while start < today:
+                end = min(today, start + timedelta(days=settings.HISTORY_COMPACTION_BATCH_DAYS))
+                
+                with track_stage("history_compaction"):
+                    self._compact_range(start, end)
+                
+                self.meta_collection.update_one(
+                    {"_id": "compaction"},
+                    {"$set": {"compactedUntil": end, "updatedAt": datetime.utcnow()}},
+                    upsert=True,
+                )
+                compacted += (end - start).days
+                start = end
+                lock.extend(settings.HISTORY_COMPACTION_LOCK_TIMEOUT, replace_ttl=True)
+            
+            if compacted:
+                logger.info("Compacted %d days of search history", compacted)
+                # The backend runs compaction, so raw searches can now expire behind it
+                self.ensure_indexes(expire=True)
+            
+            return compacted
+        finally:
+            lock.release()
+    
+    def _compact_range(self, start: datetime, end: datetime):
+        """Aggregate raw searches in [start, end) into the daily collection."""
+        pipeline = [
+            {"$match": {"createdAt": {"$gte": start, "$lt": end}}},
+            {"$group": {
+                "_id": {
+                    "userId": "$userId",
+                    "query": "$query",
+                    "searchType": "$searchType",
+                    "day": {"$dateTrunc": {"date": "$createdAt", "unit": "day"}},
+                },
+                "count": {"$sum": 1},
+                "firstUsed": {"$min": "$createdAt"},
+                "lastUsed": {"$max": "$createdAt"},
+                "resultsCount": {"$max": "$resultsCount"},
+                "voice": {"$sum": {"$cond": [{"$eq": ["$source", "voice"]}, 1, 0]}},
+                "text": {"$sum": {"$cond": [{"$eq": ["$source", "text"]}, 1, 0]}},
+            }},
+            {"$project": {
+                "userId": "$_id.userId",
+                "query": "$_id.query",
+                "searchType": "$_id.searchType",
+                "day": "$_id.day",
+                "count": 1,
+                "firstUsed": 1,
+                "lastUsed": 1,
+                "resultsCount": 1,
+                "sources": {"voice": "$voice", "text": "$text"},
+            }},
+            {"$merge": {
+                "into": self.daily_collection.name,
+                "on": "_id",
+                "whenMatched": "replace",
+                "whenNotMatched": "insert",
+            }},
+        ]
+        
+        self.collection.aggregate(pipeline)
+    
+    async def create_indexes(self, expire: Optional[bool] = None):
+        """Create the search history indexes in a thread, logging rather than raising on failure."""
+        try:
+            await asyncio.to_thread(self.ensure_indexes, expire)
+        except Exception as e:
+            logger.error(f"Could not create search history indexes: {e}")
+    
+    async def run_compaction(self):
+        """Compact search history periodically until cancelled or unsupported by the backend."""
+        # Spread the first run so workers started together do not contend for the lock
+        await asyncio.sleep(random.uniform(0, min(60, settings.HISTORY_COMPACTION_INTERVAL)))
+        
+        while True:
+            try:
+                await asyncio.to_thread(self.compact)
+            except Exception as e:
+                if _is_unsupported(e):
+                    # Without a watermark, readers use the raw searches only, so they must not expire
+                    logger.warning(f"Search history compaction is not supported by this MongoDB backend, disabling it: {e}")
+                    await self.create_indexes(expire=False)
+                    return
+                logger.error(f"Search history compaction failed: {e}")
+            
+            await asyncio.sleep(settings.HISTORY_COMPACTION_INTERVAL)
+
+def _raw_query(user_id: str, cutoff: Optional[datetime]) -> Dict[str, Any]:
+    """Build the query for a user's raw searches since the cutoff, or all of them without one."""
+    query: Dict[str, Any] = {"userId": user_id}
+    if cutoff is not None:
+        query["createdAt"] = {"$gte": cutoff}
+    
+    return query
+
+def _encode_entry(entry: Dict[str, Any]) -> str:
+    """Serialize a search history entry for the recent history list."""
+    # MongoDB stores times with millisecond precision
+    created_at = entry["createdAt"].isoformat(timespec="milliseconds")
+    return json.dumps({**entry, "_id": str(entry["_id"]), "createdAt": created_at})
+
+def _encode_datetime(value: Any) -> str:
+    """Encode datetimes for json.dumps as FastAPI does."""
+    if isinstance(value, datetime):
+        return value.isoformat()
+    
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+def _decode_entry(item: str) -> Dict[str, Any]:
+    """Deserialize a search history entry from the recent history list."""
+    entry = json.loads(item)
+    entry["createdAt"] = datetime.fromisoformat(entry["createdAt"])
+    return entry
+
+def _is_unsupported(error: Exception) -> bool:
+    """Check whether a compaction error means the backend cannot run the pipeline, as with mongomock."""
+    from pymongo.errors import OperationFailure
+    
+    if isinstance(error, NotImplementedError):
+        return True
+    
+    return isinstance(error, OperationFailure) and (
+        error.code in UNSUPPORTED_PIPELINE_CODES or str(error).startswith("Unrecognized")
+    )
+
+def _day_start(moment: datetime) -> datetime:
+    """Truncate a datetime to the start of its UTC day."""
+    return moment.replace(hour=0, minute=0, second=0, microsecond=0)
 
 # Create search history service instance
 search_history_service = SearchHistoryService()
@@ -1,24 +1,186 @@
+import asyncio
+import contextvars
 import logging
+import math
+import random
+import time
 import httpx
-from typing import Dict, List, Any, Optional
+from functools import partial
+from typing import Callable, Dict, List, Any, NamedTuple, Optional, Set
 import json
 
 from src.core.config import settings
-from src.core.exceptions import ServiceUnavailableException, BadRequestException
+from src.core.exceptions import AppException, ServiceUnavailableException, BadRequestException, UnauthorizedException
 from src.core.database import get_redis_client
+from src.core.etag import make_etag
+from src.core.metrics import CACHE_REQUESTS, PREFETCH_REQUESTS, UPSTREAM_DURATION, UPSTREAM_RESPONSES, track_stage
+from src.core.prefetch import PrefetchTuner
+from src.core.resilience import UpstreamGuard
+from src.core.timing import track_timing
+from src.services.cache_invalidation import cache_invalidator, entity_tags, search_tags
 
 logger = logging.getLogger(__name__)
 
+# Bumped whenever the layout of cached search entries changes
+CACHE_VERSION = "v3"
+
+# Upstream serving each search type
+SEARCH_UPSTREAMS = {
+    "projects": "projects",
+    "users": "auth",
+}
+
+class RawSearchResult(NamedTuple):
+    """Search result as the upstream's undecoded JSON body."""
+    
+    body: bytes
+    total: int
+    cached: bool
+    etag: Optional[str] = None  # Computed when the result was cached
+
+class SearchRequest(NamedTuple):
+    """Cache key and upstream request for one page of search results."""
+    
+    cache_key: str
+    url: str
+    params: Dict[str, Any]
+    tags: List[str]
+
+def result_total(result: Any) -> int:
+    """Get the total result count from an upstream search response."""
+    if not isinstance(result, dict):
+        return 0
+    
+    data = result.get("data")
+    pagination = data.get("pagination") if isinstance(data, dict) else None
+    return int(pagination.get("total") or 0) if isinstance(pagination, dict) else 0
+
 class SearchService:
     """Service for searching projects and users."""
     
     def __init__(self):
         self.auth_service_url = settings.AUTH_SERVICE_URL
         self.projects_service_url = settings.PROJECTS_SERVICE_URL
-        self.redis = get_redis_client()
-        self.cache_ttl = settings.REDIS_CACHE_TTL
+        self.upstreams = {
+            "projects": UpstreamGuard("projects"),
+            "auth": UpstreamGuard("auth"),
+        }
+        self._clients: Dict[str, httpx.AsyncClient] = {}
+        self.prefetch_tuner = PrefetchTuner(
+            max_depth=settings.PREFETCH_DEPTH,
+            window=settings.PREFETCH_TUNING_WINDOW,
+            min_hit_rate=settings.PREFETCH_MIN_HIT_RATE,
+            target_hit_rate=settings.PREFETCH_TARGET_HIT_RATE,
+            probe_rate=settings.PREFETCH_PROBE_RATE,
+        )
+        self._prefetch_tasks: Set[asyncio.Task] = set()
+        self._prefetches_active = 0
+    
+    @property
+    def redis(self):
+        """Redis client, connected on first use."""
+        return get_redis_client()
+    
+    def _get_client(self, upstream: str) -> httpx.AsyncClient:
+        """Get the pooled HTTP client for an upstream."""
+        client = self._clients.get(upstream)
+        
+        if client is None or client.is_closed:
+            client = httpx.AsyncClient(
+                limits=httpx.Limits(
+                    max_connections=settings.UPSTREAM_MAX_CONCURRENCY,
+                    max_keepalive_connections=settings.UPSTREAM_MAX_CONCURRENCY,
+                ),
+            )
+            self._clients[upstream] = client
+        
+        return client
+    
+    async def _request(
+        self,
+        upstream: str,
+        url: str,
+        params: Dict[str, Any],
+        headers: Dict[str, str],
+        wait: bool = True,
+    ) -> httpx.Response:
+        """
+        Send a GET request to an upstream through its bulkhead and circuit breaker,
+        hedging slow requests when enabled.
+        
+        Args:
+            upstream: Upstream name (projects, auth)
+            url: Request URL
+            params: Query parameters
+            headers: Request headers
+            wait: Whether to queue for a free bulkhead slot instead of failing fast
+            
+        Returns:
+            Upstream response
+        """
+        client = self._get_client(upstream)
+        
+        async def send(timeout: float) -> httpx.Response:
+            start = time.perf_counter()
+            status = "error"
+            try:
+                response = await client.get(url, params=params, headers=headers, timeout=timeout)
+                status = str(response.status_code)
+                return response
+            except asyncio.CancelledError:
+                status = "cancelled"
+                raise
+            finally:
+                UPSTREAM_DURATION.labels(upstream).observe(time.perf_counter() - start)
+                UPSTREAM_RESPONSES.labels(upstream, status).inc()
+        
+        guard = self.upstreams[upstream]
+        
+        with track_timing("upstream"):
+            if settings.UPSTREAM_HEDGING_ENABLED and wait:
+                return await guard.hedged_call(send)
+            
+            return await guard.call(send, wait=wait)
+    
+    def get_upstream_status(self) -> Dict[str, Dict[str, Any]]:
+        """Get bulkhead and circuit breaker state for each upstream."""
+        return {name: guard.status() for name, guard in self.upstreams.items()}
+    
+    async def warm_up(self, connections: int):
+        """
+        Open pooled connections to each upstream ahead of the first search.
+        
+        Any HTTP response will do; the requests only establish connections,
+        which then stay in the keep-alive pool.
+        
+        Args:
+            connections: Connections to open per upstream
+        """
+        urls = {"projects": self.projects_service_url, "auth": self.auth_service_url}
+        connections = min(connections, settings.UPSTREAM_MAX_CONCURRENCY)
+        
+        await asyncio.gather(*(
+            self._get_client(upstream).head(url, timeout=settings.UPSTREAM_TIMEOUT_MAX)
+            for upstream, url in urls.items()
+            for _ in range(connections)
+        ))
+    
+    def reset_clients(self):
+        """Drop HTTP clients inherited from a parent process so a forked worker opens its own."""
+        self._clients = {}
+        self._prefetch_tasks = set()
+        self._prefetches_active = 0
     
-    async def search_projects(
+    async def close(self):
+        """Cancel background prefetches and close pooled upstream connections."""
+        for task in list(self._prefetch_tasks):
+            task.cancel()
+        
+        for client in self._clients.values():
+            await client.aclose()
+        self._clients.clear()
+    
+    async def search_projects_raw(
         self, 
         query: str, 
         category: Optional[str] = None,
@@ -28,9 +190,9 @@ class SearchService:
         page: int = 1,
         limit: int = 10,
         token: Optional[str] = None,
-    ) -> Dict[str, Any]:
+    ) -> RawSearchResult:
         """
-        Search for projects based on query and filters.
+        Search for projects, returning the upstream JSON body without decoding it.
         
         Args:
             query: Search query
@@ -43,74 +205,51 @@ class SearchService:
             token: JWT token
             
         Returns:
-            Search results
+            Raw search result
         """
-        try:
-            # Check cache first
-            cache_key = f"{settings.REDIS_PREFIX}projects:{query}:{category}:{skills}:{budget_min}:{budget_max}:{page}:{limit}"
-            cached_result = self.redis.get(cache_key)
-            
-            if cached_result:
-                logger.info(f"Cache hit for project search: {query}")
-                return json.loads(cached_result)
-            
-            # Prepare request parameters
-            params = {
-                "search": query,
-                "page": page,
-                "limit": limit,
-            }
-            
-            if category:
-                params["category"] = category
-            
-            if skills:
-                params["skills"] = ",".join(skills)
-            
-            if budget_min is not None:
-                params["budget_min"] = budget_min
-            
-            if budget_max is not None:
-                params["budget_max"] = budget_max
-            
-            # Prepare headers
-            headers = {}
-            if token:
-                headers["Authorization"] = f"Bearer {token}"
-            
-            # Make request to projects service
-            async with httpx.AsyncClient() as client:
-                response = await client.get(
-                    f"{self.projects_service_url}/api/projects",
-                    params=params,
-                    headers=headers,
-                    timeout=10.0,
-                )
-                
-                if response.status_code != 200:
-                    logger.error(f"Projects service error: {response.status_code} - {response.text}")
-                    raise ServiceUnavailableException(message="Failed to search projects")
-                
-                result = response.json()
-                
-                # Cache result
-                self.redis.setex(
-                    cache_key,
-                    self.cache_ttl,
-                    json.dumps(result),
-                )
-                
-                return result
+        build_request = partial(self._projects_request, query, category, skills, budget_min, budget_max, limit)
+        result = await self._cached_search("projects", query, build_request(page), token)
+        self._schedule_prefetch("projects", result, page, limit, token, build_request)
         
-        except httpx.RequestError as e:
-            logger.error(f"Projects service request error: {e}")
-            raise ServiceUnavailableException(message="Projects service is unavailable")
+        return result
+    
+    def _projects_request(
+        self,
+        query: str,
+        category: Optional[str],
+        skills: Optional[List[str]],
+        budget_min: Optional[float],
+        budget_max: Optional[float],
+        limit: int,
+        page: int,
+    ) -> SearchRequest:
+        """Build the cache key and upstream request for a page of project results."""
+        cache_key = f"{settings.REDIS_PREFIX}{CACHE_VERSION}:projects:{query}:{category}:{skills}:{budget_min}:{budget_max}:{page}:{limit}"
         
-        except Exception as e:
-            logger.error(f"Project search error: {e}")
-            raise BadRequestException(message=f"Project search failed: {str(e)}")
+        # Prepare request parameters
+        params = {
+            "search": query,
+            "page": page,
+            "limit": limit,
+        }
+        
+        if category:
+            params["category"] = category
+        
+        if skills:
+            params["skills"] = ",".join(skills)
+        
+        if budget_min is not None:
+            params["budget_min"] = budget_min
+        
+        if budget_max is not None:
+            params["budget_max"] = budget_max
+        
+        tags = search_tags("projects", {"category": category, "skills": skills})
+        
+        return SearchRequest(cache_key, f"{self.projects_service_url}/api/projects", params, tags)
     
-    async def search_users(
+    async def search_users_raw(
         self, 
         query: str, 
         role: Optional[str] = None,
@@ -118,9 +257,9 @@ class SearchService:
         page: int = 1,
         limit: int = 10,
         token: Optional[str] = None,
-    ) -> Dict[str, Any]:
+    ) -> RawSearchResult:
         """
-        Search for users based on query and filters.
+        Search for users, returning the upstream JSON body without decoding it.
         
         Args:
             query: Search query
@@ -131,66 +270,285 @@ class SearchService:
             token: JWT token
             
         Returns:
-            Search results
+            Raw search result
+        """
+        build_request = partial(self._users_request, query, role, skills, limit)
+        result = await self._cached_search("users", query, build_request(page), token)
+        self._schedule_prefetch("users", result, page, limit, token, build_request)
+        
+        return result
+    
+    def _users_request(
+        self,
+        query: str,
+        role: Optional[str],
+        skills: Optional[List[str]],
+        limit: int,
+        page: int,
+    ) -> SearchRequest:
+        """Build the cache key and upstream request for a page of user results."""
+        cache_key = f"{settings.REDIS_PREFIX}{CACHE_VERSION}:users:{query}:{role}:{skills}:{page}:{limit}"
+        
+        # Prepare request parameters
+        params = {
+            "search": query,
+            "page": page,
+            "limit": limit,
+        }
+        
+        if role:
+            params["role"] = role
+        
+        if skills:
+            params["skills"] = ",".join(skills)
+        
+        tags = search_tags("users", {"role": role, "skills": skills})
+        
+        return SearchRequest(cache_key, f"{self.auth_service_url}/api/auth/users/search", params, tags)
+    
+    async def _cached_search(
+        self,
+        search_type: str,
+        query: str,
+        request: SearchRequest,
+        token: Optional[str],
+    ) -> RawSearchResult:
+        """
+        Serve a search from the cache, or from the upstream and fill the cache.
+        
+        Args:
+            search_type: Type of search (projects, users)
+            query: Search query
+            request: Cache key and upstream request
+            token: JWT token
+            
+        Returns:
+            Raw search result
         """
+        upstream = SEARCH_UPSTREAMS[search_type]
+        subject = search_type[:-1].capitalize()
+        
         try:
             # Check cache first
-            cache_key = f"{settings.REDIS_PREFIX}users:{query}:{role}:{skills}:{page}:{limit}"
-            cached_result = self.redis.get(cache_key)
-            
-            if cached_result:
-                logger.info(f"Cache hit for user search: {query}")
-                return json.loads(cached_result)
-            
-            # Prepare request parameters
-            params = {
-                "search": query,
-                "page": page,
-                "limit": limit,
-            }
+            with track_stage("cache_get"):
+                cached_result = self.redis.hgetall(request.cache_key)
             
-            if role:
-                params["role"] = role
+            CACHE_REQUESTS.labels(search_type, "hit" if cached_result else "miss").inc()
             
-            if skills:
-                params["skills"] = ",".join(skills)
-            
-            # Prepare headers
-            headers = {}
-            if token:
-                headers["Authorization"] = f"Bearer {token}"
-            
-            # Make request to auth service
-            async with httpx.AsyncClient() as client:
-                response = await client.get(
-                    f"{self.auth_service_url}/api/auth/users/search",
-                    params=params,
-                    headers=headers,
-                    timeout=10.0,
+            if cached_result:
+                logger.info(
+                    "Cache hit for %s search: %s",
+                    search_type,
+                    query,
+                    extra={"event": "search.cache_hit", "search_type": search_type, "query": query},
                 )
                 
-                if response.status_code != 200:
-                    logger.error(f"Auth service error: {response.status_code} - {response.text}")
-                    raise ServiceUnavailableException(message="Failed to search users")
+                # Count a prefetched page once, on its first use
+                if cached_result.get("prefetched") and self.redis.hdel(request.cache_key, "prefetched"):
+                    PREFETCH_REQUESTS.labels(search_type, "used").inc()
+                    self.prefetch_tuner.record_used()
                 
-                result = response.json()
-                
-                # Cache result
-                self.redis.setex(
-                    cache_key,
-                    self.cache_ttl,
-                    json.dumps(result),
+                return RawSearchResult(
+                    cached_result["body"].encode(), int(cached_result["total"]), True, cached_result["etag"]
                 )
-                
-                return result
+            
+            return await self._fetch(search_type, request, token)
+        
+        except AppException:
+            raise
         
         except httpx.RequestError as e:
-            logger.error(f"Auth service request error: {e}")
-            raise ServiceUnavailableException(message="Auth service is unavailable")
+            logger.error(f"{upstream.capitalize()} service request error: {e}")
+            raise ServiceUnavailableException(message=f"{upstream.capitalize()} service is unavailable")
         
         except Exception as e:
-            logger.error(f"User search error: {e}")
-            raise BadRequestException(message=f"User search failed: {str(e)}")
+            logger.error(f"{subject} search error: {e}")
+            raise BadRequestException(message=f"{subject} search failed: {str(e)}")
+    
+    async def _fetch(
+        self,
+        search_type: str,
+        request: SearchRequest,
+        token: Optional[str],
+        prefetched: bool = False,
+        warming: bool = False,
+    ) -> RawSearchResult:
+        """
+        Fetch a search from the upstream and cache it.
+        
+        The upstream body is decoded once here, to validate it and read the
+        result count; afterwards it is only passed around as bytes.
+        
+        Args:
+            search_type: Type of search (projects, users)
+            request: Cache key and upstream request
+            token: JWT token
+            prefetched: Whether this is a background prefetch rather than a user search
+            warming: Whether this is a scheduled cache warming rather than a user search
+            
+        Returns:
+            Raw search result
+        """
+        upstream = SEARCH_UPSTREAMS[search_type]
+        
+        # Prepare headers
+        headers = {}
+        if token:
+            headers["Authorization"] = f"Bearer {token}"
+        
+        generation = cache_invalidator.generation()
+        
+        # Prefetches and warming never queue for an upstream slot ahead of user searches
+        wait = not (prefetched or warming)
+        response = await self._request(upstream, request.url, params=request.params, headers=headers, wait=wait)
+        
+        if warming and response.status_code in (401, 403):
+            # Not an upstream failure: the warming token is missing, expired or lacks access
+            raise UnauthorizedException(message=f"{upstream.capitalize()} service rejected the cache warming token")
+        
+        if response.status_code != 200:
+            logger.error(f"{upstream.capitalize()} service error: {response.status_code} - {response.text}")
+            raise ServiceUnavailableException(message=f"Failed to search {search_type}")
+        
+        body = response.text
+        result = json.loads(body)
+        total = result_total(result)
+        
+        # Pass the upstream bytes through unless they need re-encoding to UTF-8
+        raw = response.content if response.encoding.lower() in ("utf-8", "utf8", "ascii") else body.encode()
+        
+        # Hashed once here; repeated requests are answered with the cached ETag
+        etag = make_etag(request.cache_key, raw)
+        entry = {"body": body, "total": total, "etag": etag}
+        if prefetched:
+            entry["prefetched"] = 1
+        
+        # Cache result, tagged so change events can evict it before it expires
+        ttl = cache_invalidator.ttl_for(generation)
+        if warming:
+            # Entries warmed together would otherwise all expire together
+            ttl = max(1, int(ttl * (1 - random.uniform(0, settings.CACHE_WARMING_TTL_JITTER))))
+        
+        with track_stage("cache_set"):
+            pipe = self.redis.pipeline()
+            pipe.hset(request.cache_key, mapping=entry)
+            pipe.expire(request.cache_key, ttl)
+            if cache_invalidator.enabled:
+                cache_invalidator.tag(pipe, request.cache_key, request.tags + entity_tags(search_type, result), ttl)
+            pipe.execute()
+        
+        return RawSearchResult(raw, total, False, etag)
+    
+    def request_for(self, search_type: str, query: str, filters: Dict[str, Any]) -> Optional[SearchRequest]:
+        """
+        Build the cache key and upstream request of a search recorded in the search history.
+        
+        Args:
+            search_type: Type of search (projects, users)
+            query: Search query
+            filters: Search filters as recorded
+            
+        Returns:
+            Search request, or None for an unknown search type
+        """
+        page = filters.get("page") or 1
+        limit = filters.get("limit") or 10
+        
+        if search_type == "projects":
+            return self._projects_request(
+                query,
+                filters.get("category"),
+                filters.get("skills"),
+                filters.get("budget_min"),
+                filters.get("budget_max"),
+                limit,
+                page,
+            )
+        
+        if search_type == "users":
+            return self._users_request(query, filters.get("role"), filters.get("skills"), limit, page)
+        
+        return None
+    
+    async def warm(self, search_type: str, request: SearchRequest, token: Optional[str] = None) -> RawSearchResult:
+        """
+        Fetch a search into the cache ahead of user requests, replacing any cached entry.
+        
+        The request does not queue for an upstream slot, and the entry's TTL is
+        shortened by up to CACHE_WARMING_TTL_JITTER.
+        
+        Args:
+            search_type: Type of search (projects, users)
+            request: Cache key and upstream request
+            token: JWT token
+            
+        Returns:
+            Raw search result
+        """
+        return await self._fetch(search_type, request, token, warming=True)
+    
+    def _schedule_prefetch(
+        self,
+        search_type: str,
+        result: RawSearchResult,
+        page: int,
+        limit: int,
+        token: Optional[str],
+        build_request: Callable[[int], SearchRequest],
+    ):
+        """
+        Prefetch the pages following a served page into the cache in the background.
+        
+        Args:
+            search_type: Type of search (projects, users)
+            result: Result of the served page
+            page: Served page number
+            limit: Items per page
+            token: JWT token
+            build_request: Builds the cache key and upstream request for a page number
+        """
+        if not settings.PREFETCH_ENABLED or limit <= 0:
+            return
+        
+        last_page = math.ceil(result.total / limit)
+        
+        for next_page in range(page + 1, min(page + self.prefetch_tuner.pages_to_prefetch(), last_page) + 1):
+            if self._prefetches_active >= settings.PREFETCH_MAX_CONCURRENCY:
+                PREFETCH_REQUESTS.labels(search_type, "dropped").inc()
+                break
+            
+            self._prefetches_active += 1
+            # Run outside the request's context so prefetch time is not reported in its Server-Timing
+            task = asyncio.create_task(
+                self._prefetch(search_type, build_request(next_page), token),
+                context=contextvars.Context(),
+            )
+            self._prefetch_tasks.add(task)
+            task.add_done_callback(self._prefetch_tasks.discard)
+    
+    async def _prefetch(self, search_type: str, request: SearchRequest, token: Optional[str]):
+        """Fetch a page into the cache unless it is already cached."""
+        try:
+            if self.redis.exists(request.cache_key):
+                PREFETCH_REQUESTS.labels(search_type, "cached").inc()
+                return
+            
+            await self._fetch(search_type, request, token, prefetched=True)
+            PREFETCH_REQUESTS.labels(search_type, "issued").inc()
+            self.prefetch_tuner.record_issued()
+        except Exception as e:
+            PREFETCH_REQUESTS.labels(search_type, "failed").inc()
+            logger.debug(f"Prefetch of {request.cache_key} failed: {e}")
+        finally:
+            self._prefetches_active -= 1
+    
+    def get_prefetch_status(self) -> Dict[str, Any]:
+        """Get prefetch tuning state and the number of prefetches in progress."""
+        return {
+            "enabled": settings.PREFETCH_ENABLED,
+            "active": self._prefetches_active,
+            **self.prefetch_tuner.status(),
+        }
 
 # Create search service instance
 search_service = SearchService()
@@ -1,23 +1,123 @@
 import os
 import logging
-import tempfile
-from typing import BinaryIO, Optional
-import speech_recognition as sr
-from pydub import AudioSegment
+import shutil
+from concurrent.futures import ThreadPoolExecutor
+from typing import TYPE_CHECKING, BinaryIO, Callable, List, Optional, Tuple
 
+from src.core.audio import (
+    AudioDecodeError,
+    DecoderNotFoundError,
+    PcmSegment,
+    decode_to_pcm,
+    read_pcm_wav,
+    sniff_audio_format,
+    split_at_silence,
+)
 from src.core.config import settings
-from src.core.exceptions import BadRequestException, ServiceUnavailableException
+from src.core.exceptions import AppException, BadRequestException, ServiceUnavailableException
+from src.core.metrics import RECOGNITIONS_IN_FLIGHT, REJECTED_UPLOADS, track_stage
+
+# speech_recognition is heavy; it is imported on first use or by load()
+if TYPE_CHECKING:
+    import speech_recognition as sr
 
 logger = logging.getLogger(__name__)
 
+# Recognizer backend: takes recorded audio and a language code, returns the transcript
+RecognizeFunction = Callable[["sr.AudioData", str], str]
+
+# Longest run of words repeated across the overlap of two segments
+MAX_OVERLAP_WORDS = 6
+
+def merge_transcripts(parts: List[Tuple[str, bool]]) -> str:
+    """
+    Join segment transcripts, dropping words heard twice where segments overlap.
+    
+    Args:
+        parts: Transcript of each segment and whether it overlaps the previous one
+        
+    Returns:
+        Joined transcript
+    """
+    def normalize(word: str) -> str:
+        return word.lower().strip(".,!?;:")
+    
+    words: List[str] = []
+    
+    for text, overlaps_previous in parts:
+        new_words = text.split()
+        
+        if overlaps_previous and words:
+            # Longest suffix of the text so far that the segment starts with
+            for count in range(min(MAX_OVERLAP_WORDS, len(words), len(new_words)), 0, -1):
+                if [normalize(word) for word in words[-count:]] == [normalize(word) for word in new_words[:count]]:
+                    new_words = new_words[count:]
+                    break
+        
+        words.extend(new_words)
+    
+    return " ".join(words)
+
 class SpeechRecognitionService:
     """Service for speech recognition."""
     
-    def __init__(self):
-        self.recognizer = sr.Recognizer()
+    def __init__(self, recognize_fn: Optional[RecognizeFunction] = None):
+        self._recognizer: Optional["sr.Recognizer"] = None
         self.language = settings.SPEECH_RECOGNITION_LANGUAGE
         self.max_size_bytes = settings.MAX_AUDIO_SIZE_MB * 1024 * 1024  # Convert MB to bytes
         self.sample_rate = settings.AUDIO_SAMPLE_RATE
+        self.recognize_fn = recognize_fn or self._recognize_google
+        self.segment_seconds = settings.RECOGNITION_SEGMENT_SECONDS
+        self.segment_overlap = settings.RECOGNITION_SEGMENT_OVERLAP
+        self._segment_executor: Optional[ThreadPoolExecutor] = None
+    
+    @property
+    def recognizer(self) -> "sr.Recognizer":
+        """Speech recognizer, created on first use."""
+        if self._recognizer is None:
+            import speech_recognition as sr
+            
+            self._recognizer = sr.Recognizer()
+        
+        return self._recognizer
+    
+    @property
+    def segment_executor(self) -> ThreadPoolExecutor:
+        """Thread pool recognizing the segments of long clips, shared by all requests of the process."""
+        if self._segment_executor is None:
+            self._segment_executor = ThreadPoolExecutor(
+                max_workers=settings.RECOGNITION_SEGMENT_WORKERS,
+                thread_name_prefix="recognize-segment",
+            )
+        
+        return self._segment_executor
+    
+    def load(self):
+        """Import the speech recognition library and create the recognizer ahead of the first request."""
+        if shutil.which("ffmpeg") is None:
+            logger.warning("ffmpeg not found, only 16-bit mono WAV uploads at %d Hz can be recognized", self.sample_rate)
+        
+        self.recognizer
+    
+    def warm_up(self):
+        """
+        Run a clip of silence through segmentation and request encoding.
+        
+        Loads the libraries and the FLAC encoder used by the first recognition,
+        without sending audio to the recognizer.
+        """
+        import speech_recognition as sr
+        
+        self.load()
+        
+        # Long enough to be split, so segmentation is loaded too
+        seconds = self.segment_seconds + 1 if self.segment_seconds > 0 else 1
+        frames = bytes(2 * int(seconds * self.sample_rate))
+        segments = split_at_silence(frames, self.sample_rate, self.segment_seconds, self.segment_overlap)
+        sr.AudioData(segments[0].frames, self.sample_rate, 2).get_flac_data(convert_width=2)
+    
+    def _recognize_google(self, audio_data: "sr.AudioData", language: str) -> str:
+        return self.recognizer.recognize_google(audio_data, language=language)
     
     def recognize_from_file(self, audio_file: BinaryIO, file_extension: str) -> str:
         """
@@ -25,64 +125,39 @@ class SpeechRecognitionService:
         
         Args:
             audio_file: Audio file object
-            file_extension: File extension (e.g., 'wav', 'mp3')
+            file_extension: File extension (e.g., 'wav', 'mp3'), used when the format cannot be detected
             
         Returns:
             Recognized text
         """
-        try:
-            # Check file size
+        audio_bytes = self.read_audio(audio_file)
+        
+        return self._recognize(audio_bytes, file_extension, "No speech detected in the audio file")
+    
+    def read_audio(self, audio_file: BinaryIO) -> bytes:
+        """
+        Read an uploaded audio file, rejecting files over the size limit.
+        
+        Args:
+            audio_file: Audio file object
+            
+        Returns:
+            Audio data as bytes
+        """
+        # Check file size
+        with track_stage("size_check"):
             audio_file.seek(0, os.SEEK_END)
             file_size = audio_file.tell()
             audio_file.seek(0)
-            
-            if file_size > self.max_size_bytes:
-                raise BadRequestException(
-                    message=f"Audio file size exceeds the maximum allowed size of {settings.MAX_AUDIO_SIZE_MB}MB"
-                )
-            
-            # Create a temporary file
-            with tempfile.NamedTemporaryFile(suffix=f".{file_extension}", delete=False) as temp_file:
-                temp_file.write(audio_file.read())
-                temp_path = temp_file.name
-            
-            try:
-                # Convert audio to WAV format if needed
-                if file_extension.lower() != "wav":
-                    audio = AudioSegment.from_file(temp_path, format=file_extension.lower())
-                    wav_path = temp_path.replace(f".{file_extension}", ".wav")
-                    audio.export(wav_path, format="wav")
-                    temp_path = wav_path
-                
-                # Recognize speech
-                with sr.AudioFile(temp_path) as source:
-                    audio_data = self.recognizer.record(source)
-                    text = self.recognizer.recognize_google(audio_data, language=self.language)
-                    
-                    if not text:
-                        raise BadRequestException(message="No speech detected in the audio file")
-                    
-                    return text
-            finally:
-                # Clean up temporary files
-                if os.path.exists(temp_path):
-                    os.unlink(temp_path)
-                
-                wav_path = temp_path.replace(f".{file_extension}", ".wav")
-                if os.path.exists(wav_path) and wav_path != temp_path:
-                    os.unlink(wav_path)
         
-        except sr.UnknownValueError:
-            logger.warning("Speech recognition could not understand audio")
-            raise BadRequestException(message="Could not understand audio")
+        if file_size > self.max_size_bytes:
+            REJECTED_UPLOADS.labels("too_large").inc()
+            raise BadRequestException(
+                message=f"Audio file size exceeds the maximum allowed size of {settings.MAX_AUDIO_SIZE_MB}MB"
+            )
         
-        except sr.RequestError as e:
-            logger.error(f"Speech recognition service error: {e}")
-            raise ServiceUnavailableException(message="Speech recognition service is unavailable")
-        
-        except Exception as e:
-            logger.error(f"Speech recognition error: {e}")
-            raise BadRequestException(message=f"Speech recognition failed: {str(e)}")
+        with track_stage("read"):
+            return audio_file.read()
     
     def recognize_from_bytes(self, audio_bytes: bytes, file_format: str) -> str:
         """
@@ -90,33 +165,35 @@ class SpeechRecognitionService:
         
         Args:
             audio_bytes: Audio data as bytes
-            file_format: Audio format (e.g., 'wav', 'mp3')
+            file_format: Audio format (e.g., 'wav', 'mp3'), used when the format cannot be detected
             
         Returns:
             Recognized text
         """
-        # Create a temporary file
-        with tempfile.NamedTemporaryFile(suffix=f".{file_format}", delete=False) as temp_file:
-            temp_file.write(audio_bytes)
-            temp_path = temp_file.name
+        return self._recognize(audio_bytes, file_format, "No speech detected in the audio")
+    
+    def _recognize(self, audio_bytes: bytes, file_format: str, empty_message: str) -> str:
+        import speech_recognition as sr
         
         try:
-            # Convert audio to WAV format if needed
-            if file_format.lower() != "wav":
-                audio = AudioSegment.from_file(temp_path, format=file_format.lower())
-                wav_path = temp_path.replace(f".{file_format}", ".wav")
-                audio.export(wav_path, format="wav")
-                temp_path = wav_path
+            with track_stage("decode"):
+                frames = self._decode(audio_bytes, file_format)
             
-            # Recognize speech
-            with sr.AudioFile(temp_path) as source:
-                audio_data = self.recognizer.record(source)
-                text = self.recognizer.recognize_google(audio_data, language=self.language)
+            with RECOGNITIONS_IN_FLIGHT.track_inprogress():
+                with track_stage("segment"):
+                    segments = split_at_silence(frames, self.sample_rate, self.segment_seconds, self.segment_overlap)
                 
-                if not text:
-                    raise BadRequestException(message="No speech detected in the audio")
-                
-                return text
+                # Recognize speech
+                with track_stage("recognize"):
+                    text = self._recognize_segments(segments)
+            
+            if not text:
+                raise BadRequestException(message=empty_message)
+            
+            return text
+        
+        except AppException:
+            raise
         
         except sr.UnknownValueError:
             logger.warning("Speech recognition could not understand audio")
@@ -129,15 +206,69 @@ class SpeechRecognitionService:
         except Exception as e:
             logger.error(f"Speech recognition error: {e}")
             raise BadRequestException(message=f"Speech recognition failed: {str(e)}")
+    
+    def _recognize_segments(self, segments: List[PcmSegment]) -> str:
+        """
+        Recognize audio segments in parallel and join the transcripts in order.
+        
+        Segments in which no speech is recognized contribute nothing; the
+        audio is only reported as not understood if no segment is.
         
-        finally:
-            # Clean up temporary files
-            if os.path.exists(temp_path):
-                os.unlink(temp_path)
+        Args:
+            segments: Segments from split_at_silence
             
-            wav_path = temp_path.replace(f".{file_format}", ".wav")
-            if os.path.exists(wav_path) and wav_path != temp_path:
-                os.unlink(wav_path)
+        Returns:
+            Recognized text
+        """
+        import speech_recognition as sr
+        
+        if len(segments) == 1:
+            return self.recognize_fn(sr.AudioData(segments[0].frames, self.sample_rate, 2), self.language)
+        
+        def recognize_segment(segment: PcmSegment) -> str:
+            try:
+                return self.recognize_fn(sr.AudioData(segment.frames, self.sample_rate, 2), self.language)
+            except sr.UnknownValueError:
+                return ""
+        
+        texts = list(self.segment_executor.map(recognize_segment, segments))
+        
+        if not any(texts):
+            raise sr.UnknownValueError()
+        
+        return merge_transcripts([(text, segment.overlaps_previous) for text, segment in zip(texts, segments)])
+    
+    def _decode(self, audio_bytes: bytes, file_format: str) -> bytes:
+        """
+        Decode audio to 16-bit mono PCM at the recognition sample rate.
+        
+        The format is detected from the file contents; the extension is only a
+        hint for files without a known signature. WAV files that are already
+        16-bit mono PCM at the sample rate are used as is, without ffmpeg.
+        
+        Args:
+            audio_bytes: Audio data as bytes
+            file_format: Format from the file extension
+            
+        Returns:
+            Raw 16-bit little-endian samples
+        """
+        audio_format = sniff_audio_format(audio_bytes[:64]) or file_format.lower() or None
+        
+        if audio_format == "wav":
+            frames = read_pcm_wav(audio_bytes, self.sample_rate)
+            if frames is not None:
+                return frames
+        
+        try:
+            return decode_to_pcm(audio_bytes, audio_format, self.sample_rate, settings.AUDIO_DECODE_TIMEOUT)
+        except DecoderNotFoundError:
+            logger.error(f"Cannot decode {audio_format or 'unknown'} audio: ffmpeg is not installed")
+            raise ServiceUnavailableException(message="Audio decoding is unavailable")
+        except AudioDecodeError as e:
+            logger.warning(f"Could not decode {audio_format or 'unknown'} audio: {e}")
+            REJECTED_UPLOADS.labels("undecodable").inc()
+            raise BadRequestException(message="Unsupported or corrupt audio file")
 
 # Create speech recognition service instance
 speech_recognition_service = SpeechRecognitionService()
@@ -0,0 +1,204 @@
+import asyncio
+import logging
+import math
+import threading
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+from src.core.config import settings
+from src.core.database import get_redis_client
+from src.core.sketch import SpaceSaving
+
+logger = logging.getLogger(__name__)
+
+# Search types tracked for trending
+TRENDING_SEARCH_TYPES = ("projects", "users")
+
+# The decay landmark moves forward every this many half-lives, keeping weights below 2**64
+LANDMARK_HALF_LIVES = 64
+
+def normalize_query(query: str) -> str:
+    """Normalize a query so spelling variants in case and spacing count together."""
+    return " ".join(query.lower().split())
+
+class TrendingService:
+    """
+    Real-time trending searches from a fixed-size sketch with exponential time decay.
+    
+    Each worker counts searches in a Space-Saving sketch using forward decay:
+    a search at time t weighs exp(λ(t - L)) for a landmark L shared by all
+    workers, so counts never have to be decayed in place and sketches from
+    different workers can simply be added. Every sync interval a worker adds
+    the searches counted since its last sync to a sorted set in Redis, trims
+    it to the sketch capacity and keeps the merged top in memory, from which
+    /trending is answered. The decayed score of a query is roughly the number
+    of times it was searched in the last half-life / ln 2 seconds.
+    
+    Searches are recorded on the event loop while syncs run in a thread, so
+    the in-memory counts are only touched under a lock, which is never held
+    across Redis calls.
+    """
+    
+    def __init__(self):
+        self.enabled = settings.TRENDING_ENABLED
+        self.capacity = settings.TRENDING_CAPACITY
+        self.half_life = settings.TRENDING_HALF_LIFE
+        self.sync_interval = settings.TRENDING_SYNC_INTERVAL
+        self.decay = math.log(2) / self.half_life
+        self.landmark = self._landmark_for(time.time())
+        self._pending = SpaceSaving(self.capacity)
+        self._local = SpaceSaving(self.capacity)
+        self._merged: List[Tuple[str, float]] = []
+        self._merged_at: Optional[float] = None
+        self._carried_landmark: Optional[float] = None
+        self._lock = threading.Lock()
+    
+    @property
+    def redis(self):
+        """Redis client, connected on first use."""
+        return get_redis_client()
+    
+    def _landmark_for(self, now: float) -> float:
+        period = self.half_life * LANDMARK_HALF_LIVES
+        return math.floor(now / period) * period
+    
+    def _key(self, landmark: float) -> str:
+        return f"{settings.REDIS_PREFIX}trending:{int(landmark)}"
+    
+    def _rescale(self, landmark: float):
+        """Move to a later landmark, rescaling the weights counted against the current one; requires the lock."""
+        factor = math.exp(-self.decay * (landmark - self.landmark))
+        self._pending.scale(factor)
+        self._local.scale(factor)
+        self._merged = [(item, weight * factor) for item, weight in self._merged]
+        self.landmark = landmark
+    
+    def record(self, search_type: str, query: str, now: Optional[float] = None):
+        """
+        Count a search.
+        
+        Args:
+            search_type: Type of search (projects, users)
+            query: Search query
+            now: Time of the search (default: current time)
+        """
+        if not self.enabled or search_type not in TRENDING_SEARCH_TYPES or not query.strip():
+            return
+        
+        now = time.time() if now is None else now
+        landmark = self._landmark_for(now)
+        item = f"{search_type}:{normalize_query(query)}"
+        
+        with self._lock:
+            if landmark != self.landmark:
+                self._rescale(landmark)
+            
+            weight = math.exp(self.decay * (now - self.landmark))
+            self._pending.add(item, weight)
+            self._local.add(item, weight)
+    
+    def top(self, limit: int = 10, search_type: Optional[str] = None, now: Optional[float] = None) -> List[Dict[str, Any]]:
+        """
+        Get the trending searches.
+        
+        Answers from the merged view of all workers, or from this worker's
+        own counts if Redis has not been reachable for a few sync intervals.
+        
+        Args:
+            limit: Maximum number of entries
+            search_type: Type of search (projects, users)
+            now: Time to decay the scores to (default: current time)
+            
+        Returns:
+            Trending queries with their decayed scores, highest first
+        """
+        now = time.time() if now is None else now
+        
+        with self._lock:
+            if self._merged_at is not None and now - self._merged_at <= 3 * self.sync_interval:
+                ranked = self._merged
+            else:
+                ranked = self._local.top(self.capacity)
+            
+            scale = math.exp(-self.decay * (now - self.landmark))
+        
+        trending = []
+        
+        for item, weight in ranked:
+            score = round(weight * scale, 3)
+            if score <= 0:
+                # Ranked highest first; the rest have decayed away too
+                break
+            
+            item_type, query = item.split(":", 1)
+            if search_type and item_type != search_type:
+                continue
+            
+            trending.append({"query": query, "searchType": item_type, "score": score})
+            if len(trending) >= limit:
+                break
+        
+        return trending
+    
+    def sync(self, now: Optional[float] = None):
+        """Add the searches counted since the last sync to the shared counts and refresh the merged top."""
+        now = time.time() if now is None else now
+        landmark = self._landmark_for(now)
+        
+        # Searches keep being recorded on the event loop while this runs in a thread
+        with self._lock:
+            if landmark != self.landmark:
+                self._rescale(landmark)
+            landmark = self.landmark
+            pending, self._pending = self._pending, SpaceSaving(self.capacity)
+        
+        key = self._key(landmark)
+        ttl = int(self.half_life * LANDMARK_HALF_LIVES * 2)
+        
+        # The first worker to reach a landmark carries the previous counts over, rescaled
+        if self._carried_landmark != landmark:
+            if self.redis.set(f"{key}:carried", 1, nx=True, ex=ttl):
+                previous_key = self._key(landmark - self.half_life * LANDMARK_HALF_LIVES)
+                self.redis.zunionstore(key, {key: 1, previous_key: 2.0 ** -LANDMARK_HALF_LIVES})
+            self._carried_landmark = landmark
+        
+        pipe = self.redis.pipeline()
+        for item, weight in pending.items():
+            pipe.zincrby(key, weight, item)
+        pipe.zremrangebyrank(key, 0, -(self.capacity + 1))
+        pipe.expire(key, ttl)
+        pipe.zrevrange(key, 0, self.capacity - 1, withscores=True)
+        
+        try:
+            results = pipe.execute()
+        except Exception:
+            # Keep the counts for the next sync, rescaled if the landmark moved on meanwhile
+            with self._lock:
+                factor = math.exp(-self.decay * (self.landmark - landmark))
+                for item, weight in pending.items():
+                    self._pending.add(item, weight * factor)
+            raise
+        
+        with self._lock:
+            # A record() that moved to a later landmark meanwhile left these counts behind
+            if self.landmark == landmark:
+                self._merged = results[-1]
+                self._merged_at = now
+    
+    async def run_sync(self):
+        """Sync with the other workers periodically until cancelled, then once more."""
+        try:
+            while True:
+                await asyncio.sleep(self.sync_interval)
+                try:
+                    await asyncio.to_thread(self.sync)
+                except Exception as e:
+                    logger.warning(f"Trending sync failed: {e}")
+        finally:
+            try:
+                self.sync()
+            except Exception as e:
+                logger.warning(f"Final trending sync failed: {e}")
+
+# Create trending service instance
+trending_service = TrendingService()
@@ -0,0 +1,88 @@
+import asyncio
+import logging
+from typing import Any, Dict, Tuple
+
+from src.core.admission import recognition_queue
+from src.models.search import VoiceSearchRequest
+from src.services.search_history_service import search_history_service
+from src.services.search_service import RawSearchResult, search_service
+from src.services.speech_recognition import speech_recognition_service
+
+logger = logging.getLogger(__name__)
+
+# Results returned for an unknown search type
+INVALID_SEARCH_TYPE = RawSearchResult(b'{"error":"Invalid search type"}', 0, False)
+
+async def run_voice_search(
+    user: Dict[str, Any],
+    request: VoiceSearchRequest,
+    audio_bytes: bytes,
+    file_extension: str,
+    background: bool = False,
+) -> Tuple[str, RawSearchResult]:
+    """
+    Recognize a voice query, search with it and record it in the search history.
+    
+    Args:
+        user: Authenticated user (id and token)
+        request: Search type and filters
+        audio_bytes: Uploaded audio
+        file_extension: File extension of the upload, used when the format cannot be detected
+        background: Run as a background job, waiting for a recognition slot without a deadline
+        
+    Returns:
+        Recognized query and raw search results
+    """
+    # Recognize speech off the event loop, once a recognition slot is free
+    async with recognition_queue.slot(background=background):
+        query = await asyncio.to_thread(
+            speech_recognition_service.recognize_from_bytes, audio_bytes, file_extension
+        )
+    
+    logger.info("Recognized query: %s", query, extra={"event": "voice_search.recognized", "query": query})
+    
+    # Perform search
+    if request.search_type == "projects":
+        results = await search_service.search_projects_raw(
+            query=query,
+            category=request.category,
+            skills=request.skills,
+            budget_min=request.budget_min,
+            budget_max=request.budget_max,
+            page=request.page,
+            limit=request.limit,
+            token=user.get("token"),
+        )
+    elif request.search_type == "users":
+        results = await search_service.search_users_raw(
+            query=query,
+            role=request.role,
+            skills=request.skills,
+            page=request.page,
+            limit=request.limit,
+            token=user.get("token"),
+        )
+    else:
+        results = INVALID_SEARCH_TYPE
+    
+    # Save search history
+    filters = {
+        "category": request.category,
+        "skills": request.skills,
+        "budget_min": request.budget_min,
+        "budget_max": request.budget_max,
+        "role": request.role,
+        "page": request.page,
+        "limit": request.limit,
+    }
+    
+    await search_history_service.add_search(
+        user_id=user["id"],
+        query=query,
+        search_type=request.search_type,
+        filters=filters,
+        results_count=results.total,
+        source="voice",
+    )
+    
+    return query, results
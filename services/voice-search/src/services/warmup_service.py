@@ -0,0 +1,141 @@
+import asyncio
+import logging
+import time
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+from src.core.auth import ALLOWED_ALGORITHMS, jwt_auth
+from src.core.config import settings
+from src.core.database import get_mongo_db, get_redis_client
+from src.services.search_service import search_service
+from src.services.speech_recognition import speech_recognition_service
+from src.services.trending_service import trending_service
+
+logger = logging.getLogger(__name__)
+
+class WarmupService:
+    """
+    Warm-up of a worker before it takes traffic, and the readiness it reports.
+    
+    Warm-up runs in the background once the app has started, so liveness
+    (/health) answers straight away while readiness (/ready) waits for it. It
+    opens the Redis, MongoDB and upstream connection pools, runs silence
+    through the recognition pipeline and primes in-process caches. Each step
+    is reported separately; a failed step does not hold readiness back, since
+    the first request retries it anyway. After warm-up, a worker is ready as
+    long as Redis and MongoDB answer.
+    """
+    
+    def __init__(self):
+        self.enabled = settings.WARMUP_ENABLED
+        self.timeout = settings.WARMUP_TIMEOUT
+        self.upstream_connections = settings.WARMUP_UPSTREAM_CONNECTIONS
+        self.check_timeout = settings.READINESS_CHECK_TIMEOUT
+        self.state = "pending" if self.enabled else "disabled"
+        self.steps: Dict[str, Dict[str, Any]] = {}
+        self.duration_ms: Optional[float] = None
+        self._probes: Dict[str, asyncio.Future] = {}
+    
+    @property
+    def completed(self) -> bool:
+        return not self.enabled or self.state == "completed"
+    
+    async def _step(self, name: str, step: Awaitable):
+        start = time.perf_counter()
+        
+        try:
+            await asyncio.wait_for(step, self.timeout)
+            self.steps[name] = {"status": "ok"}
+        except asyncio.TimeoutError:
+            logger.warning(f"Warm-up step {name} timed out after {self.timeout}s")
+            self.steps[name] = {"status": "failed", "error": "timed out"}
+        except Exception as e:
+            logger.warning(f"Warm-up step {name} failed: {e}")
+            self.steps[name] = {"status": "failed", "error": str(e)}
+        
+        self.steps[name]["duration_ms"] = round((time.perf_counter() - start) * 1000, 1)
+    
+    def _prime_caches(self):
+        """Prepare the JWT verification keys and load the merged trending searches."""
+        for algorithm in ALLOWED_ALGORITHMS:
+            jwt_auth.get_key(algorithm)
+        
+        if trending_service.enabled:
+            trending_service.sync()
+    
+    async def run(self):
+        """Run all warm-up steps concurrently."""
+        self.state = "running"
+        start = time.perf_counter()
+        
+        await asyncio.gather(
+            self._step("redis", asyncio.to_thread(lambda: get_redis_client().ping())),
+            self._step("mongo", asyncio.to_thread(lambda: get_mongo_db().command("ping"))),
+            self._step("upstreams", search_service.warm_up(self.upstream_connections)),
+            self._step("recognizer", asyncio.to_thread(speech_recognition_service.warm_up)),
+            self._step("caches", asyncio.to_thread(self._prime_caches)),
+        )
+        
+        self.duration_ms = round((time.perf_counter() - start) * 1000, 1)
+        self.state = "completed"
+        
+        failed = [name for name, step in self.steps.items() if step["status"] != "ok"]
+        if failed:
+            logger.warning("Warm-up completed in %.0f ms; failed steps: %s", self.duration_ms, ", ".join(failed))
+        else:
+            logger.info("Warm-up completed in %.0f ms", self.duration_ms)
+    
+    async def _probe(self, name: str, check: Callable[[], Any]) -> Dict[str, Any]:
+        """Run a dependency check in a thread, reusing a previous check that is still running."""
+        # A dependency that hangs must not tie up a thread per probe
+        probe = self._probes.get(name)
+        if probe is None or probe.done():
+            probe = asyncio.ensure_future(asyncio.to_thread(check))
+            probe.add_done_callback(lambda future: future.cancelled() or future.exception())
+            self._probes[name] = probe
+        
+        start = time.perf_counter()
+        
+        try:
+            await asyncio.wait_for(asyncio.shield(probe), self.check_timeout)
+        except asyncio.TimeoutError:
+            return {"status": "failed", "error": "timed out"}
+        except Exception as e:
+            return {"status": "failed", "error": str(e)}
+        
+        return {"status": "ok", "latency_ms": round((time.perf_counter() - start) * 1000, 1)}
+    
+    async def check(self) -> Dict[str, Any]:
+        """
+        Check whether this worker is ready for traffic.
+        
+        Upstream circuit breakers are reported but do not affect readiness:
+        an upstream outage affects every worker alike, and taking them all
+        out of rotation would only turn degraded searches into refused ones.
+        
+        Returns:
+            Readiness report with a `ready` flag
+        """
+        redis, mongo = await asyncio.gather(
+            self._probe("redis", lambda: get_redis_client().ping()),
+            self._probe("mongo", lambda: get_mongo_db().command("ping")),
+        )
+        
+        ready = self.completed and redis["status"] == "ok" and mongo["status"] == "ok"
+        
+        return {
+            "ready": ready,
+            "warmup": {
+                "enabled": self.enabled,
+                "state": self.state,
+                "duration_ms": self.duration_ms,
+                "steps": self.steps,
+            },
+            "dependencies": {
+                "redis": redis,
+                "mongo": mongo,
+                "upstreams": {name: status["state"] for name, status in search_service.get_upstream_status().items()},
+            },
+        }
+
+# Create warm-up service instance
+warmup_service = WarmupService()